@@ -0,0 +1,29 @@
+"""
+基准测试公共启动代码
+
+插件模块在导入时依赖 nonebot 的 driver 和插件配置，
+因此需要先初始化 nonebot 并加载插件，再取出要测试的子模块。
+nonebot 按相对于当前目录的路径给插件命名，基准测试需要在仓库根目录下运行。
+"""
+import importlib
+from pathlib import Path
+from types import ModuleType
+
+import nonebot
+
+ROOT = Path(__file__).resolve().parent.parent
+PLUGIN_DIR = ROOT / "onebot_plugin" / "plugins"
+PLUGIN_NAME = "onebot_plugin_live_shiro"
+
+_module_name = ""
+
+
+def load_plugin_module(name: str) -> ModuleType:
+    """初始化 nonebot 并加载插件，返回插件内的子模块，例如 message_render.renderer"""
+    global _module_name
+    if not _module_name:
+        nonebot.init(driver="~none")
+        nonebot.load_plugins(str(PLUGIN_DIR))
+        # 按 nonebot 加载时使用的模块名导入，否则会再导入一份插件，定时任务和指令重复注册
+        _module_name = nonebot.get_plugin(PLUGIN_NAME).module_name
+    return importlib.import_module(f"{_module_name}.{name}")
@@ -0,0 +1,90 @@
+"""
+透明边缘裁剪基准测试：逐像素循环实现 vs alpha 通道包围盒实现
+
+用法：python benchmarks/crop_transparent_edges.py [--repeat 5]
+"""
+import argparse
+import time
+
+from PIL import Image, ImageDraw
+
+from _bootstrap import load_plugin_module
+
+renderer = load_plugin_module("message_render.renderer")
+
+# 截图使用 device_scale_factor=2
+SCALE = 2
+CARD_WIDTHS = [400, 600, 800]
+
+
+def crop_transparent_edges_naive(img: Image.Image, border: int = 10) -> Image.Image:
+    """旧实现：逐像素扫描 alpha 通道"""
+    if img.mode != "RGBA":
+        img = img.convert("RGBA")
+
+    pix = img.load()
+    width, height = img.size
+    x_min, y_min = width, height
+    x_max, y_max = 0, 0
+
+    for y in range(height):
+        for x in range(width):
+            if pix[x, y][3] != 0:
+                x_min = min(x_min, x)
+                y_min = min(y_min, y)
+                x_max = max(x_max, x)
+                y_max = max(y_max, y)
+
+    if x_max < x_min or y_max < y_min:
+        return img
+
+    left = max(0, x_min - border)
+    upper = max(0, y_min - border)
+    right = min(width, x_max + border)
+    lower = min(height, y_max + border)
+
+    return img.crop((left, upper, right, lower))
+
+
+def make_card(width: int) -> Image.Image:
+    """生成一张带透明边缘、圆角的模拟卡片截图"""
+    w, h = width * SCALE, int(width * 1.5) * SCALE
+    img = Image.new("RGBA", (w, h), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    margin = 12 * SCALE
+    draw.rounded_rectangle(
+        (margin, margin, w - margin, h - margin),
+        radius=24 * SCALE,
+        fill=(255, 255, 255, 242),
+    )
+    return img
+
+
+def bench(func, img: Image.Image, repeat: int) -> float:
+    """返回 repeat 次中最快一次的耗时（毫秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(img, border=10)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'width':>6} {'pixels':>10} {'naive(ms)':>10} {'bbox(ms)':>10} {'speedup':>8}")
+    for width in CARD_WIDTHS:
+        img = make_card(width)
+        assert crop_transparent_edges_naive(img).size == renderer.crop_transparent_edges(img).size
+
+        naive = bench(crop_transparent_edges_naive, img, args.repeat)
+        fast = bench(renderer.crop_transparent_edges, img, args.repeat)
+        pixels = img.size[0] * img.size[1]
+        print(f"{width:>6} {pixels:>10} {naive:>10.1f} {fast:>10.2f} {naive / fast:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
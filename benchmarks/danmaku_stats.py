@@ -0,0 +1,149 @@
+"""
+弹幕统计基准测试：增量统计（环形缓冲 + Misra-Gries + HyperLogLog）vs 保存全部弹幕后精确统计
+
+回放磁带中录制的弹幕帧（api 为 danmaku），或生成 --messages 条模拟弹幕：
+发言人数、热词、表情都服从长尾分布，并夹带礼物、SC 和上舰。
+分别统计每条弹幕的处理耗时、统计对象占用的内存，以及发言人数和热词与精确结果的差异。
+增量统计的内存不随弹幕数量增长，可以用不同的 --messages 对比。
+
+用法：
+    python benchmarks/danmaku_stats.py [--messages 200000]
+    python benchmarks/danmaku_stats.py --tape cache/bili_tape.jsonl.gz
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+
+from _bootstrap import load_plugin_module
+
+api_tape = load_plugin_module("bilibili.api_tape")
+live_push = load_plugin_module("bilibili.live_push")
+danmaku_stats = load_plugin_module("bilibili.danmaku_stats")
+
+PHRASES = ["哈哈哈哈哈", "草", "来了来了", "好耶", "？？？", "晚上好", "awsl", "8888", "可爱", "下次一定",
+           "Shiro 好可爱", "这也太强了", "笑死", "前方高能", "妈妈生的"]
+EMOTES = ["[dog]", "[妙啊]", "[笑哭]", "[doge]", "[吃瓜]", "[打call]"]
+
+
+def synthetic_frames(count: int, seed: int = 0) -> list[dict]:
+    """约 300 条/秒的弹幕，其中 2% 为礼物，0.1% 为 SC，0.02% 为上舰"""
+    rng = random.Random(seed)
+    start_ms = 1_735_732_800_000
+    frames = []
+    for i in range(count):
+        ts_ms = start_ms + i * 1000 // 300
+        roll = rng.random()
+        if roll < 0.02:
+            frames.append({"type": "SEND_GIFT", "data": {"cmd": "SEND_GIFT", "data": {
+                "num": rng.randint(1, 10), "coin_type": rng.choice(["gold", "silver"]), "total_coin": 1000,
+            }}})
+            continue
+        if roll < 0.021:
+            frames.append({"type": "SUPER_CHAT_MESSAGE", "data": {"cmd": "SUPER_CHAT_MESSAGE", "data": {"price": 30}}})
+            continue
+        if roll < 0.0212:
+            frames.append({"type": "GUARD_BUY", "data": {"cmd": "GUARD_BUY", "data": {"num": 1, "price": 198000}}})
+            continue
+        uid = int(rng.paretovariate(1.2) * 1000)
+        if rng.random() < 0.7:
+            text = PHRASES[min(len(PHRASES) - 1, int(rng.expovariate(0.4)))]
+        else:
+            text = f"随机弹幕 {rng.randrange(count)}"
+        if rng.random() < 0.2:
+            text += EMOTES[min(len(EMOTES) - 1, int(rng.expovariate(0.8)))]
+        meta = [0, 1, 25, 16777215, ts_ms, 0, 0, "", 0, 0, 0, "", 0, "{}"]
+        frames.append({"type": "DANMU_MSG", "data": {"cmd": "DANMU_MSG", "info": [meta, text, [uid, f"观众{uid}"]]}})
+    return frames
+
+
+def tape_frames(path: Path) -> list[dict]:
+    tape = api_tape.bili_api_tape
+    tape.replay(path, latency_scale=0)
+    return [
+        event
+        for room in tape.recorded(live_push.DANMAKU_TAPE_API)
+        for _, event in tape.events(live_push.DANMAKU_TAPE_API, room)
+    ]
+
+
+class ExactStats:
+    """对照组：保存全部弹幕，用 Counter 和 set 精确统计"""
+
+    def __init__(self) -> None:
+        self.messages: list[tuple[float, str, str]] = []
+        self.chatters: set[str] = set()
+        self.keywords: Counter = Counter()
+
+    def ingest(self, event: dict) -> None:
+        if not event.get("type", "").startswith("DANMU_MSG"):
+            return
+        info = event["data"]["info"]
+        uid = str(info[2][0])
+        self.messages.append((info[0][4] / 1000, uid, info[1]))
+        self.chatters.add(uid)
+        keyword = danmaku_stats.REPEAT_PATTERN.sub(
+            r"\1\1\1", danmaku_stats.INLINE_EMOTE_PATTERN.sub("", info[1])
+        ).strip()
+        if keyword and len(keyword) <= danmaku_stats.KEYWORD_MAX_LENGTH:
+            self.keywords[keyword] += 1
+
+
+def run(name: str, stats, frames: list[dict]) -> float:
+    tracemalloc.start()
+    start = time.perf_counter()
+    for frame in frames:
+        stats.ingest(frame)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{name:>6}: {elapsed * 1000:8.1f} ms / {len(frames)} 帧  "
+        f"{elapsed / max(1, len(frames)) * 1e6:6.2f} us/帧  统计占用 {current / 1024:9.1f} KiB"
+    )
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tape", type=Path, help="录制的磁带，默认生成模拟弹幕")
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--buffer", type=int, default=2000, help="环形缓冲长度")
+    args = parser.parse_args()
+
+    frames = tape_frames(args.tape) if args.tape else synthetic_frames(args.messages)
+    # 直播时长从第一条弹幕算起
+    started = next(
+        (f["data"]["info"][0][4] / 1000 for f in frames if f.get("type", "").startswith("DANMU_MSG")), None
+    )
+    # tracemalloc 会拖慢执行，耗时单独再测一次
+    incremental = danmaku_stats.DanmakuStats(args.buffer, started=started)
+    exact = ExactStats()
+    run("增量", incremental, frames)
+    run("精确", exact, frames)
+    for name, fresh in (("增量", danmaku_stats.DanmakuStats(args.buffer)), ("精确", ExactStats())):
+        start = time.perf_counter()
+        for frame in frames:
+            fresh.ingest(frame)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name}统计不开 tracemalloc：{elapsed / max(1, len(frames)) * 1e6:6.2f} us/帧，"
+            f"{len(frames) / max(elapsed, 1e-9):,.0f} 帧/秒"
+        )
+
+    chatters = incremental.chatters.count()
+    print(
+        f"发言人数：估计 {chatters}，精确 {len(exact.chatters)}，"
+        f"误差 {abs(chatters - len(exact.chatters)) / max(1, len(exact.chatters)):.2%}"
+    )
+    exact_top = [k for k, _ in exact.keywords.most_common(5)]
+    sketch_top = [k for k, _ in incremental.keywords.top(5)]
+    print(f"热词前 5：精确 {exact_top}，增量 {sketch_top}，一致 {len(set(exact_top) & set(sketch_top))}/5")
+    print("---- 下播摘要 ----")
+    print(incremental.summary())
+
+
+if __name__ == "__main__":
+    main()
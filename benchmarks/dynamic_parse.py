@@ -0,0 +1,135 @@
+"""
+动态解析基准测试：逐层 .get() + 每种类型单独处理 vs parse_dynamic 一次解析为 __slots__ 对象
+
+以 fixtures/dynamics.json 中录制的动态为模板，生成 1000 条的历史记录（id 和发布时间各不相同），
+分别统计解析耗时和解析结果占用的内存。
+
+用法：python benchmarks/dynamic_parse.py [--items 1000] [--repeat 20]
+"""
+import argparse
+import copy
+import json
+import time
+import tracemalloc
+from pathlib import Path
+
+from _bootstrap import load_plugin_module
+
+dynamic_model = load_plugin_module("bilibili.dynamic_model")
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "dynamics.json"
+
+
+def build_history(count: int) -> list[dict]:
+    templates = list(json.loads(FIXTURES.read_text(encoding="utf-8")).values())
+    history = []
+    for i in range(count):
+        item = copy.deepcopy(templates[i % len(templates)])
+        item["id_str"] = str(10_000_000 + i)
+        item["modules"]["module_author"]["pub_ts"] = 1_735_732_800 - i * 3600
+        history.append(item)
+    return history
+
+
+def _legacy_pub_ts(item: dict):
+    pub_ts = item.get("modules", {}).get("module_author", {}).get("pub_ts")
+    try:
+        return int(pub_ts)
+    except (TypeError, ValueError):
+        return None
+
+
+async def _legacy_processor(major: dict) -> dict:
+    """旧的 process_dynamic_* 都是协程，每条动态构造一次字典"""
+    key = major.get("type", "")[len("MAJOR_TYPE_"):].lower()
+    payload = major.get(key)
+    if not payload:
+        return {"success": False}
+    combined_message = {}
+    combined_message["success"] = True
+    combined_message["title"] = payload.get("title", "无标题")
+    combined_message["content"] = payload.get("desc", "无简介")
+    combined_message["link"] = payload.get("jump_url", "无链接")
+    combined_message["image_urls"] = []
+    for pic in payload.get("pics", []) or payload.get("items", []):
+        if url := pic.get("url") or pic.get("src"):
+            combined_message["image_urls"].append(url)
+    return combined_message
+
+
+def parse_legacy(item: dict) -> dict:
+    """
+    旧流程：拉取时判断置顶和水位线、筛选新动态时再取一次发布时间，
+    播报时逐层 .get() 取出 modules / module_author / major，再交给对应的处理协程
+    """
+    item.get("modules", {}).get("module_tag", {}).get("text")
+    _legacy_pub_ts(item)
+    if item.get("type", "") == "DYNAMIC_TYPE_NONE" or _legacy_pub_ts(item) is None:
+        return {}
+    orig = item.get("orig") if item.get("type") == "DYNAMIC_TYPE_FORWARD" else None
+    modules = (orig or item).get("modules")
+    if not modules:
+        return {}
+    module_author = modules.get("module_author")
+    if not module_author:
+        return {}
+    module_dynamic = modules.get("module_dynamic")
+    if not module_dynamic:
+        return {}
+    major = module_dynamic.get("major")
+    if not major:
+        return {}
+    coroutine = _legacy_processor(major)
+    try:
+        coroutine.send(None)
+    except StopIteration as e:
+        combined_message = e.value
+    combined_message["time"] = module_author.get("pub_time", "")
+    combined_message["user_name"] = module_author.get("name", "未知用户")
+    combined_message["avatar_url"] = module_author.get("face", "")
+    combined_message.pop("success", None)
+    return combined_message
+
+
+def parse_slots(item: dict):
+    """新流程：一次解析，之后的判断都直接读取属性"""
+    dynamic = dynamic_model.parse_dynamic(item)
+    content = dynamic.orig or dynamic
+    content.card_data()
+    return dynamic
+
+
+def bench(name: str, parse, history: list[dict], repeat: int) -> None:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in history:
+            parse(item)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    parsed = [parse(item) for item in history]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del parsed
+
+    best = min(timings)
+    print(
+        f"{name:>8}: {best * 1000:7.2f} ms / {len(history)} 条  "
+        f"{best / len(history) * 1e6:6.2f} us/条  结果占用 {current / 1024:7.1f} KiB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    history = build_history(args.items)
+    bench("legacy", parse_legacy, history, args.repeat)
+    bench("slots", parse_slots, history, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
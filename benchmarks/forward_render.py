@@ -0,0 +1,66 @@
+"""
+转发动态渲染基准测试：单次内联渲染 vs 先渲染原动态 PNG 再以 data URL 嵌入
+
+用法：python benchmarks/forward_render.py [--repeat 10]
+需要本地已安装 playwright 的 chromium。
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from _bootstrap import load_plugin_module
+
+dynamic = load_plugin_module("bilibili.dynamic")
+browser = load_plugin_module("message_render.browser")
+
+FORWARDED_CARD = {
+    "user_name": "Shiro",
+    "avatar_url": "",
+    "time": "2025-01-01 20:00",
+    "title": "发布了一条 [图片] 动态喵！",
+    "content": "今天的直播辛苦大家了！\n下次见喵~",
+    "image_urls": [],
+}
+
+FORWARD_DATA = {
+    "user_name": "Shiro",
+    "avatar_url": "",
+    "time": "2025-01-01 21:00",
+    "title": "转发了动态",
+    "content": "转发一下",
+}
+
+
+async def bench(single_pass: bool, repeat: int) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        image = await dynamic.render_forward_dynamic(
+            dict(FORWARD_DATA),
+            dict(FORWARDED_CARD),
+            single_pass=single_pass,
+            use_cache=False,
+        )
+        timings.append((time.perf_counter() - start) * 1000)
+    print(f"  输出大小: {len(image)} bytes")
+    return timings
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    await browser.browser_manager.init_browser()
+    try:
+        for name, single_pass in (("two-pass", False), ("single-pass", True)):
+            print(name)
+            timings = await bench(single_pass, args.repeat)
+            print(f"  p50: {statistics.median(timings):.1f} ms  min: {min(timings):.1f} ms")
+    finally:
+        await browser.browser_manager.close_browser()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
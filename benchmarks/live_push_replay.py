@@ -0,0 +1,131 @@
+"""
+直播状态推送回放测试：推送事件 → get_room_info 核对 → 发送 的端到端延迟
+
+用 TapeDanmaku 代替B站的弹幕 websocket，回放磁带中录制的推送帧（api 为 danmaku），
+get_room_info 同样从磁带回放，发送由 RecordingBot 记录。未指定 --tape 时生成一盘磁带：
+开播前的心跳和弹幕、LIVE、直播中的弹幕、PREPARING；--lag 次核对时接口仍返回旧状态，
+用于模拟接口数据滞后于推送的情况。
+
+统计每个开播/下播事件从分发到消息发出的耗时，以及期间 get_room_info 的调用次数。
+
+用法：
+    python benchmarks/live_push_replay.py [--lag 1] [--latency-scale 0.01]
+    python benchmarks/live_push_replay.py --tape cache/bili_tape.jsonl.gz
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from _bootstrap import load_plugin_module
+from replay_pipeline import RecordingBot, tape_line
+
+bili_common = load_plugin_module("bilibili.common")
+api_tape = load_plugin_module("bilibili.api_tape")
+live_push = load_plugin_module("bilibili.live_push")
+live_room = load_plugin_module("bilibili.live_room")
+
+ROOM_ID = 1
+
+
+def _frame(cmd: str, data: dict) -> dict:
+    return {"room_display_id": ROOM_ID, "room_real_id": ROOM_ID, "type": cmd, "data": {"cmd": cmd, **data}}
+
+
+def build_synthetic_tape(path: Path, lag: int) -> None:
+    frames = [(0, _frame("VIEW", {"data": 1000}))]
+    frames += [(500, _frame("DANMU_MSG", {"info": [[], f"开播前弹幕 {i}", [i, f"观众{i}"]]})) for i in range(5)]
+    frames.append((2000, _frame("LIVE", {"roomid": ROOM_ID})))
+    frames += [(50, _frame("DANMU_MSG", {"info": [[], f"弹幕 {i}", [i, f"观众{i}"]]})) for i in range(50)]
+    frames.append((30000, _frame("VIEW", {"data": 5000})))
+    frames.append((3000, _frame("PREPARING", {"roomid": str(ROOM_ID)})))
+
+    def room_info(status: int) -> dict:
+        return {"room_info": {"live_status": status, "title": "回放", "description": "", "cover": ""}}
+
+    # 第一次核对在开播前；之后每个事件先返回 lag 次旧状态
+    statuses = [0] + [0] * lag + [1] + [1] * lag + [0]
+    lines = [tape_line(live_push.DANMAKU_TAPE_API, str(ROOM_ID), gap, frame) for gap, frame in frames]
+    lines += [tape_line("get_room_info", str(ROOM_ID), 80, room_info(status)) for status in statuses]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+async def run(args) -> int:
+    tape = api_tape.bili_api_tape
+    workdir = Path(tempfile.mkdtemp(prefix="live_shiro_push_"))
+    tape_path = args.tape.resolve() if args.tape else workdir / "tape.jsonl"
+    # 直播状态缓存写在临时目录的 ./cache 下
+    os.chdir(workdir)
+    if args.tape is None:
+        build_synthetic_tape(tape_path, args.lag)
+    tape.replay(tape_path, latency_scale=args.latency_scale)
+
+    rooms = list(tape.recorded(live_push.DANMAKU_TAPE_API))
+    if not rooms:
+        print(f"磁带 {tape_path} 中没有推送事件")
+        return 1
+    room_id = int(rooms[0])
+    frames = tape.events(live_push.DANMAKU_TAPE_API, str(room_id))
+    replay_seconds = sum(gap for gap, _ in frames) * args.latency_scale
+
+    bot = RecordingBot()
+    sent_at: list[float] = []
+    send_group_msg = bot.send_group_msg
+
+    async def timed_send(group_id, message):
+        sent_at.append(time.perf_counter())
+        await send_group_msg(group_id, message)
+
+    bot.send_group_msg = timed_send
+    live_room.bili_request_budget = bili_common.RequestBudget(10 ** 9)
+    live_room.plugin_config.live_shiro_bilibili_live_room_id = room_id
+    live_room.plugin_config.live_shiro_group_ids = [10_000]
+    # 缩短重试间隔，与回放速度一致
+    live_room.PUSH_CONFIRM_DELAY = 2 * args.latency_scale
+    live_room.live_status = 0
+    await live_room.check_live_status(bot)
+
+    event_at: list[tuple[str, float]] = []
+    calls_before = tape.calls
+    handled = asyncio.Event()
+
+    async def on_status_event(event: dict) -> None:
+        event_at.append((event["type"], time.perf_counter()))
+        await live_room.handle_live_push_event(bot, event)
+        if sum(1 for kind, _ in event_at if kind in ("LIVE", "PREPARING")) >= 2:
+            handled.set()
+
+    connections = []
+    monitor = live_push.LivePushMonitor(room_id, on_status_event, connections.append)
+    monitor.start()
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(handled.wait(), timeout=max(10.0, replay_seconds * 2))
+    except asyncio.TimeoutError:
+        print("等待推送事件超时")
+    await asyncio.sleep(0.1)
+    elapsed = time.perf_counter() - start
+    await monitor.stop()
+
+    print(f"磁带 {tape_path}：直播间 {room_id}，{len(frames)} 帧，回放用时 {elapsed:.2f} s")
+    print(f"推送统计：{monitor.stats()}，连接状态变化 {connections}")
+    status_events = [(kind, at) for kind, at in event_at if kind in ("LIVE", "PREPARING")]
+    for (kind, at), sent in zip(status_events, sent_at):
+        print(f"{kind:>10}: 事件到消息发出 {(sent - at) * 1000:7.1f} ms")
+    print(f"get_room_info 调用 {tape.calls - calls_before} 次，共发送 {len(bot.sent)} 条消息")
+    return 0 if len(sent_at) >= len(status_events) > 0 else 1
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tape", type=Path, help="录制的磁带，默认生成")
+    parser.add_argument("--lag", type=int, default=1, help="每个事件后接口仍返回旧状态的次数")
+    parser.add_argument("--latency-scale", type=float, default=0.01, help="帧间隔和接口耗时的倍数")
+    return asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
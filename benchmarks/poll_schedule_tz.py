@@ -0,0 +1,64 @@
+"""
+轮询调度时区回归检查
+
+scheduler 使用 Asia/Shanghai，而宿主机时区可能不同。AdaptivePoller 每次轮询后用 date 任务
+安排下一次，run_date 如果是 naive 的本地时间，会被当作北京时间解释，
+宿主机为 UTC 时任务被判定为错过 8 小时而丢弃，轮询从此停止。
+
+本脚本把进程时区设为与 scheduler 不同的 --host-tz，启动 scheduler，
+用 1 秒间隔的 AdaptivePoller 运行 --seconds 秒，检查轮询是否持续进行；失败时以非零状态码退出。
+
+用法：python benchmarks/poll_schedule_tz.py [--host-tz UTC] [--seconds 6]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host-tz", default="UTC")
+    parser.add_argument("--seconds", type=float, default=6)
+    args = parser.parse_args()
+
+    # 必须在导入插件之前设置，保证 datetime.now() 使用该时区
+    os.environ["TZ"] = args.host_tz
+    time.tzset()
+
+    from _bootstrap import load_plugin_module
+
+    adaptive_poll = load_plugin_module("bilibili.adaptive_poll")
+    scheduler = adaptive_poll.scheduler
+
+    polls = 0
+
+    async def poll() -> bool:
+        nonlocal polls
+        polls += 1
+        return True
+
+    async def run() -> int:
+        if not scheduler.running:
+            scheduler.start()
+        poller = adaptive_poll.AdaptivePoller(
+            "job_poll_schedule_tz_check", poll, min_interval=1, max_interval=1, jitter=0
+        )
+        poller.start(delay=0)
+        await asyncio.sleep(args.seconds)
+        poller.stop()
+        scheduler.shutdown(wait=False)
+
+        expected = int(args.seconds) - 2
+        print(f"宿主机时区 {args.host_tz}，scheduler 时区 {scheduler.timezone}：{args.seconds:.0f} 秒内轮询 {polls} 次")
+        if polls < expected:
+            print(f"FAIL 轮询次数少于 {expected}，date 任务可能因时区被丢弃")
+            return 1
+        return 0
+
+    return asyncio.run(run())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
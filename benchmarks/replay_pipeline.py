@@ -0,0 +1,211 @@
+"""
+离线回放基准测试：轮询 → 解析 → 渲染 → 发送 全流程
+
+通过 bili_api_tape 回放录制的 get_dynamics_new / get_room_info 响应，不访问B站；
+发送由 RecordingBot 代替，只记录消息。未指定 --tape 时，以 fixtures/dynamics.json 为模板
+生成一盘磁带：每轮轮询出现 --per-round 条新动态，直播间在开播/下播之间切换。
+
+录制真实流量：在 .env 中设置 live_shiro_bili_tape_mode=record，
+磁带写入 live_shiro_bili_tape_path（默认 ./cache/bili_tape.jsonl.gz）。
+
+用法：
+    python benchmarks/replay_pipeline.py [--rounds 20] [--per-round 2] [--latency-scale 0]
+    python benchmarks/replay_pipeline.py --tape cache/bili_tape.jsonl.gz --latency-scale 1
+需要本地已安装 playwright 的 chromium（或在配置中为模板指定 pillow 后端）。
+"""
+import argparse
+import asyncio
+import copy
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from _bootstrap import load_plugin_module
+from template_regression import FIXTURES, percentile, serve_local_fixtures
+
+common = load_plugin_module("common")
+bili_common = load_plugin_module("bilibili.common")
+api_tape = load_plugin_module("bilibili.api_tape")
+dynamic = load_plugin_module("bilibili.dynamic")
+dynamic_state = load_plugin_module("bilibili.dynamic_state")
+dynamic_archive = load_plugin_module("bilibili.dynamic_archive")
+live_room = load_plugin_module("bilibili.live_room")
+subscription = load_plugin_module("bilibili.subscription")
+assets = load_plugin_module("message_render.assets")
+backend = load_plugin_module("message_render.backend")
+
+SYNTHETIC_UID = 1
+SYNTHETIC_ROOM_ID = 1
+
+
+class RecordingBot:
+    """代替 OneBot 连接，只记录发送的消息"""
+
+    def __init__(self) -> None:
+        self.sent: list[tuple[int, str]] = []
+
+    async def send_group_msg(self, group_id: int, message) -> None:
+        self.sent.append((group_id, str(message)))
+
+    async def send_private_msg(self, user_id: int, message) -> None:
+        self.sent.append((user_id, str(message)))
+
+
+def tape_line(api: str, key: str, latency_ms: int, response: dict) -> str:
+    return json.dumps(
+        {"api": api, "key": key, "latency_ms": latency_ms, "response": response},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+
+
+def build_synthetic_tape(path: Path, rounds: int, per_round: int, base_ts: int) -> None:
+    """
+    每轮轮询返回一页动态（最新的在前），比上一轮多 per_round 条发布时间晚于 base_ts 的新动态；
+    get_room_info 每 5 轮切换一次开播/下播。录制耗时取接近真实接口的 80~120 ms
+    """
+    templates = [
+        item for item in json.loads(FIXTURES.read_text(encoding="utf-8")).values()
+        if item["type"] != "DYNAMIC_TYPE_NONE"
+    ]
+    history: list[dict] = []
+    lines = []
+    for r in range(rounds):
+        for j in range(per_round):
+            index = r * per_round + j
+            item = copy.deepcopy(templates[index % len(templates)])
+            pub_ts = base_ts + index * 60 + 1
+            item["id_str"] = str(20_000_000 + index)
+            author = item["modules"]["module_author"]
+            author["pub_ts"] = pub_ts
+            # 每条卡片内容不同，避免命中渲染缓存
+            author["pub_time"] = datetime.fromtimestamp(pub_ts).strftime("%Y-%m-%d %H:%M:%S")  # noqa: DTZ006
+            history.insert(0, item)
+        page = {"items": history[:20], "has_more": 0, "offset": ""}
+        lines.append(tape_line("get_dynamics_new", f"{SYNTHETIC_UID}/", 80 + r % 5 * 10, page))
+        room_info = {
+            "room_info": {
+                "live_status": (r // 5) % 2,
+                "title": f"回放第 {r} 轮",
+                "description": "",
+                "cover": "https://i0.hdslb.com/bfs/live/cover.jpg",
+            }
+        }
+        lines.append(tape_line("get_room_info", str(SYNTHETIC_ROOM_ID), 60, room_info))
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+async def init_watermark(uid: int, watermark: int) -> None:
+    """第一次轮询之前设定水位线，之后的新动态都会被播报"""
+    await dynamic_state.load_watermark(uid)
+    async with common.get_db_connection(dynamic_state.DYNAMIC_STATE_DB_PATH) as db:
+        await db.execute("UPDATE dynamic_watermark SET pub_ts = ? WHERE uid = ?", (watermark, uid))
+        await db.commit()
+
+
+def first_page_watermark(tape, uid: int) -> int:
+    """真实磁带：以第一次录制的第二新的动态为水位线，第一轮只播报一条"""
+    page = tape.peek("get_dynamics_new", f"{uid}/") or {}
+    stamps = sorted(
+        (ts for item in page.get("items") or []
+         if (ts := item.get("modules", {}).get("module_author", {}).get("pub_ts"))),
+        reverse=True,
+    )
+    return int(stamps[1]) if len(stamps) > 1 else int(time.time())
+
+
+async def run(args) -> int:
+    tape = api_tape.bili_api_tape
+    workdir = Path(tempfile.mkdtemp(prefix="live_shiro_replay_"))
+    tape_path = args.tape.resolve() if args.tape else workdir / "tape.jsonl"
+    # 状态、归档、订阅数据库都写在临时目录的 ./cache 下
+    os.chdir(workdir)
+
+    if args.tape is None:
+        base_ts = int(time.time())
+        build_synthetic_tape(tape_path, args.rounds, args.per_round, base_ts)
+    tape.replay(tape_path, latency_scale=args.latency_scale)
+
+    uids = sorted({int(key.split("/")[0]) for key in tape.recorded("get_dynamics_new")})
+    rooms = list(tape.recorded("get_room_info"))
+    rounds = max([*tape.recorded("get_dynamics_new").values(), *tape.recorded("get_room_info").values(), 0])
+    if args.tape is None:
+        rounds = args.rounds
+
+    bot = RecordingBot()
+    # 回放不受请求预算限制，发送目标换成 RecordingBot
+    unlimited = bili_common.RequestBudget(10 ** 9)
+    dynamic.bili_request_budget = unlimited
+    live_room.bili_request_budget = unlimited
+    dynamic.get_bot = lambda: bot
+    if rooms:
+        live_room.plugin_config.live_shiro_bilibili_live_room_id = int(rooms[0])
+
+    await dynamic_state.init_db()
+    await dynamic_archive.init_db()
+    await subscription.init_db()
+    for uid in uids:
+        await init_watermark(uid, base_ts if args.tape is None else first_page_watermark(tape, uid))
+    subscriptions = {uid: [subscription.Subscription(uid, 10_000 + uid)] for uid in uids}
+
+    serve_local_fixtures()
+    if backend.uses_chromium():
+        browser = load_plugin_module("message_render.browser")
+        await browser.browser_manager.init_browser()
+
+    poll_ms, live_ms = [], []
+    announced = 0
+    start = time.perf_counter()
+    try:
+        for _ in range(rounds):
+            for uid in uids:
+                t = time.perf_counter()
+                announced += await dynamic.check_dynamics(uid, subscriptions[uid])
+                poll_ms.append((time.perf_counter() - t) * 1000)
+            if rooms:
+                t = time.perf_counter()
+                await live_room.check_live_status(bot)
+                live_ms.append((time.perf_counter() - t) * 1000)
+    finally:
+        if backend.uses_chromium():
+            await browser.browser_manager.close_browser()
+        await assets.asset_cache.close()
+    elapsed = time.perf_counter() - start
+
+    # 真实运行时两次轮询之间至少间隔 live_shiro_dynamic_poll_min_interval 秒
+    real_time = rounds * dynamic.plugin_config.live_shiro_dynamic_poll_min_interval
+    print(f"磁带 {tape_path}：{len(uids)} 个 uid，{len(rooms)} 个直播间，{rounds} 轮轮询")
+    if poll_ms:
+        print(
+            f"动态轮询 {len(poll_ms)} 次：p50 {statistics.median(poll_ms):7.1f} ms  "
+            f"p95 {percentile(poll_ms, 0.95):7.1f} ms，播报 {announced} 条新动态"
+        )
+    if live_ms:
+        print(f"直播状态 {len(live_ms)} 次：p50 {statistics.median(live_ms):7.1f} ms  p95 {percentile(live_ms, 0.95):7.1f} ms")
+    print(
+        f"共发送 {len(bot.sent)} 条消息，接口调用 {tape.calls} 次，注入延迟 {tape.injected_latency:.2f} s，"
+        f"总耗时 {elapsed:.2f} s（相当于真实时间 {real_time} s 的 {real_time / max(elapsed, 1e-9):.0f} 倍速）"
+    )
+    if args.dump:
+        for target, message in bot.sent:
+            print(f"--> {target}: {message[:120]!r}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tape", type=Path, help="录制的磁带，默认以 fixtures 生成")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--per-round", type=int, default=2)
+    parser.add_argument("--latency-scale", type=float, default=0.0, help="注入录制耗时的倍数，0 为不等待")
+    parser.add_argument("--dump", action="store_true", help="打印发送的消息")
+    return asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""
+模板回归测试：golden 图片比对 + 渲染耗时/体积报告
+
+把 fixtures/dynamics.json 中录制的动态依次用 parse_dynamic 解析，
+再通过 render_image_from_template 渲染（表格使用 /help 的指令表），然后：
+- 与 fixtures/golden/<用例>.png 做感知比对（允许少量像素因抗锯齿等原因不同）
+- 记录每个用例的 p50/p95 渲染耗时和输出大小，写入 JSON 报告
+- 指定 --baseline 时与上一次的报告比较，耗时或体积超出阈值视为回归
+
+图片请求不访问网络，由本脚本按 url 生成确定性的本地图片。
+存在不一致或回归时以非零状态码退出，可直接用于 CI。
+
+渲染结果取决于 chromium 版本和字体，golden 图片需要在固定的环境中生成（见 fixtures/golden/README.md），
+生成时的环境和允许的差异写入 fixtures/golden/manifest.json。比对时环境与 manifest 不一致、
+没有 golden 图片或缺少某个用例的 golden 图片，都视为失败。
+
+用法：
+    python benchmarks/template_regression.py --update-golden        # 生成/更新 golden 图片
+    python benchmarks/template_regression.py --baseline report.json # 比对并检查回归
+"""
+import argparse
+import asyncio
+import hashlib
+import importlib.metadata
+import json
+import statistics
+import sys
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image, ImageChops, ImageDraw
+
+from _bootstrap import load_plugin_module
+
+common = load_plugin_module("common")
+dynamic = load_plugin_module("bilibili.dynamic")
+dynamic_model = load_plugin_module("bilibili.dynamic_model")
+renderer = load_plugin_module("message_render.renderer")
+assets = load_plugin_module("message_render.assets")
+backend = load_plugin_module("message_render.backend")
+
+BENCH_DIR = Path(__file__).resolve().parent
+FIXTURES = BENCH_DIR / "fixtures" / "dynamics.json"
+GOLDEN_DIR = FIXTURES.parent / "golden"
+GOLDEN_MANIFEST = GOLDEN_DIR / "manifest.json"
+
+# 单个像素各通道差值之和超过该值才算不同
+PIXEL_THRESHOLD = 48
+# 允许不同的像素比例，生成 golden 时写入 manifest
+DEFAULT_TOLERANCE = 0.005
+
+
+def fixture_image(url: str) -> bytes:
+    """按 url 生成确定性的图片：固定的底色 + 对角线，尺寸与 B 站缩略图相近"""
+    digest = hashlib.sha256(url.encode("utf-8")).digest()
+    size = (300, 300) if "/face/" in url else (600, 338)
+    img = Image.new("RGB", size, tuple(digest[:3]))
+    draw = ImageDraw.Draw(img)
+    draw.line((0, 0, *size), fill=tuple(digest[3:6]), width=8)
+    draw.line((0, size[1], size[0], 0), fill=tuple(digest[6:9]), width=8)
+    buf = BytesIO()
+    img.save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+async def _fetch_fixture(url: str) -> Optional[tuple[bytes, str]]:
+    return fixture_image(url), "image/jpeg"
+
+
+def serve_local_fixtures() -> None:
+    """让资源缓存从本地生成图片，并使用临时目录，避免读到之前缓存的真实图片"""
+    assets.asset_cache.set_source(_fetch_fixture, Path(tempfile.mkdtemp(prefix="live_shiro_assets_")))
+
+
+async def render_environment() -> dict:
+    """影响渲染结果的环境：各模板使用的后端，使用 chromium 时还包括 playwright 和浏览器的版本"""
+    environment = {
+        "backends": {t.name: backend.get_backend(t).name for t in renderer.RenderPageType},
+    }
+    if backend.uses_chromium():
+        browser = load_plugin_module("message_render.browser")
+        environment["playwright"] = importlib.metadata.version("playwright")
+        environment["chromium"] = (await browser.browser_manager.get_browser()).version
+    return environment
+
+
+def build_card(parsed) -> dict:
+    """与播报时相同，把解析后的动态转换为普通动态卡片的模板数据"""
+    card = parsed.card_data()
+    if card is None:
+        raise ValueError(f"处理动态 {parsed.id_str} 失败")
+    return card
+
+
+async def render_case(item: Optional[dict]) -> tuple[str, bytes]:
+    """渲染一个用例，返回 (模板名, 图片内容)；item 为 None 时渲染指令表"""
+    if item is None:
+        image = await renderer.render_image_from_template(
+            renderer.RenderPageType.TABLE, common.help_table_data(), width=800, use_cache=False
+        )
+        return "table", image
+
+    parsed = dynamic_model.parse_dynamic(item)
+    if parsed.orig is not None:
+        card = build_card(parsed.orig)
+        card.pop("link", None)
+        forward_data = {
+            "user_name": parsed.author.name,
+            "avatar_url": parsed.author.face,
+            "time": parsed.author.pub_time,
+            "title": "转发了动态",
+            "content": parsed.text,
+        }
+        image = await dynamic.render_forward_dynamic(forward_data, card, use_cache=False)
+        return "forward", image
+
+    image = await renderer.render_image_from_template(
+        renderer.RenderPageType.NORMAL, build_card(parsed), width=400, use_cache=False
+    )
+    return "normal", image
+
+
+def percentile(samples: list[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def compare_golden(image: bytes, golden_path: Path) -> tuple[str, float]:
+    """返回 (状态, 不同像素比例)，状态为 match / mismatch / missing"""
+    if not golden_path.exists():
+        return "missing", 1.0
+    actual = Image.open(BytesIO(image)).convert("RGB")
+    expected = Image.open(golden_path).convert("RGB")
+    if actual.size != expected.size:
+        return "mismatch", 1.0
+    diff = ImageChops.difference(actual, expected)
+    # 三个通道差值相加后按阈值二值化，统计不同像素的数量
+    r, g, b = diff.split()
+    total = ImageChops.add(ImageChops.add(r, g), b)
+    changed = total.point(lambda v: 255 if v > PIXEL_THRESHOLD else 0).histogram()[255]
+    return "", changed / (actual.width * actual.height)
+
+
+def check_regressions(report: dict, baseline: dict, max_slowdown: float, max_growth: float) -> list[str]:
+    problems = []
+    for name, result in report["cases"].items():
+        old = baseline.get("cases", {}).get(name)
+        if old is None:
+            continue
+        if old["p95_ms"] > 0 and result["p95_ms"] > old["p95_ms"] * max_slowdown:
+            problems.append(f"{name}: p95 {old['p95_ms']:.1f} -> {result['p95_ms']:.1f} ms")
+        if old["bytes"] > 0 and result["bytes"] > old["bytes"] * max_growth:
+            problems.append(f"{name}: 大小 {old['bytes']} -> {result['bytes']} bytes")
+    return problems
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--report", type=Path, default=Path("template_report.json"))
+    parser.add_argument("--baseline", type=Path, help="上一次的报告，用于检查耗时和体积回归")
+    parser.add_argument("--update-golden", action="store_true", help="用本次渲染结果覆盖 golden 图片")
+    parser.add_argument("--tolerance", type=float, help="允许不同的像素比例，默认使用 manifest 中的值")
+    parser.add_argument("--max-slowdown", type=float, default=1.25, help="p95 耗时允许增长的倍数")
+    parser.add_argument("--max-growth", type=float, default=1.10, help="输出大小允许增长的倍数")
+    args = parser.parse_args()
+
+    serve_local_fixtures()
+    cases: dict[str, Optional[dict]] = json.loads(FIXTURES.read_text(encoding="utf-8"))
+    cases["help_table"] = None
+
+    manifest = {}
+    if not args.update_golden:
+        if not GOLDEN_MANIFEST.exists() or not any(GOLDEN_DIR.glob("*.png")):
+            print(f"FAIL {GOLDEN_DIR} 中没有 golden 图片，请按 {GOLDEN_DIR / 'README.md'} 生成")
+            return 1
+        manifest = json.loads(GOLDEN_MANIFEST.read_text(encoding="utf-8"))
+    tolerance = args.tolerance if args.tolerance is not None else manifest.get("tolerance", DEFAULT_TOLERANCE)
+
+    if backend.uses_chromium():
+        browser = load_plugin_module("message_render.browser")
+        await browser.browser_manager.init_browser()
+
+    environment = await render_environment()
+    if not args.update_golden and environment != manifest.get("environment"):
+        print(f"FAIL 渲染环境与生成 golden 时不同：当前 {environment}，golden {manifest.get('environment')}")
+        if backend.uses_chromium():
+            await browser.browser_manager.close_browser()
+        return 1
+
+    report = {"backends": {}, "cases": {}}
+    failures = []
+    try:
+        for name, item in cases.items():
+            # 第一次渲染包含页面创建和图片下载，不计入耗时
+            template, image = await render_case(item)
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                template, image = await render_case(item)
+                timings.append((time.perf_counter() - start) * 1000)
+
+            golden_path = GOLDEN_DIR / f"{name}.png"
+            if args.update_golden:
+                GOLDEN_DIR.mkdir(parents=True, exist_ok=True)
+                Image.open(BytesIO(image)).save(golden_path, format="PNG")
+                status, diff_ratio = "updated", 0.0
+            else:
+                status, diff_ratio = compare_golden(image, golden_path)
+                if not status:
+                    status = "match" if diff_ratio <= tolerance else "mismatch"
+                if status == "missing":
+                    failures.append(f"{name}: 缺少 golden 图片 {golden_path.name}，请用 --update-golden 生成")
+                elif status != "match":
+                    failures.append(f"{name}: golden {status} (不同像素 {diff_ratio:.2%})")
+
+            render_type = renderer.RenderPageType[template.upper()]
+            report["backends"][template] = backend.get_backend(render_type).name
+            report["cases"][name] = {
+                "template": template,
+                "p50_ms": statistics.median(timings),
+                "p95_ms": percentile(timings, 0.95),
+                "bytes": len(image),
+                "golden": status,
+                "diff_ratio": diff_ratio,
+            }
+            print(
+                f"{name:>12} {template:>8} p50 {report['cases'][name]['p50_ms']:7.1f} ms "
+                f"p95 {report['cases'][name]['p95_ms']:7.1f} ms {len(image):>8} bytes  {status}"
+            )
+    finally:
+        if backend.uses_chromium():
+            await browser.browser_manager.close_browser()
+        await assets.asset_cache.close()
+
+    if args.update_golden:
+        manifest = {"environment": environment, "tolerance": tolerance, "pixel_threshold": PIXEL_THRESHOLD}
+        GOLDEN_MANIFEST.write_text(json.dumps(manifest, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"golden 生成环境已写入 {GOLDEN_MANIFEST}")
+
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        failures.extend(check_regressions(report, baseline, args.max_slowdown, args.max_growth))
+
+    args.report.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"报告已写入 {args.report}")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,75 @@
+"""
+模板解析与渲染微基准：每次 get_template + render vs 预编译模板 + render_async
+
+用法：python benchmarks/template_render.py [--repeat 2000]
+"""
+import argparse
+import asyncio
+import time
+
+from jinja2 import Environment, FileSystemLoader
+
+from _bootstrap import load_plugin_module
+
+templating = load_plugin_module("message_render.templating")
+page_type = load_plugin_module("message_render.page_type")
+
+SAMPLES = {
+    "NORMAL": {
+        "user_name": "Shiro",
+        "avatar_url": "https://i0.hdslb.com/bfs/face/avatar.jpg",
+        "time": "2025-01-01 20:00",
+        "title": "发布了一条 [图片] 动态喵！",
+        "link": "https://t.bilibili.com/1",
+        "content": "今天的直播辛苦大家了！\n下次见喵~" * 5,
+        "image_urls": [f"https://i0.hdslb.com/bfs/new_dyn/{i}.jpg" for i in range(9)],
+    },
+    "TABLE": {
+        "title": "小助手指令列表",
+        "headers": ["前置条件", "指令格式", "功能说明"],
+        "rows": [["/", f"@小助手 /cmd{i}", "说明"] for i in range(10)],
+    },
+}
+
+
+def bench_cold(name: str, data: dict, repeat: int) -> float:
+    """旧方式：普通 Environment，每次渲染都 get_template（含 auto_reload 的文件检查）"""
+    env = Environment(loader=FileSystemLoader(templating.templates_dir))
+    env.globals.update(templating.env.globals)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        env.get_template(name).render(data)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+async def bench_bundle(render_type, data: dict, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        await templating.render_template(render_type, data)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def bench_first_compile(name: str) -> float:
+    """无字节码缓存时首次编译一个模板的耗时"""
+    env = Environment(loader=FileSystemLoader(templating.templates_dir))
+    start = time.perf_counter()
+    env.get_template(name)
+    return (time.perf_counter() - start) * 1e6
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'template':>10} {'compile(us)':>12} {'get+render(us)':>15} {'bundle(us)':>11}")
+    for type_name, data in SAMPLES.items():
+        render_type = page_type.RenderPageType[type_name]
+        compile_us = bench_first_compile(render_type.value)
+        cold = bench_cold(render_type.value, data, args.repeat)
+        warm = await bench_bundle(render_type, data, args.repeat)
+        print(f"{type_name:>10} {compile_us:>12.0f} {cold:>15.1f} {warm:>11.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
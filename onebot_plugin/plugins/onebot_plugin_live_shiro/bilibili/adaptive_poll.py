@@ -0,0 +1,157 @@
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Iterable, Optional
+from zoneinfo import ZoneInfo
+
+from nonebot import logger
+from nonebot_plugin_apscheduler import scheduler
+
+BEIJING_TZ = ZoneInfo("Asia/Shanghai")  # 北京时间
+
+
+class ActivityHours:
+    """
+    从历史动态/开播时间统计出的活跃时段（北京时间的小时）
+
+    某个小时连同前后各一小时的发布次数明显高于平均水平时视为活跃时段
+    """
+
+    def __init__(self, min_samples: int = 10, threshold: float = 1.5) -> None:
+        self._counts = [0] * 24
+        self._min_samples = min_samples
+        self._threshold = threshold
+
+    @staticmethod
+    def _hour(ts: float) -> int:
+        return datetime.fromtimestamp(ts, BEIJING_TZ).hour
+
+    def observe(self, ts: float) -> None:
+        self._counts[self._hour(ts)] += 1
+
+    def observe_many(self, timestamps: Iterable[float]) -> None:
+        for ts in timestamps:
+            self.observe(ts)
+
+    def is_active(self, ts: float) -> bool:
+        total = sum(self._counts)
+        if total < self._min_samples:
+            return False
+        hour = self._hour(ts)
+        window = sum(self._counts[(hour + offset) % 24] for offset in (-1, 0, 1))
+        return window >= total * 3 / 24 * self._threshold
+
+    def active_hours(self) -> list[int]:
+        now = datetime.now(BEIJING_TZ).replace(minute=30, second=0, microsecond=0)
+        return [hour for hour in range(24) if self.is_active(now.replace(hour=hour).timestamp())]
+
+
+def next_run_date(delay: float) -> datetime:
+    """
+    delay 秒之后的时间，带 scheduler 的时区
+
+    scheduler 使用 Asia/Shanghai，naive 的本地时间会被当作该时区解释，
+    宿主机时区不同时 date 任务会被判定为错过而丢弃，轮询从此停止
+    """
+    return datetime.now(scheduler.timezone) + timedelta(seconds=delay)
+
+
+# 动态和直播状态共用，Shiro 开播时通常也会发一条开播动态
+activity_hours = ActivityHours()
+
+
+class AdaptivePoller:
+    """
+    自适应间隔的轮询任务
+
+    每次轮询结束后根据结果决定下一次的间隔，通过 apscheduler 的 date 任务调度：
+    - 有新动态、开播或正在直播：恢复到最小间隔，并在 hot_window 秒内保持最小间隔
+    - 处于活跃时段：间隔不超过最小间隔的两倍
+    - 没有动静：间隔按 backoff 倍数增长，直到最大间隔
+    - 接口出错：同样按 backoff 倍数退避
+    poll 返回 True 表示发现了需要加快轮询的活动
+    """
+
+    def __init__(
+        self,
+        job_id: str,
+        poll: Callable[[], Awaitable[bool]],
+        min_interval: float,
+        max_interval: float,
+        hours: Optional[ActivityHours] = None,
+        backoff: float = 2.0,
+        hot_window: float = 1800,
+        jitter: float = 0.1,
+    ) -> None:
+        self.job_id = job_id
+        self._poll = poll
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self._hours = hours or activity_hours
+        self._backoff = backoff
+        self._hot_window = hot_window
+        self._jitter = jitter
+        self.interval = min_interval
+        self.last_activity = 0.0
+        self.polls = 0
+        self.errors = 0
+
+    def start(self, delay: Optional[float] = None) -> None:
+        self._schedule(self.min_interval if delay is None else delay)
+
+    def set_intervals(self, min_interval: float, max_interval: float) -> None:
+        """调整间隔范围，在下一次轮询后生效"""
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.interval = min(max(self.interval, self.min_interval), self.max_interval)
+
+    def stop(self) -> None:
+        if scheduler.get_job(self.job_id):
+            scheduler.remove_job(self.job_id)
+
+    def _schedule(self, delay: float) -> None:
+        delay *= random.uniform(1 - self._jitter, 1 + self._jitter)
+        scheduler.add_job(
+            self._run,
+            "date",
+            run_date=next_run_date(delay),
+            id=self.job_id,
+            replace_existing=True,
+        )
+
+    async def _run(self) -> None:
+        self.polls += 1
+        started = time.monotonic()
+        error = False
+        active = False
+        try:
+            active = await self._poll()
+        except Exception as e:
+            self.errors += 1
+            error = True
+            logger.warning(f"轮询任务 {self.job_id} 失败: {e}")
+        self.interval = self.next_interval(active, error)
+        logger.debug(f"轮询任务 {self.job_id} 下次间隔 {self.interval:.0f} 秒")
+        # 间隔从本次轮询开始时算起，轮询本身耗时较长时不会拉长周期
+        self._schedule(max(1.0, self.interval - (time.monotonic() - started)))
+
+    def next_interval(self, active: bool, error: bool, now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        if error:
+            return min(self.max_interval, max(self.interval, self.min_interval) * self._backoff)
+        if active:
+            self.last_activity = now
+        if now - self.last_activity < self._hot_window:
+            return self.min_interval
+        backed_off = min(self.max_interval, self.interval * self._backoff)
+        if self._hours.is_active(now):
+            return min(backed_off, self.min_interval * 2)
+        return backed_off
+
+    def stats(self) -> dict:
+        return {
+            "interval": self.interval,
+            "polls": self.polls,
+            "errors": self.errors,
+            "active_hours": self._hours.active_hours(),
+        }
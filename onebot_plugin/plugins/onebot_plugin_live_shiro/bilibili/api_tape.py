@@ -0,0 +1,195 @@
+import asyncio
+import gzip
+import json
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+from nonebot import get_driver, get_plugin_config, logger
+
+from ..config import Config
+
+plugin_config = get_plugin_config(Config)
+
+# 录制的内容先缓存在内存中，最多每隔这么多秒写入一次磁带
+FLUSH_INTERVAL = 1.0
+
+
+class TapeMiss(LookupError):
+    """回放时磁带中没有对应请求的录制"""
+
+
+def open_tape(path: Path, mode: str):
+    """.gz 结尾的磁带使用 gzip 压缩，每次录制追加一个新的 gzip 成员，读取时会自动拼接"""
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return path.open(mode, encoding="utf-8")
+
+
+class ApiTape:
+    """
+    B 站接口的录制/回放
+
+    磁带为 JSON Lines，每行一次调用：
+        {"api": "get_dynamics_new", "key": "<uid>/<offset>", "latency_ms": 85, "response": {...}}
+    - record：照常请求接口，并把响应和耗时追加到磁带
+    - replay：不访问网络，按 (api, key) 依次返回录制的响应，录制的用完后一直返回最后一个；
+      返回前等待录制的耗时 × latency_scale，latency_scale 为 0 时不等待
+    - off：直接请求接口
+
+    直播间推送的事件也可以录制到同一盘磁带，此时 latency_ms 为与上一个事件的间隔。
+    录制的响应和事件先缓存在内存中，每 FLUSH_INTERVAL 秒在线程中写入一次，不阻塞事件循环；
+    磁带在整个录制期间保持打开，close() 时关闭
+    """
+
+    def __init__(self) -> None:
+        self.mode = "off"
+        self.path: Optional[Path] = None
+        self.latency_scale = 1.0
+        self._responses: dict[tuple[str, str], list[tuple[float, str]]] = {}
+        self._cursors: dict[tuple[str, str], int] = defaultdict(int)
+        self._last_event: dict[tuple[str, str], float] = {}
+        self._pending: list[str] = []
+        self._flushed = time.monotonic()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._writer = None
+        self.calls = 0
+        self.injected_latency = 0.0
+
+    def record(self, path) -> None:
+        self.mode = "record"
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        logger.info(f"开始录制B站接口响应到 {self.path}")
+
+    def replay(self, path, latency_scale: float = 1.0) -> None:
+        self.mode = "replay"
+        self.path = Path(path)
+        self.latency_scale = latency_scale
+        responses = defaultdict(list)
+        with open_tape(self.path, "r") as f:
+            try:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    # 保留 JSON 文本，每次回放重新解析，调用方修改返回值不会影响之后的回放
+                    responses[(entry["api"], entry["key"])].append(
+                        (entry.get("latency_ms", 0) / 1000, json.dumps(entry["response"], ensure_ascii=False))
+                    )
+            except (EOFError, json.JSONDecodeError):
+                # 录制进程没有正常退出时，最后一个 gzip 成员不完整，已写入的内容仍然可以回放
+                logger.warning(f"磁带 {self.path} 没有正常结束，只回放已完整写入的部分")
+        self._responses = dict(responses)
+        self._cursors.clear()
+        self.calls = 0
+        self.injected_latency = 0.0
+        logger.info(f"从 {self.path} 回放B站接口响应，共 {sum(map(len, responses.values()))} 条")
+
+    def off(self) -> None:
+        self.mode = "off"
+
+    def recorded(self, api: str) -> dict[str, int]:
+        """回放模式下 api 录制的所有 key 及其响应数量"""
+        return {key: len(entries) for (name, key), entries in self._responses.items() if name == api}
+
+    def peek(self, api: str, key: str, index: int = 0) -> Optional[dict]:
+        """读取回放磁带中的某个响应，不影响回放进度"""
+        entries = self._responses.get((api, key))
+        if not entries:
+            return None
+        return json.loads(entries[min(index, len(entries) - 1)][1])
+
+    def events(self, api: str, key: str) -> list[tuple[float, dict]]:
+        """回放模式下录制的推送事件，返回 [(与上一个事件的间隔秒数, 事件)]"""
+        return [(latency, json.loads(event)) for latency, event in self._responses.get((api, key), [])]
+
+    def record_event(self, api: str, key: str, event: dict) -> None:
+        """录制模式下记录一个推送事件"""
+        if self.mode != "record":
+            return
+        now = time.monotonic()
+        gap_ms = (now - self._last_event.get((api, key), now)) * 1000
+        self._last_event[(api, key)] = now
+        self._enqueue(self._line(api, key, gap_ms, event))
+
+    async def flush(self) -> None:
+        """等待缓存的内容全部写入磁带，所有写入都经过 _flush_loop，保证同一时间只有一个写入"""
+        while self._pending or (self._flush_task is not None and not self._flush_task.done()):
+            if self._flush_task is None or self._flush_task.done():
+                self._flush_task = asyncio.create_task(self._flush_loop())
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+
+    async def close(self) -> None:
+        """写入缓存的内容并关闭磁带"""
+        await self.flush()
+        if self._writer is not None:
+            writer, self._writer = self._writer, None
+            await asyncio.to_thread(writer.close)
+
+    async def call(self, api: str, key: str, fetch: Callable[[], Awaitable[dict]]) -> dict:
+        self.calls += 1
+        if self.mode == "replay":
+            return await self._replay(api, key)
+
+        start = time.perf_counter()
+        response = await fetch()
+        if self.mode == "record":
+            self._enqueue(self._line(api, key, (time.perf_counter() - start) * 1000, response))
+        return response
+
+    async def _replay(self, api: str, key: str) -> dict:
+        entries = self._responses.get((api, key))
+        if not entries:
+            raise TapeMiss(f"磁带中没有 {api} {key} 的录制")
+        cursor = self._cursors[(api, key)]
+        self._cursors[(api, key)] = cursor + 1
+        latency, response = entries[min(cursor, len(entries) - 1)]
+        if self.latency_scale > 0 and latency > 0:
+            delay = latency * self.latency_scale
+            self.injected_latency += delay
+            await asyncio.sleep(delay)
+        return json.loads(response)
+
+    @staticmethod
+    def _line(api: str, key: str, latency_ms: float, response: dict) -> str:
+        return json.dumps(
+            {"api": api, "key": key, "latency_ms": round(latency_ms), "response": response},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+
+    def _enqueue(self, line: str) -> None:
+        self._pending.append(line)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        while self._pending:
+            await asyncio.sleep(max(0.0, FLUSH_INTERVAL - (time.monotonic() - self._flushed)))
+            lines, self._pending = self._pending, []
+            self._flushed = time.monotonic()
+            await asyncio.to_thread(self._write, lines)
+
+    def _write(self, lines: list[str]) -> None:
+        """在线程中执行，只由 _flush_loop 调用"""
+        try:
+            if self._writer is None:
+                self._writer = open_tape(self.path, "a")
+            self._writer.write("".join(line + "\n" for line in lines))
+            self._writer.flush()
+        except OSError as e:
+            logger.warning(f"录制B站接口响应失败: {e}")
+
+
+bili_api_tape = ApiTape()
+if plugin_config.live_shiro_bili_tape_mode == "record":
+    bili_api_tape.record(plugin_config.live_shiro_bili_tape_path)
+elif plugin_config.live_shiro_bili_tape_mode == "replay":
+    bili_api_tape.replay(plugin_config.live_shiro_bili_tape_path, plugin_config.live_shiro_bili_tape_latency_scale)
+
+
+@get_driver().on_shutdown
+async def _close_tape():
+    await bili_api_tape.close()
@@ -1,11 +1,12 @@
 import json
+import time
 import base64
 import asyncio
 
 from pathlib import Path
 
 from typing import Optional
-from nonebot import on_command, get_driver, logger
+from nonebot import on_command, get_driver, get_plugin_config, logger
 from nonebot.rule import to_me
 from nonebot.permission import SUPERUSER
 from nonebot.adapters import Bot
@@ -13,9 +14,45 @@ from nonebot.adapters.onebot.v11 import Message, MessageSegment
 from bilibili_api import Credential, login_v2
 from nonebot_plugin_apscheduler import scheduler
 
+from ..config import Config
+
 bili_credential = Credential()
 
 driver = get_driver()
+plugin_config = get_plugin_config(Config)
+
+
+class RequestBudget:
+    """
+    B 站接口的全局请求预算（令牌桶）
+
+    所有轮询任务共用，每分钟最多发出 requests_per_minute 个请求，
+    超出时 acquire 会等待，避免订阅的 UP 主变多后集中请求触发风控（412）
+    """
+
+    def __init__(self, requests_per_minute: int) -> None:
+        self._rate = max(1, requests_per_minute) / 60
+        self._capacity = max(1, requests_per_minute)
+        self._tokens = float(self._capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.waited = 0.0
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+            if self._tokens < 1:
+                delay = (1 - self._tokens) / self._rate
+                self.waited += delay
+                await asyncio.sleep(delay)
+                self._tokens = 1.0
+                self._updated = time.monotonic()
+            self._tokens -= 1
+
+
+bili_request_budget = RequestBudget(plugin_config.live_shiro_bili_requests_per_minute)
 
 def build_bytes_image(img_bytes: bytes) -> MessageSegment:
     # 将bytes转换为base64字符串
@@ -180,4 +217,4 @@ bili_check_credential_command = on_command("bili_check_credential", rule=to_me()
 async def _(bot: Bot):
     await check_bili_credential_validity(bot)
 
-__all__ = ["bili_credential"]
\ No newline at end of file
+__all__ = ["bili_credential", "bili_request_budget"]
\ No newline at end of file
@@ -0,0 +1,280 @@
+import math
+import re
+import time
+from collections import deque
+from typing import Hashable, Optional
+
+from nonebot import get_plugin_config, logger, on_command
+from nonebot.rule import to_me
+
+from ..config import Config
+
+plugin_config = get_plugin_config(Config)
+
+# 弹幕中的文字表情，例如 [dog]、[妙啊]
+INLINE_EMOTE_PATTERN = re.compile(r"\[[^\[\]\s]{1,12}\]")
+# 连续重复超过 3 次的字符折叠为 3 个，"哈哈哈哈哈" 与 "哈哈哈" 计为同一个热词
+REPEAT_PATTERN = re.compile(r"(.)\1{3,}")
+# 超过该长度的弹幕不参与热词统计，热词通常是短的刷屏弹幕
+KEYWORD_MAX_LENGTH = 16
+
+# 金瓜子与人民币的换算
+GOLD_PER_YUAN = 1000
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix64(x: int) -> int:
+    """splitmix64 的最后一步，把 hash() 的结果打散成均匀的 64 位整数（小整数的 hash 是其本身）"""
+    x &= _MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
+
+
+class TopCounter:
+    """
+    Misra-Gries 频繁项统计：最多保留 capacity 个计数器，内存与弹幕数量无关
+
+    计数器满时所有计数减 1 并移除归零的项，每条弹幕均摊 O(1)；
+    出现次数超过总数 1/capacity 的项一定会被保留，计数为下界
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.counts: dict[str, int] = {}
+
+    def add(self, key: str) -> None:
+        counts = self.counts
+        if key in counts:
+            counts[key] += 1
+        elif len(counts) < self.capacity:
+            counts[key] = 1
+        else:
+            for k in list(counts):
+                if counts[k] == 1:
+                    del counts[k]
+                else:
+                    counts[k] -= 1
+
+    def top(self, n: int) -> list[tuple[str, int]]:
+        return sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:n]
+
+
+class UniqueCounter:
+    """
+    HyperLogLog 基数估计，2^precision 个寄存器，precision=12 时误差约 1.6%
+
+    使用内置的 hash()，字符串的 hash 每个进程不同，但只用于计数，不影响结果
+    """
+
+    def __init__(self, precision: int = 12) -> None:
+        self._p = precision
+        self._m = 1 << precision
+        self._registers = bytearray(self._m)
+
+    def add(self, key: Hashable) -> None:
+        h = _mix64(hash(key))
+        index = h >> (64 - self._p)
+        rest = h & ((1 << (64 - self._p)) - 1)
+        rank = (64 - self._p) - rest.bit_length() + 1
+        if rank > self._registers[index]:
+            self._registers[index] = rank
+
+    def count(self) -> int:
+        m = self._m
+        estimate = (0.7213 / (1 + 1.079 / m)) * m * m / sum(2.0 ** -r for r in self._registers)
+        zeros = self._registers.count(0)
+        # 数量较少时使用线性计数
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+
+class RateWindow:
+    """
+    最近 60 秒的逐秒计数，用于统计每分钟弹幕数及其峰值
+
+    add 和 per_minute 的时间需要来自同一个时钟，DanmakuStats 统一使用弹幕的服务器时间
+    """
+
+    def __init__(self, seconds: int = 60) -> None:
+        self._buckets = [0] * seconds
+        self._second: Optional[int] = None
+        self.total = 0
+        self.peak = 0
+
+    def _advance(self, second: int) -> None:
+        if self._second is None:
+            self._second = second
+            return
+        if second <= self._second:
+            return
+        size = len(self._buckets)
+        for s in range(self._second + 1, min(second, self._second + size) + 1):
+            self.total -= self._buckets[s % size]
+            self._buckets[s % size] = 0
+        self._second = second
+
+    def add(self, ts: float) -> None:
+        second = int(ts)
+        self._advance(second)
+        # 乱序到达的旧弹幕计入当前秒
+        self._buckets[self._second % len(self._buckets)] += 1
+        self.total += 1
+        if self.total > self.peak:
+            self.peak = self.total
+
+    def per_minute(self, now: float) -> int:
+        self._advance(int(now))
+        return self.total
+
+
+class DanmakuStats:
+    """
+    一场直播的弹幕统计
+
+    弹幕、礼物、SC 由推送帧直接送入 ingest，逐条增量更新统计，不保存全部弹幕；
+    最近的弹幕保存在长度为 live_shiro_danmaku_buffer_size 的环形缓冲中，超出时丢弃最旧的。
+    所有时间都是服务器时间；started 为空时取本地时间，收到第一条带时间戳的弹幕后换算为服务器时间
+    """
+
+    def __init__(self, buffer_size: int, top_capacity: int = 256, started: Optional[float] = None) -> None:
+        self.recent: deque[tuple[float, Optional[int], str]] = deque(maxlen=buffer_size)
+        self.started = time.time() if started is None else started
+        self.last_ts = self.started
+        # 服务器时间与本地时间之差，没有新弹幕时据此推算当前的服务器时间
+        self.clock_offset = 0.0
+        # started 由调用方给出时已经是服务器时间，不需要换算
+        self._clock_synced = started is not None
+        self.messages = 0
+        self.rate = RateWindow()
+        self.chatters = UniqueCounter()
+        self.keywords = TopCounter(top_capacity)
+        self.emotes = TopCounter(top_capacity)
+        self.gifts = 0
+        self.gift_gold = 0
+        self.super_chats = 0
+        self.super_chat_yuan = 0
+        self.guards = 0
+
+    def ingest(self, event: dict) -> None:
+        """处理一帧推送事件，非弹幕/礼物/SC 的帧直接忽略"""
+        kind = event.get("type", "")
+        data = event.get("data") or {}
+        if kind.startswith("DANMU_MSG"):
+            self._ingest_danmaku(data.get("info") or [])
+        elif kind == "SEND_GIFT":
+            gift = data.get("data") or {}
+            self.gifts += gift.get("num", 1)
+            if gift.get("coin_type") == "gold":
+                self.gift_gold += gift.get("total_coin", 0)
+        elif kind == "SUPER_CHAT_MESSAGE":
+            self.super_chats += 1
+            self.super_chat_yuan += (data.get("data") or {}).get("price", 0)
+        elif kind == "GUARD_BUY":
+            guard = data.get("data") or {}
+            self.guards += guard.get("num", 1)
+            self.gift_gold += guard.get("price", 0) * guard.get("num", 1)
+
+    def _ingest_danmaku(self, info: list) -> None:
+        if len(info) < 3:
+            return
+        meta, text, user = info[0], info[1], info[2]
+        if not isinstance(text, str):
+            return
+        now = time.time()
+        if len(meta) > 4 and isinstance(meta[4], (int, float)):
+            ts = meta[4] / 1000
+            self.clock_offset = ts - now
+            if not self._clock_synced:
+                self._clock_synced = True
+                self.started += self.clock_offset
+                self.last_ts += self.clock_offset
+        else:
+            ts = now + self.clock_offset
+        uid = user[0] if user else None
+
+        self.messages += 1
+        self.last_ts = max(self.last_ts, ts)
+        self.recent.append((ts, uid, text))
+        self.rate.add(ts)
+        if uid is not None:
+            self.chatters.add(uid)
+
+        # 表情包弹幕（dm_type 为 1）整条是一个表情
+        emoticon = meta[13] if len(meta) > 13 else None
+        if isinstance(emoticon, dict) and emoticon.get("emoticon_unique"):
+            self.emotes.add(text)
+            return
+        # 大部分弹幕不含表情，跳过正则；含表情时在同一次替换中收集表情
+        stripped = text
+        if "[" in text:
+            emotes = self.emotes
+            stripped = INLINE_EMOTE_PATTERN.sub(lambda m: emotes.add(m.group()) or "", text)
+        keyword = REPEAT_PATTERN.sub(r"\1\1\1", stripped).strip()
+        if keyword and len(keyword) <= KEYWORD_MAX_LENGTH:
+            self.keywords.add(keyword)
+
+    def per_minute(self) -> int:
+        """最近一分钟的弹幕数，按服务器时间计算"""
+        return self.rate.per_minute(time.time() + self.clock_offset)
+
+    def close(self, now: Optional[float] = None) -> None:
+        """下播时调用，直播时长算到下播为止，now 为服务器时间"""
+        self.last_ts = max(self.last_ts, time.time() + self.clock_offset if now is None else now)
+
+    def summary(self, top: int = 5) -> str:
+        """下播时附在播报后的统计摘要"""
+        minutes = max(0, int(self.last_ts - self.started) // 60)
+        lines = [
+            f"本场共 {self.messages} 条弹幕（峰值 {self.rate.peak} 条/分钟），"
+            f"约 {self.chatters.count()} 人发言，直播约 {minutes // 60} 小时 {minutes % 60} 分钟"
+        ]
+        if keywords := self.keywords.top(top):
+            lines.append("热词：" + "、".join(f"{k} ×{n}" for k, n in keywords))
+        if emotes := self.emotes.top(top):
+            lines.append("表情：" + "、".join(f"{k} ×{n}" for k, n in emotes))
+        if self.gifts or self.super_chats or self.guards:
+            lines.append(
+                f"礼物 {self.gifts} 个，SC {self.super_chats} 条，上舰 {self.guards} 次，"
+                f"合计约 ¥{self.gift_gold / GOLD_PER_YUAN + self.super_chat_yuan:.1f}"
+            )
+        return "\n".join(lines)
+
+
+class DanmakuCollector:
+    """开播时开始一场统计，下播时结束并给出摘要；不在直播时收到的帧不统计"""
+
+    def __init__(self) -> None:
+        self.session: Optional[DanmakuStats] = None
+
+    def start_session(self) -> None:
+        self.session = DanmakuStats(plugin_config.live_shiro_danmaku_buffer_size)
+        logger.info("开始统计本场直播的弹幕")
+
+    def finish_session(self) -> Optional[str]:
+        session, self.session = self.session, None
+        if session is None or session.messages == 0:
+            return None
+        session.close()
+        return session.summary()
+
+    def ingest(self, event: dict) -> None:
+        if self.session is not None:
+            self.session.ingest(event)
+
+
+danmaku_collector = DanmakuCollector()
+
+
+danmaku_stats_command = on_command("danmaku_stats", rule=to_me())
+
+@danmaku_stats_command.handle()
+async def _():
+    session = danmaku_collector.session
+    if session is None:
+        await danmaku_stats_command.finish("现在没有在直播，没有弹幕统计喵~")
+    await danmaku_stats_command.finish(
+        f"最近一分钟 {session.per_minute()} 条弹幕\n" + session.summary()
+    )
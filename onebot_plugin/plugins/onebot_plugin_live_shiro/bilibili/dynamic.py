@@ -1,9 +1,10 @@
-import json
+import asyncio
+import random
 import time
 from PIL import Image
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Collection, Optional
 from io import BytesIO
 
 from bilibili_api import user
@@ -14,15 +15,20 @@ from nonebot.adapters.onebot.v11 import Message, MessageSegment
 from nonebot_plugin_apscheduler import scheduler
 
 from ..config import Config
-from .dynamic_type import DynamicType, MajorType
+from .dynamic_model import Dynamic, parse_dynamic, process_jump_url
+from .dynamic_type import DynamicType
 from ..message_render import *
-from .common import bili_credential
+from ..message_render.assets import asset_cache
+from ..message_render.worker import run_in_worker
+from . import dynamic_archive, dynamic_state, subscription
+from .adaptive_poll import AdaptivePoller, activity_hours
+from .api_tape import bili_api_tape
+from .common import bili_credential, bili_request_budget
+from .subscription import Subscription
 
 driver_config = get_driver().config
 plugin_config = get_plugin_config(Config)
 
-last_dynamic_timestamp: int = int(time.time())
-
 def image_bytes_to_data_url(img_bytes: bytes) -> str:
     img = Image.open(BytesIO(img_bytes))
     img_type = img.format.lower()  # 'png', 'jpeg', 'gif', etc.
@@ -32,54 +38,96 @@ def image_bytes_to_data_url(img_bytes: bytes) -> str:
     b64 = base64.b64encode(img_bytes).decode("ascii")
     return f"data:image/{img_type};base64,{b64}"
 
-async def fetch_all_dynamics() -> list[dict]:
+async def render_forward_dynamic(
+    forward_data: dict,
+    forwarded_card: dict,
+    single_pass: bool = True,
+    use_cache: bool = True,
+    priority: RenderPriority = RenderPriority.BROADCAST,
+) -> bytes:
+    """
+    渲染转发动态卡片
+
+    single_pass 为 True 时，被转发的动态作为模板片段直接内联到转发卡片中，只渲染一次；
+    否则先把被转发的动态渲染成 PNG，再以 data URL 嵌入转发卡片（旧流程，保留用于对比）
+    """
+    if single_pass:
+        forward_data["forwarded_card"] = forwarded_card
+    else:
+        card_image = await render_image_from_template(
+            RenderPageType.NORMAL, forwarded_card, width=400, use_cache=use_cache, priority=priority
+        )
+        forward_data["forwarded_card_url"] = await run_in_worker(image_bytes_to_data_url, card_image)
+
+    return await render_image_from_template(
+        RenderPageType.FORWARD, forward_data, width=600, use_cache=use_cache, priority=priority
+    )
+
+async def archive_page(uid: int, raw_items: list[dict], items: list[Dynamic]) -> None:
+    """把拉取到的一页动态写入归档，归档失败不影响播报"""
+    try:
+        if archived := await dynamic_archive.archive_dynamics(uid, raw_items, items):
+            logger.info(f"已归档 uid {uid} 的 {archived} 条新动态")
+    except Exception as e:
+        logger.warning(f"归档动态失败: {e}")
+
+async def fetch_dynamics(uid: int, watermark: Optional[int] = None) -> tuple[list[Dynamic], int]:
     """
-    查询指定uid用户的所有动态
+    查询指定uid用户的动态，返回 (动态列表, 拉取的页数)
+
+    动态按发布时间倒序分页返回，传入 watermark 时拉取到包含不晚于水位线的动态的那一页即停止，
+    通常只需要一页；watermark 为 None 时拉取全部历史动态（用于补录）。
     """
 
     next_offset = ""
     dynamics = []
+    pages = 0
 
-    bili_user = user.User(plugin_config.live_shiro_uid, credential = bili_credential)
+    bili_user = user.User(uid, credential = bili_credential)
 
     while True:
-        page = await bili_user.get_dynamics_new(next_offset)
-        dynamics.extend(page["items"])
+        await bili_request_budget.acquire()
+        page = await bili_api_tape.call(
+            "get_dynamics_new", f"{uid}/{next_offset}", lambda: bili_user.get_dynamics_new(next_offset)
+        )
+        pages += 1
+        raw_items = page.get("items") or []
+        items = [parse_dynamic(item) for item in raw_items]
+        dynamics.extend(items)
+        await archive_page(uid, raw_items, items)
 
         if page["has_more"] != 1:
             break
+        # 置顶动态总是出现在第一页最前面，发布时间可能早于水位线
+        if watermark is not None and any(
+            item.pub_ts is not None and item.pub_ts <= watermark
+            for item in items
+            if not item.is_pinned
+        ):
+            break
         next_offset = page["offset"]
 
-    return dynamics
+    return dynamics, pages
 
-def get_last_dynamic(dynamics: list[dict]) -> Optional[dict]:
+async def fetch_all_dynamics(uid: Optional[int] = None) -> list[Dynamic]:
     """
-    返回 dynamics 中最新的一条动态
-    如果没有有效动态，返回 None
+    查询指定uid用户的所有动态，默认为 Shiro
     """
 
-    temp = []
-    for item in dynamics:
-        modules = item.get("modules", {})
-        author = modules.get("module_author", {})
-        pub_ts = author.get("pub_ts")
-        dynamic_type = item.get("type", "")
-
-        if dynamic_type == DynamicType.NONE.type_name:
-            continue
-
-        try:
-            pub_ts = int(pub_ts)
-        except (TypeError, ValueError):
-            continue
+    dynamics, pages = await fetch_dynamics(uid or plugin_config.live_shiro_uid)
+    logger.info(f"已拉取全部动态，共 {pages} 页")
+    return dynamics
 
-        temp.append((pub_ts, item))
+def is_valid_dynamic(item: Dynamic) -> bool:
+    return item.dynamic_type != DynamicType.NONE and item.pub_ts is not None
 
-    if not temp:
-        return None
+def get_last_dynamic(dynamics: list[Dynamic]) -> Optional[Dynamic]:
+    """
+    返回 dynamics 中最新的一条动态
+    如果没有有效动态，返回 None
+    """
 
-    temp.sort(key=lambda x: x[0], reverse=True)
-    return temp[0][1]
+    return max(filter(is_valid_dynamic, dynamics), key=lambda item: item.pub_ts, default=None)
 
 def pub_ts_to_str(pub_ts: int) -> str:
     """
@@ -118,407 +166,310 @@ def write_data_to_file_with_timestamp(subdir: str, base_name: str, data: str, ex
 
     logger.info(f"数据已写入文件: {file_path}")
 
-def process_jump_url(jump_url: str) -> str:
-    return "https:" + jump_url if jump_url.startswith("//") else jump_url
-
-async def process_dynamic_ugc_season(major: dict) -> dict:
-    major_ugc_season = major.get("ugc_season")
-    if not major_ugc_season:
-        return { "success": False }
-
-    combined_message = {}
-    combined_message["success"] = True
-    combined_message["title"] = major_ugc_season.get("title", "无标题")
-    combined_message["link"] = process_jump_url(major_ugc_season.get("jump_url", "无链接"))
-    combined_message["content"] = major_ugc_season.get("desc", "无简介")
-    combined_message["image_urls"] = []
-
-    if cover_url := major_ugc_season.get("cover"):
-        combined_message["image_urls"].append(cover_url + "@300w_169h_.jpg")
-
-    return combined_message
-
-async def process_dynamic_article(major: dict) -> dict:
-    major_article = major.get("article")
-    if not major_article:
-        return { "success": False }
-
-    combined_message = {}
-    combined_message["success"] = True
-    combined_message["title"] = major_article.get("title", "无标题")
-    combined_message["link"] = process_jump_url(major_article.get("jump_url", "无链接"))
-    combined_message["content"] = major_article.get("desc", "无简介")
-    combined_message["image_urls"] = []
-
-    for cover in major_article.get("covers", []):
-        combined_message["image_urls"].append(cover)
-
-    return combined_message
-
-async def process_dynamic_draw(major: dict) -> dict:
-    major_draw = major.get("draw")
-    if not major_draw:
-        return { "success": False }
-
-    combined_message = {}
-    combined_message["success"] = True
-    combined_message["title"] = "发布了一条 [图片] 动态喵！"
-    combined_message["content"] = f'相簿ID：{major_draw.get("id", "未知")}'
-    combined_message["image_urls"] = []
-
-    for item in major_draw.get("items", []):
-        if url := item.get("src"):
-            combined_message["image_urls"].append(url)
-
-    return combined_message
-
-async def process_dynamic_archive(major: dict) -> dict:
-    major_archive = major.get("archive")
-    if not major_archive:
-        return { "success": False }
-
-    combined_message = {}
-    combined_message["success"] = True
-    combined_message["title"] = major_archive.get("title", "无标题")
-    combined_message["title"] = process_jump_url(major_archive.get("jump_url", "无链接"))
-    combined_message["content"] = major_archive.get("desc", "无简介")
-    combined_message["image_urls"] = []
-
-    if cover_url := major_archive.get("cover"):
-        combined_message["image_urls"].append(cover_url + "@300w_169h_.jpg")
-
-    return combined_message
-
-async def process_dynamic_live_rcmd(major: dict) -> dict:
-    major_rcmd = major.get("live_rcmd")
-    if not major_rcmd:
-        return { "success": False }
-
-    rcmd_content = major_rcmd.get("content", "")
-    if not rcmd_content:
-        return { "success": False }
-
-    content_json = json.loads(rcmd_content)
-    live_play_info = content_json.get("live_play_info")
-    if not live_play_info:
-        return { "success": False }
-
-    combined_message = {}
-    combined_message["success"] = True
-    combined_message["title"] = live_play_info.get("title", "无标题")
-    combined_message["link"] = process_jump_url(live_play_info.get("link", "无链接"))
-    combined_message["image_urls"] = []
-
-    if cover_url := live_play_info.get("cover"):
-        combined_message["image_urls"].append(cover_url + "@300w_169h_.jpg")
-
-    return combined_message
-
-async def process_dynamic_common(major: dict) -> dict:
-    major_common = major.get("common")
-    if not major_common:
-        return { "success": False }
-
-    combined_message = {}
-    combined_message["success"] = True
-    combined_message["title"] = major_common.get("title", "无标题")
-    combined_message["content"] = major_common.get("desc", "无简介")
-    combined_message["link"] = process_jump_url(major_common.get("jump_url", "无链接"))
-    combined_message["image_urls"] = []
-
-    if cover_url := major_common.get("cover"):
-        combined_message["image_urls"].append(cover_url + "@300w_169h_.jpg")
-
-    return combined_message
-
-async def process_dynamic_pgc(major: dict) -> dict:
-    major_pgc = major.get("pgc")
-    if not major_pgc:
-        return { "success": False }
-
-    combined_message = {}
-    combined_message["success"] = True
-    combined_message["title"] = major_pgc.get("title", "无标题")
-    combined_message["link"] = process_jump_url(major_pgc.get("jump_url", "无链接"))
-    combined_message["image_urls"] = []
-
-    if cover_url := major_pgc.get("cover"):
-        combined_message["image_urls"].append(cover_url + "@300w_169h_.jpg")
-
-    return combined_message
-
-async def process_dynamic_courses(major: dict) -> dict:
-    return {  "success": False }
-
-async def process_dynamic_music(major: dict) -> dict:
-    major_music = major.get("music")
-    if not major_music:
-        return { "success": False }
-
-    combined_message = {}
-    combined_message["success"] = True
-    combined_message["title"] = major_music.get("title", "无标题")
-    combined_message["content"] = major_music.get("label", "未知")
-    combined_message["link"] = process_jump_url(major_music.get("jump_url", "无链接"))
-    combined_message["image_urls"] = []
-
-    if cover_url := major_music.get("cover"):
-        combined_message["image_urls"].append(cover_url + "@300w_169h_.jpg")
-
-    return combined_message
-
-async def process_dynamic_opus(major: dict) -> dict:
-    major_opus = major.get("opus")
-    if not major_opus:
-        return { "success": False }
-
-    combined_message = {}
-    combined_message["success"] = True
-    combined_message["title"] = major_opus.get("title", "无标题")
-    combined_message["image_urls"] = []
-
-    summary = major_opus.get("summary")
-    if not summary:
-        combined_message["content"] = "无简介"
-    else:
-        combined_message["content"] = summary.get("text", "无简介")
-
-    combined_message["link"] = process_jump_url(major_opus.get("jump_url", "无链接"))
-
-    for image in major_opus.get("pics", []):
-        if url := image.get("url"):
-            combined_message["image_urls"].append(url)
-
-    return combined_message
-
-async def process_dynamic_live(major: dict) -> dict:
-    major_live = major.get("live")
-    if not major_live:
-        return { "success": False }
-
-    live_state = major_live.get("live_state")
-    if not live_state:
-        return { "success": False }
-
-    combined_message = {}
-    combined_message["success"] = True
-
-    if live_state == 1:
-        combined_message["title"] = major_live.get("title", "无标题")
-        combined_message["link"] = process_jump_url(major_live.get("jump_url", "无链接"))
-        combined_message["content"] = "各位请注意！Shiro开始了直播喵！"
-        combined_message["image_urls"] = []
-
-        if cover := major_live.get("cover"):
-            combined_message["image_urls"].append(cover + "@300w_169h_.jpg")
-    elif live_state == 0:
-        combined_message["content"] = "各位请注意！Shiro 结束了直播喵！\n期待下次再见喵~"
-
-    return combined_message
-
-async def process_dynamic_none(major: dict) -> dict:
-    return { "success": False }
-
-async def process_dynamic_upower_common(major: dict) -> dict:
-    return { "success": False }
-
-dynamic_content_processors = {
-    MajorType.MAJOR_TYPE_NONE: process_dynamic_none,
-    MajorType.MAJOR_TYPE_OPUS: process_dynamic_opus,
-    MajorType.MAJOR_TYPE_ARCHIVE: process_dynamic_archive,
-    MajorType.MAJOR_TYPE_PGC: process_dynamic_pgc,
-    MajorType.MAJOR_TYPE_COURSES: process_dynamic_courses,
-    MajorType.MAJOR_TYPE_DRAW: process_dynamic_draw,
-    MajorType.MAJOR_TYPE_ARTICLE: process_dynamic_article,
-    MajorType.MAJOR_TYPE_MUSIC: process_dynamic_music,
-    MajorType.MAJOR_TYPE_COMMON: process_dynamic_common,
-    MajorType.MAJOR_TYPE_LIVE: process_dynamic_live,
-    MajorType.MAJOR_TYPE_LIVE_RCMD: process_dynamic_live_rcmd,
-    MajorType.MAJOR_TYPE_UGC_SEASON: process_dynamic_ugc_season,
-    MajorType.MAJOR_TYPE_UPOWER_COMMON: process_dynamic_upower_common
-}
-
-async def get_latest_dynamic(debug_call: bool) -> None:
-    bot = get_bot()
-
-    logger.info("正在查找 Shiro 的最新动态...")
-
-    all_dynamics = await fetch_all_dynamics()
-    logger.info(f"共找到 {len(all_dynamics)} 条动态。")
-
-    last_dynamic = get_last_dynamic(all_dynamics)
-    if not last_dynamic:
-        logger.warning("未找到有效动态。")
-        return
-
-    pub_ts = last_dynamic.get("modules", {}).get("module_author", {}).get("pub_ts", 0)
-
-    try:
-        pub_ts = int(pub_ts)
-    except (TypeError, ValueError):
-        return
-
-    pub_ts_time = pub_ts_to_str(pub_ts)
-
-    global last_dynamic_timestamp
-    if last_dynamic_timestamp >= pub_ts:
-        logger.info("没有发现新的动态喵~")
-        return
-
-    last_dynamic_timestamp = pub_ts
-
-    pub_time = last_dynamic.get("modules", {}).get("module_author", {}).get("pub_time", "")
+# 一条动态最多尝试播报的次数，渲染失败或没有发送到任何一个群都算一次
+ANNOUNCE_MAX_ATTEMPTS = 3
+
+# 播报失败、等待下次轮询重试的动态：uid -> {id_str: 已尝试次数}
+# 较新的动态播报成功后水位线会越过它们，因此重试时不受水位线限制
+announce_failures: dict[int, dict[str, int]] = {}
+
+def select_new_dynamics(
+    dynamics: list[Dynamic],
+    watermark: int,
+    unseen: set[str],
+    retry: Collection[str] = (),
+) -> list[Dynamic]:
+    """返回水位线之后还没有播报过的有效动态，以及 retry 中仍未播报的动态，按发布时间从旧到新排列"""
+    new_dynamics = [
+        item for item in dynamics
+        if is_valid_dynamic(item) and (
+            dynamic_state.is_new_dynamic(item.pub_ts, watermark, item.id_str, unseen)
+            or (item.id_str in retry and item.id_str in unseen)
+        )
+    ]
+    new_dynamics.sort(key=lambda item: item.pub_ts)
+    return new_dynamics
+
+def card_image_urls(dynamic: Dynamic) -> list[str]:
+    """渲染卡片时会用到的图片：头像和动态中的图片，转发动态包括原动态"""
+    urls = [dynamic.author.face]
+    if dynamic.major is not None:
+        urls += dynamic.major.image_urls
+    if dynamic.orig is not None:
+        urls += card_image_urls(dynamic.orig)
+    return urls
+
+def build_digest_message(dynamics: list[Dynamic]) -> Message:
+    """把积压的旧动态合并成一条文字消息"""
+    lines = [f" {dynamics[0].author.name} 还发布了 {len(dynamics)} 条动态，请注意查收喵~"]
+    for item in dynamics:
+        lines.append(f"{item.author.pub_time} {item.dynamic_type.desc}：{item.link}")
+    return Message(MessageSegment.text("\n".join(lines)))
 
-    logger.info(f"Shiro 的最新动态发布时间：{pub_ts_time}")
+async def build_dynamic_message(
+    dynamic: Dynamic,
+    render_priority: RenderPriority,
+) -> Optional[tuple[Message, bool]]:
+    """
+    把一条动态渲染成播报消息，返回 (消息, 是否需要@全体成员)，无法解析时返回 None
 
-    basic = last_dynamic.get('basic', {})
-    if basic.get('is_only_fans', False):
-        if debug_call:
-            for user_id in driver_config.superusers:
-                await bot.send_private_msg(user_id=int(user_id), message=MessageSegment.text("Shiro刚刚发布了一条充电动态，请注意查收喵~"))
-        else:
-            for group_id in plugin_config.live_shiro_group_ids:
-                await bot.send_group_msg(group_id=group_id, message=Message([
-                    MessageSegment.at("all"),
-                    MessageSegment.text(" Shiro刚刚发布了一条充电动态，请注意查收喵~")
-                ]))
-        logger.info("已处理了一条充电动态，跳过后续操作！")
-        return
-
-    dynamic_type = DynamicType.from_dynamic_type(last_dynamic.get("type", ""))
-
-    orig = {}
-    modules = {}
-    if dynamic_type == DynamicType.FORWARD:
-        orig = last_dynamic.get("orig")
-        if not orig:
+    @全体成员 由调用方按订阅设置添加
+    """
+    author_name = dynamic.author.name
+    if dynamic.is_only_fans:
+        logger.info("处理了一条充电动态，不渲染卡片")
+        return Message(MessageSegment.text(f" {author_name}刚刚发布了一条充电动态，请注意查收喵~")), True
+
+    content = dynamic
+    if dynamic.dynamic_type == DynamicType.FORWARD:
+        if dynamic.orig is None:
             logger.warning("解析转发动态orig失败喵~")
-            return
-        modules = orig.get("modules")
-    else:
-        modules = last_dynamic.get("modules")
-
-    if not modules:
-        logger.warning("解析modules失败喵~")
-        return
-
-    module_author = modules.get("module_author")
-    if not module_author:
-        logger.warning("解析module_author失败喵~")
-        return
-
-    module_dynamic = modules.get("module_dynamic")
-    if not module_dynamic:
-        logger.warning("解析module_dynamic失败喵~")
-        return
-
-    dynamic_content = module_dynamic.get("major")
-    if not dynamic_content:
-        logger.warning("解析major失败喵")
-        return
-
-    combined_message = {}
-
-    major_type = MajorType[dynamic_content.get("type")]
-    if major_type in dynamic_content_processors:
-        combined_message = await dynamic_content_processors[major_type](dynamic_content)
-    else:
-        for group_id in plugin_config.live_shiro_group_ids:
-            await bot.send_group_msg(group_id=group_id, message=Message("解析到不支持的动态了喵~"))
-            return
-
-    success = combined_message["success"]
-    if not success:
-        return
+            return None
+        content = dynamic.orig
 
-    combined_message["time"] = pub_time
-    combined_message["user_name"] = module_author.get("name", "未知用户")
-    combined_message["avatar_url"] = module_author.get("face", "")
-
-    if dynamic_type == DynamicType.FORWARD:
-        combined_message.pop("link", None)
-
-    image_data = await render_png_from_template(RenderPageType.NORMAL, combined_message, width=400)
-
-    message = Message("")
-
-    if dynamic_type == DynamicType.FORWARD:
-        source_modules = last_dynamic.get("modules")
-        if not source_modules:
-            logger.warning("解析转发动态modules失败喵~")
-            return
-
-        source_module_author = source_modules.get("module_author")
-        if not source_module_author:
-            logger.warning("解析转发动态module_author失败喵~")
-            return
+    # 没有 major（例如源动态已被删除）时没有可渲染的内容，直接跳过
+    if not content.major_type:
+        logger.info(f"动态 {dynamic.id_str} 没有可渲染的内容，跳过播报")
+        return None
 
-        source_module_dynamic = source_modules.get("module_dynamic")
-        if not source_module_dynamic:
-            logger.warning("解析转发动态module_dynamic失败喵~")
-            return
+    # 未知或尚未处理的类型（课程、充电相关等）仍然提示
+    if not content.supported:
+        logger.warning(f"解析到不支持的动态类型 {content.major_type!r}")
+        return Message("解析到不支持的动态了喵~"), False
 
-        source_module_dynamic_desc = source_module_dynamic.get("desc")
-        if not source_module_dynamic_desc:
-            logger.warning("解析转发动态desc失败喵~")
-            return
+    card = content.card_data()
+    if card is None:
+        return None
 
+    if dynamic.dynamic_type == DynamicType.FORWARD:
+        card.pop("link", None)
         forward_data = {
-            "user_name": source_module_author.get("name", "未知用户"),
-            "avatar_url": source_module_author.get("face", ""),
-            "time": source_module_author.get("pub_time", ""),
+            "user_name": author_name,
+            "avatar_url": dynamic.author.face,
+            "time": dynamic.author.pub_time,
             "title": "转发了动态",
-            "content": source_module_dynamic_desc.get("text", ""),
-            "forwarded_card_url": image_bytes_to_data_url(image_data)
+            "content": dynamic.text,
         }
 
-        image_data = await render_png_from_template(RenderPageType.FORWARD, forward_data, width=600)
+        image_data = await render_forward_dynamic(
+            forward_data,
+            card,
+            single_pass=plugin_config.live_shiro_forward_single_pass,
+            priority=render_priority,
+        )
         message = Message([
                         MessageSegment.text(
-                            " Shiro转发了一条动态，请注意查收喵~\n"
+                            f" {author_name}转发了一条动态，请注意查收喵~\n"
                         ),
                         MessageSegment.image(BytesIO(image_data)),
                         MessageSegment.text(
-                            f"\n链接：{process_jump_url(source_module_author.get('jump_url', '无链接'))}"
+                            f"\n链接：{process_jump_url(dynamic.author.jump_url or '无链接')}"
                         ),
         ])
     else:
+        image_data = await render_image_from_template(
+            RenderPageType.NORMAL, card, width=400, priority=render_priority
+        )
         message = Message([
                         MessageSegment.text(
-                            " Shiro发布了一条动态，请注意查收喵~\n"
+                            f" {author_name}发布了一条动态，请注意查收喵~\n"
                         ),
                         MessageSegment.image(BytesIO(image_data)),
                         MessageSegment.text(
-                            f"\n链接：{combined_message.get('link', '')}"
+                            f"\n链接：{card.get('link', '')}"
                         ),
                     ])
 
-    if debug_call:
-        for user_id in driver_config.superusers:
-            await bot.send_private_msg(user_id=int(user_id), message=message)
+    return message, True
+
+async def check_dynamics(
+    uid: int,
+    subscriptions: list[Subscription],
+    debug_call: bool = False,
+    force: bool = False,
+) -> int:
+    """
+    播报 uid 上次轮询以来的所有新动态，返回新动态的数量
+
+    新动态按发布时间从旧到新依次播报，卡片并发渲染（不超过 live_shiro_dynamic_render_concurrency），
+    但按顺序发送到订阅的各个群；超过 live_shiro_dynamic_catchup_limit 条时，较旧的动态合并为一条文字消息。
+    动态发送到至少一个群后才记录到 dynamic_state 中，重启后从上次的水位线继续；
+    渲染或发送失败的动态在之后的轮询中重试，最多尝试 ANNOUNCE_MAX_ATTEMPTS 次；
+    debug_call 为 True 时只发送给超级用户，force 为 True 时无论是否播报过都重新播报最新的一条
+    """
+    bot = get_bot()
+
+    logger.info(f"正在查找 uid {uid} 的最新动态...")
+
+    watermark = await dynamic_state.load_watermark(uid)
+    all_dynamics, pages = await fetch_dynamics(uid, watermark)
+    logger.info(f"本次拉取 {pages} 页，共找到 {len(all_dynamics)} 条动态。")
+
+    failures = announce_failures.setdefault(uid, {})
+    # 已经不在拉取结果中的动态无法再重试
+    fetched = {item.id_str for item in all_dynamics}
+    for id_str in [id_str for id_str in failures if id_str not in fetched]:
+        del failures[id_str]
+
+    if force:
+        last_dynamic = get_last_dynamic(all_dynamics)
+        new_dynamics = [last_dynamic] if last_dynamic else []
     else:
-        for group_id in plugin_config.live_shiro_group_ids:
-            await bot.send_group_msg(group_id=group_id, message=MessageSegment.at('all') + message)
+        unseen = await dynamic_state.filter_unseen(uid, (item.id_str for item in all_dynamics))
+        new_dynamics = select_new_dynamics(all_dynamics, watermark, unseen, failures.keys())
+
+    if not new_dynamics:
+        logger.info("没有发现新的动态喵~")
+        return 0
+
+    if not force:
+        activity_hours.observe_many(item.pub_ts for item in new_dynamics)
+    new_count = len(new_dynamics)
+
+    logger.info(
+        f"发现 {len(new_dynamics)} 条新动态，最新发布时间：{pub_ts_to_str(new_dynamics[-1].pub_ts)}"
+    )
+
+    async def deliver(message: Message, mention: bool) -> bool:
+        """返回是否发送到了至少一个群，没有订阅的群时视为成功"""
+        if debug_call:
+            for user_id in driver_config.superusers:
+                await bot.send_private_msg(user_id=int(user_id), message=message)
+            return True
+        delivered = not subscriptions
+        for sub in subscriptions:
+            group_message = MessageSegment.at("all") + message if mention and sub.mention_all else message
+            try:
+                await bot.send_group_msg(group_id=sub.group_id, message=group_message)
+                delivered = True
+            except Exception as e:
+                logger.warning(f"向群 {sub.group_id} 播报动态失败: {e}")
+        return delivered
+
+    async def settle(item: Dynamic, delivered: bool) -> None:
+        """播报成功后记录；失败时留到下次轮询重试，超过次数后放弃并记录"""
+        if not delivered:
+            attempts = failures.get(item.id_str, 0) + 1
+            if not force and attempts < ANNOUNCE_MAX_ATTEMPTS:
+                failures[item.id_str] = attempts
+                logger.warning(f"动态 {item.id_str} 第 {attempts} 次播报失败，下次轮询时重试")
+                return
+            logger.error(f"动态 {item.id_str} 播报失败 {attempts} 次，不再重试")
+        failures.pop(item.id_str, None)
+        await dynamic_state.mark_announced(uid, item.id_str, item.pub_ts)
+
+    limit = plugin_config.live_shiro_dynamic_catchup_limit
+    if limit > 0 and len(new_dynamics) > limit:
+        digest, new_dynamics = new_dynamics[:-limit], new_dynamics[-limit:]
+        delivered = await deliver(build_digest_message(digest), mention=True)
+        for item in digest:
+            await settle(item, delivered)
+
+    # 定时推送优先于调试指令
+    render_priority = RenderPriority.INTERACTIVE if debug_call else RenderPriority.BROADCAST
+    semaphore = asyncio.Semaphore(max(1, plugin_config.live_shiro_dynamic_render_concurrency))
+
+    async def build(item: Dynamic) -> Optional[tuple[Message, bool]]:
+        async with semaphore:
+            return await build_dynamic_message(item, render_priority)
+
+    # 解析后立即并发预取所有卡片的图片，渲染页面请求图片时直接命中缓存
+    prefetch = None
+    if plugin_config.live_shiro_render_asset_cache:
+        prefetch = asyncio.create_task(
+            asset_cache.prefetch(url for item in new_dynamics for url in card_image_urls(item))
+        )
+
+    tasks = [asyncio.create_task(build(item)) for item in new_dynamics]
+    try:
+        for item, task in zip(new_dynamics, tasks):
+            try:
+                result = await task
+            except Exception as e:
+                logger.warning(f"渲染动态 {item.id_str} 失败: {e}")
+                await settle(item, delivered=False)
+                continue
+            # 返回 None 表示动态无法解析或没有可播报的内容，重试也不会成功，直接记录
+            await settle(item, result is None or await deliver(*result))
+    finally:
+        for task in tasks:
+            task.cancel()
+        if prefetch is not None:
+            await asyncio.gather(prefetch, return_exceptions=True)
+
+    return new_count
+
+async def get_latest_dynamic(debug_call: bool, force: bool = False) -> None:
+    """查找并播报 Shiro 的新动态"""
+    uid = plugin_config.live_shiro_uid
+    subscriptions = (await subscription.load_subscriptions()).get(uid) or [
+        Subscription(uid, group_id) for group_id in plugin_config.live_shiro_group_ids
+    ]
+    await check_dynamics(uid, subscriptions, debug_call=debug_call, force=force)
+
+async def poll_all_subscriptions() -> bool:
+    """
+    依次轮询所有订阅的 UP 主，返回是否发现了新动态
+
+    各个 uid 的请求均匀错开在当前的轮询间隔内，并加入随机抖动，
+    所有请求再共同受 bili_request_budget 限制，订阅再多也不会在同一时刻集中请求。
+    所有 uid 都轮询失败时抛出异常，由 dynamic_poller 退避
+    """
+    subscriptions = await subscription.load_subscriptions()
+    if not subscriptions:
+        return False
+
+    jitter = plugin_config.live_shiro_dynamic_poll_jitter
+    # 留出一部分时间，保证本轮在下一轮开始前结束
+    spacing = dynamic_poller.interval * 0.8 / len(subscriptions)
+    new_count = 0
+    errors = []
+    for index, (uid, subs) in enumerate(subscriptions.items()):
+        if index > 0:
+            await asyncio.sleep(spacing * random.uniform(1 - jitter, 1 + jitter))
+        try:
+            new_count += await check_dynamics(uid, subs)
+        except Exception as e:
+            logger.warning(f"轮询 uid {uid} 的动态失败: {e}")
+            errors.append(e)
+
+    if len(errors) == len(subscriptions):
+        raise errors[-1]
+    return new_count > 0
+
+dynamic_poller = AdaptivePoller(
+    "job_poll_dynamics",
+    poll_all_subscriptions,
+    min_interval=plugin_config.live_shiro_dynamic_poll_min_interval,
+    max_interval=plugin_config.live_shiro_dynamic_poll_max_interval,
+    hot_window=plugin_config.live_shiro_poll_hot_window,
+)
 
 
 from nonebot import on_command
+from nonebot.params import CommandArg
 from nonebot.rule import to_me
 
 test_command = on_command("test_dynamic", rule=to_me(), permission=SUPERUSER)
 @test_command.handle()
 async def test_dynamic_handler(bot) -> None:
-    global last_dynamic_timestamp
-    last_dynamic_timestamp = 0
-    await get_latest_dynamic(False)
+    await get_latest_dynamic(False, force=True)
+
+backfill_command = on_command("dynamic_backfill", rule=to_me(), permission=SUPERUSER)
+@backfill_command.handle()
+async def _(args: Message = CommandArg()):
+    uid = args.extract_plain_text().strip()
+    dynamics = await fetch_all_dynamics(int(uid) if uid.isdigit() else None)
+    await backfill_command.finish(f"已拉取 {len(dynamics)} 条历史动态并写入归档喵~")
 
 async def dynamic_bot_connect_handler(bot: Bot) -> Optional[Message]:
-    scheduler.add_job(
-        get_latest_dynamic,
-        "interval",
-        minutes=2,
-        id="job_get_latest_dynamic",
-        kwargs={"debug_call": False}
-    )
-    return Message("开始监控 Shiro 的动态喵~")
+    await dynamic_state.init_db()
+    await dynamic_archive.init_db()
+    await subscription.init_db()
+    activity_hours.observe_many(await dynamic_state.load_pub_timestamps())
+    # 所有订阅共用一个轮询任务，间隔随动态活跃程度自动调整
+    dynamic_poller.start()
+    uid_count = len(await subscription.load_subscriptions())
+    return Message(f"开始监控 {uid_count} 位UP主的动态喵~")
 
 __all__ = ["dynamic_bot_connect_handler"]
@@ -0,0 +1,189 @@
+import json
+import os
+import time
+import zlib
+from datetime import datetime
+from typing import Optional
+
+from nonebot import logger, on_command
+from nonebot.adapters import Message
+from nonebot.params import CommandArg
+from nonebot.rule import to_me
+
+from ..common import get_db_connection
+from .dynamic_model import Dynamic
+
+DYNAMIC_ARCHIVE_DB_PATH = "./cache/dynamic_archive.db"
+
+SEARCH_PAGE_SIZE = 5
+# trigram 分词至少需要 3 个字符，更短的关键词改用 LIKE 匹配
+MIN_MATCH_LENGTH = 3
+
+
+async def init_db() -> None:
+    os.makedirs(os.path.dirname(DYNAMIC_ARCHIVE_DB_PATH), exist_ok=True)
+    async with get_db_connection(DYNAMIC_ARCHIVE_DB_PATH) as db:
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS dynamic_archive (
+                id_str TEXT PRIMARY KEY,
+                uid INTEGER NOT NULL,
+                type TEXT NOT NULL,
+                pub_ts INTEGER,
+                author TEXT NOT NULL,
+                text TEXT NOT NULL,
+                image_urls TEXT NOT NULL,
+                raw BLOB NOT NULL,
+                archive_ts INTEGER NOT NULL
+            )
+        """)
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS dynamic_archive_pub_ts ON dynamic_archive (uid, pub_ts)"
+        )
+        # 中文没有空格分词，使用 trigram 分词支持任意子串搜索
+        await db.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS dynamic_archive_fts USING fts5(
+                text, content='dynamic_archive', content_rowid='rowid', tokenize='trigram'
+            )
+        """)
+        await db.execute("""
+            CREATE TRIGGER IF NOT EXISTS dynamic_archive_ai AFTER INSERT ON dynamic_archive BEGIN
+                INSERT INTO dynamic_archive_fts (rowid, text) VALUES (new.rowid, new.text);
+            END
+        """)
+        await db.execute("""
+            CREATE TRIGGER IF NOT EXISTS dynamic_archive_ad AFTER DELETE ON dynamic_archive BEGIN
+                INSERT INTO dynamic_archive_fts (dynamic_archive_fts, rowid, text)
+                VALUES ('delete', old.rowid, old.text);
+            END
+        """)
+        await db.commit()
+
+
+def search_text(dynamic: Dynamic) -> str:
+    """参与全文搜索的文字：作者、正文、卡片标题和简介，转发动态包括原动态"""
+    parts = [dynamic.author.name, dynamic.text]
+    if dynamic.major is not None:
+        parts += [dynamic.major.title or "", dynamic.major.content or ""]
+    if dynamic.orig is not None:
+        parts.append(search_text(dynamic.orig))
+    return "\n".join(part for part in parts if part)
+
+
+def image_urls(dynamic: Dynamic) -> list[str]:
+    content = dynamic.orig if dynamic.major is None and dynamic.orig is not None else dynamic
+    return list(content.major.image_urls) if content.major is not None else []
+
+
+async def archive_dynamics(uid: int, items: list[dict], dynamics: list[Dynamic]) -> int:
+    """把一页动态写入归档，已归档的动态跳过，返回新写入的条数"""
+    rows = [
+        (
+            dynamic.id_str,
+            uid,
+            dynamic.dynamic_type.type_name,
+            dynamic.pub_ts,
+            dynamic.author.name,
+            search_text(dynamic),
+            json.dumps(image_urls(dynamic), ensure_ascii=False),
+            zlib.compress(json.dumps(item, ensure_ascii=False).encode("utf-8")),
+            int(time.time()),
+        )
+        for item, dynamic in zip(items, dynamics)
+        if dynamic.id_str
+    ]
+    if not rows:
+        return 0
+    async with get_db_connection(DYNAMIC_ARCHIVE_DB_PATH) as db:
+        cursor = await db.executemany(
+            """
+            INSERT OR IGNORE INTO dynamic_archive
+                (id_str, uid, type, pub_ts, author, text, image_urls, raw, archive_ts)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+        await db.commit()
+        return cursor.rowcount
+
+
+async def load_raw(id_str: str) -> Optional[dict]:
+    """读取归档的原始 JSON"""
+    async with get_db_connection(DYNAMIC_ARCHIVE_DB_PATH) as db:
+        async with db.execute("SELECT raw FROM dynamic_archive WHERE id_str = ?", (id_str,)) as cursor:
+            row = await cursor.fetchone()
+    return json.loads(zlib.decompress(row[0])) if row else None
+
+
+def _build_search_query(keywords: list[str]) -> tuple[str, list]:
+    """长关键词走 FTS5 索引，短关键词用 LIKE 在结果中过滤，所有关键词都需要匹配"""
+    match_terms = [k for k in keywords if len(k) >= MIN_MATCH_LENGTH]
+    like_terms = [k for k in keywords if len(k) < MIN_MATCH_LENGTH]
+
+    conditions = []
+    params: list = []
+    if match_terms:
+        source = "dynamic_archive_fts JOIN dynamic_archive a ON a.rowid = dynamic_archive_fts.rowid"
+        conditions.append("dynamic_archive_fts MATCH ?")
+        # 每个关键词作为短语，避免其中的符号被当作 FTS5 语法
+        params.append(" ".join('"' + k.replace('"', '""') + '"' for k in match_terms))
+    else:
+        source = "dynamic_archive a"
+    for term in like_terms:
+        conditions.append("a.text LIKE ? ESCAPE '\\'")
+        escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        params.append(f"%{escaped}%")
+    return f"FROM {source} WHERE {' AND '.join(conditions)}", params
+
+
+async def search_dynamics(keywords: list[str], page: int = 1) -> tuple[int, list[tuple]]:
+    """返回 (匹配总数, 当前页的 (id_str, author, pub_ts, text))，按发布时间倒序"""
+    query, params = _build_search_query(keywords)
+    async with get_db_connection(DYNAMIC_ARCHIVE_DB_PATH) as db:
+        async with db.execute(f"SELECT COUNT(*) {query}", params) as cursor:
+            (total,) = await cursor.fetchone()
+        async with db.execute(
+            f"SELECT a.id_str, a.author, a.pub_ts, a.text {query} ORDER BY a.pub_ts DESC LIMIT ? OFFSET ?",
+            (*params, SEARCH_PAGE_SIZE, (page - 1) * SEARCH_PAGE_SIZE),
+        ) as cursor:
+            rows = await cursor.fetchall()
+    return total, rows
+
+
+def _excerpt(text: str, keywords: list[str], width: int = 40) -> str:
+    """截取第一个关键词附近的一段文字"""
+    text = text.replace("\n", " ")
+    start = min((pos for k in keywords if (pos := text.find(k)) >= 0), default=0)
+    start = max(0, start - width // 4)
+    excerpt = text[start:start + width]
+    return ("…" if start > 0 else "") + excerpt + ("…" if start + width < len(text) else "")
+
+
+search_command = on_command("dynamic_search", rule=to_me(), force_whitespace=True)
+
+@search_command.handle()
+async def _(args: Message = CommandArg()):
+    params = args.extract_plain_text().split()
+    page = 1
+    # 最后两个参数为 -p <页码> 时翻页
+    if len(params) >= 2 and params[-2] == "-p" and params[-1].isdigit():
+        page = max(1, int(params[-1]))
+        params = params[:-2]
+    if not params:
+        await search_command.finish("用法：/dynamic_search <关键词...> [-p 页码]")
+
+    start = time.perf_counter()
+    total, rows = await search_dynamics(params, page)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if total == 0:
+        await search_command.finish("没有找到相关的动态喵~")
+
+    pages = (total + SEARCH_PAGE_SIZE - 1) // SEARCH_PAGE_SIZE
+    lines = [f"找到 {total} 条相关动态（第 {page}/{pages} 页，{elapsed_ms:.0f} ms）："]
+    for id_str, author, pub_ts, text in rows:
+        pub_time = datetime.fromtimestamp(pub_ts).strftime("%Y-%m-%d %H:%M") if pub_ts else "未知时间"  # noqa: DTZ006
+        lines.append(f"[{pub_time}] {author}：{_excerpt(text, params)}")
+        lines.append(f"https://t.bilibili.com/{id_str}")
+    if page < pages:
+        lines.append(f"发送 /dynamic_search {' '.join(params)} -p {page + 1} 查看下一页")
+    logger.debug(f"动态搜索 {params} 第 {page} 页，耗时 {elapsed_ms:.1f} ms")
+    await search_command.finish("\n".join(lines))
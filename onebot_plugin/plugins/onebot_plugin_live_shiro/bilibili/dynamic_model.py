@@ -0,0 +1,260 @@
+import json
+from typing import Callable, Optional
+
+from .dynamic_type import DynamicType, MajorType
+
+
+def process_jump_url(jump_url: str) -> str:
+    return "https:" + jump_url if jump_url.startswith("//") else jump_url
+
+
+class Author:
+    """module_author 中用到的字段"""
+
+    __slots__ = ("name", "face", "pub_ts", "pub_time", "jump_url")
+
+    def __init__(self, name: str, face: str, pub_ts: Optional[int], pub_time: str, jump_url: str) -> None:
+        self.name = name
+        self.face = face
+        self.pub_ts = pub_ts
+        self.pub_time = pub_time
+        self.jump_url = jump_url
+
+
+class MajorContent:
+    """动态主体（major）解析后的卡片内容，各种 major 类型统一为同一结构"""
+
+    __slots__ = ("title", "content", "link", "image_urls")
+
+    def __init__(
+        self,
+        title: Optional[str] = None,
+        content: Optional[str] = None,
+        link: Optional[str] = None,
+        image_urls: Optional[list[str]] = None,
+    ) -> None:
+        self.title = title
+        self.content = content
+        self.link = link
+        self.image_urls = image_urls if image_urls is not None else []
+
+
+class Dynamic:
+    """
+    一条动态
+
+    major_type 保留接口返回的原始类型字符串，未知类型不会抛出异常；
+    major 为 None 表示类型不支持或内容缺失，可通过 supported 区分
+    """
+
+    __slots__ = (
+        "id_str", "dynamic_type", "author", "text", "major_type", "major",
+        "orig", "is_only_fans", "is_pinned",
+    )
+
+    def __init__(
+        self,
+        id_str: str,
+        dynamic_type: DynamicType,
+        author: Author,
+        text: str,
+        major_type: str,
+        major: Optional[MajorContent],
+        orig: Optional["Dynamic"],
+        is_only_fans: bool,
+        is_pinned: bool,
+    ) -> None:
+        self.id_str = id_str
+        self.dynamic_type = dynamic_type
+        self.author = author
+        self.text = text
+        self.major_type = major_type
+        self.major = major
+        self.orig = orig
+        self.is_only_fans = is_only_fans
+        self.is_pinned = is_pinned
+
+    @property
+    def pub_ts(self) -> Optional[int]:
+        return self.author.pub_ts
+
+    @property
+    def link(self) -> str:
+        return f"https://t.bilibili.com/{self.id_str}"
+
+    @property
+    def supported(self) -> bool:
+        return self.major_type in MAJOR_PARSERS
+
+    def card_data(self) -> Optional[dict]:
+        """普通动态卡片（normal.html）的模板数据，major 无法解析时返回 None"""
+        if self.major is None:
+            return None
+        card = {"title": self.major.title, "image_urls": list(self.major.image_urls)}
+        if self.major.content is not None:
+            card["content"] = self.major.content
+        if self.major.link is not None:
+            card["link"] = self.major.link
+        card["time"] = self.author.pub_time
+        card["user_name"] = self.author.name
+        card["avatar_url"] = self.author.face
+        return card
+
+
+# -------------------- major 解析 --------------------
+def _cover(url: Optional[str]) -> list[str]:
+    return [url + "@300w_169h_.jpg"] if url else []
+
+
+def _parse_video_like(major: dict) -> MajorContent:
+    """合集、视频、番剧等带封面和简介的类型"""
+    return MajorContent(
+        title=major.get("title", "无标题"),
+        content=major.get("desc", "无简介"),
+        link=process_jump_url(major.get("jump_url", "无链接")),
+        image_urls=_cover(major.get("cover")),
+    )
+
+
+def _parse_article(major: dict) -> MajorContent:
+    return MajorContent(
+        title=major.get("title", "无标题"),
+        content=major.get("desc", "无简介"),
+        link=process_jump_url(major.get("jump_url", "无链接")),
+        image_urls=list(major.get("covers", [])),
+    )
+
+
+def _parse_draw(major: dict) -> MajorContent:
+    return MajorContent(
+        title="发布了一条 [图片] 动态喵！",
+        content=f'相簿ID：{major.get("id", "未知")}',
+        image_urls=[url for item in major.get("items", []) if (url := item.get("src"))],
+    )
+
+
+def _parse_live_rcmd(major: dict) -> Optional[MajorContent]:
+    rcmd_content = major.get("content", "")
+    if not rcmd_content:
+        return None
+    live_play_info = json.loads(rcmd_content).get("live_play_info")
+    if not live_play_info:
+        return None
+    return MajorContent(
+        title=live_play_info.get("title", "无标题"),
+        link=process_jump_url(live_play_info.get("link", "无链接")),
+        image_urls=_cover(live_play_info.get("cover")),
+    )
+
+
+def _parse_pgc(major: dict) -> MajorContent:
+    return MajorContent(
+        title=major.get("title", "无标题"),
+        link=process_jump_url(major.get("jump_url", "无链接")),
+        image_urls=_cover(major.get("cover")),
+    )
+
+
+def _parse_music(major: dict) -> MajorContent:
+    return MajorContent(
+        title=major.get("title", "无标题"),
+        content=major.get("label", "未知"),
+        link=process_jump_url(major.get("jump_url", "无链接")),
+        image_urls=_cover(major.get("cover")),
+    )
+
+
+def _parse_opus(major: dict) -> MajorContent:
+    summary = major.get("summary")
+    return MajorContent(
+        title=major.get("title", "无标题"),
+        content=summary.get("text", "无简介") if summary else "无简介",
+        link=process_jump_url(major.get("jump_url", "无链接")),
+        image_urls=[url for pic in major.get("pics", []) if (url := pic.get("url"))],
+    )
+
+
+def _parse_live(major: dict) -> Optional[MajorContent]:
+    if major.get("live_state") != 1:
+        return None
+    return MajorContent(
+        title=major.get("title", "无标题"),
+        content="各位请注意！Shiro开始了直播喵！",
+        link=process_jump_url(major.get("jump_url", "无链接")),
+        image_urls=_cover(major.get("cover")),
+    )
+
+
+# major 类型 -> (major 中内容所在的键, 解析函数)；
+# 不在表中的类型（课程、充电相关等）视为不支持，播报时提示并记录日志
+MAJOR_PARSERS: dict[str, tuple[str, Callable[[dict], Optional[MajorContent]]]] = {
+    MajorType.MAJOR_TYPE_ARCHIVE.name: ("archive", _parse_video_like),
+    MajorType.MAJOR_TYPE_ARTICLE.name: ("article", _parse_article),
+    MajorType.MAJOR_TYPE_COMMON.name: ("common", _parse_video_like),
+    MajorType.MAJOR_TYPE_DRAW.name: ("draw", _parse_draw),
+    MajorType.MAJOR_TYPE_LIVE.name: ("live", _parse_live),
+    MajorType.MAJOR_TYPE_LIVE_RCMD.name: ("live_rcmd", _parse_live_rcmd),
+    MajorType.MAJOR_TYPE_MUSIC.name: ("music", _parse_music),
+    MajorType.MAJOR_TYPE_OPUS.name: ("opus", _parse_opus),
+    MajorType.MAJOR_TYPE_PGC.name: ("pgc", _parse_pgc),
+    MajorType.MAJOR_TYPE_UGC_SEASON.name: ("ugc_season", _parse_video_like),
+}
+
+
+def parse_major(major: Optional[dict]) -> tuple[str, Optional[MajorContent]]:
+    """返回 (major 类型, 卡片内容)"""
+    if not major:
+        return "", None
+    major_type = major.get("type") or ""
+    # 无效动态（例如源动态已被删除）与没有 major 相同，没有可渲染的内容
+    if major_type == MajorType.MAJOR_TYPE_NONE.name:
+        return "", None
+    parser = MAJOR_PARSERS.get(major_type)
+    if parser is None:
+        return major_type, None
+    key, parse = parser
+    payload = major.get(key)
+    if not payload:
+        return major_type, None
+    try:
+        return major_type, parse(payload)
+    except (AttributeError, TypeError, ValueError):
+        return major_type, None
+
+
+# 按类型字符串直接查表，未知类型为 DynamicType.NONE
+_DYNAMIC_TYPES = {dynamic_type.type_name: dynamic_type for dynamic_type in DynamicType}
+
+
+def _parse_author(module_author: dict) -> Author:
+    try:
+        pub_ts = int(module_author.get("pub_ts"))
+    except (TypeError, ValueError):
+        pub_ts = None
+    return Author(
+        module_author.get("name", "未知用户"),
+        module_author.get("face", ""),
+        pub_ts,
+        module_author.get("pub_time", ""),
+        module_author.get("jump_url", ""),
+    )
+
+
+def parse_dynamic(item: dict) -> Dynamic:
+    """把接口返回的一条动态一次性解析为 Dynamic，缺失的字段使用默认值"""
+    modules = item.get("modules") or {}
+    module_dynamic = modules.get("module_dynamic") or {}
+    desc = module_dynamic.get("desc") or {}
+    major_type, major = parse_major(module_dynamic.get("major"))
+    orig = item.get("orig")
+    return Dynamic(
+        str(item.get("id_str") or ""),
+        _DYNAMIC_TYPES.get(item.get("type"), DynamicType.NONE),
+        _parse_author(modules.get("module_author") or {}),
+        desc.get("text") or "",
+        major_type,
+        major,
+        parse_dynamic(orig) if orig else None,
+        bool((item.get("basic") or {}).get("is_only_fans", False)),
+        (modules.get("module_tag") or {}).get("text") == "置顶",
+    )
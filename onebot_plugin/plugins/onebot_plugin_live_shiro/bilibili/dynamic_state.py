@@ -0,0 +1,118 @@
+import os
+import time
+from typing import Iterable
+
+from nonebot import logger
+
+from ..common import get_db_connection
+
+DYNAMIC_STATE_DB_PATH = "./cache/dynamic_state.db"
+
+# 每个 uid 保留的已播报动态 id 数量，足够覆盖同一秒发布或补录时重复出现的动态
+SEEN_ID_LIMIT = 500
+
+
+async def init_db() -> None:
+    os.makedirs(os.path.dirname(DYNAMIC_STATE_DB_PATH), exist_ok=True)
+    async with get_db_connection(DYNAMIC_STATE_DB_PATH) as db:
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS dynamic_watermark (
+                uid INTEGER PRIMARY KEY,
+                pub_ts INTEGER NOT NULL
+            )
+        """)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS dynamic_seen (
+                uid INTEGER NOT NULL,
+                id_str TEXT NOT NULL,
+                pub_ts INTEGER NOT NULL,
+                seen_ts INTEGER NOT NULL,
+                PRIMARY KEY (uid, id_str)
+            )
+        """)
+        await db.commit()
+
+
+async def load_watermark(uid: int) -> int:
+    """
+    读取 uid 的动态水位线（已播报的最新发布时间）
+
+    第一次运行时以当前时间作为水位线，避免把历史动态全部播报一遍
+    """
+    async with get_db_connection(DYNAMIC_STATE_DB_PATH) as db:
+        async with db.execute("SELECT pub_ts FROM dynamic_watermark WHERE uid = ?", (uid,)) as cursor:
+            row = await cursor.fetchone()
+        if row is not None:
+            return row[0]
+
+        watermark = int(time.time())
+        await db.execute(
+            "INSERT OR IGNORE INTO dynamic_watermark (uid, pub_ts) VALUES (?, ?)", (uid, watermark)
+        )
+        await db.commit()
+        logger.info(f"uid {uid} 没有动态水位线，从当前时间开始监控")
+        return watermark
+
+
+async def filter_unseen(uid: int, id_strs: Iterable[str]) -> set[str]:
+    """返回 id_strs 中还没有播报过的动态 id"""
+    id_strs = set(id_strs)
+    if not id_strs:
+        return set()
+    placeholders = ",".join("?" * len(id_strs))
+    async with get_db_connection(DYNAMIC_STATE_DB_PATH) as db:
+        async with db.execute(
+            f"SELECT id_str FROM dynamic_seen WHERE uid = ? AND id_str IN ({placeholders})",
+            (uid, *id_strs),
+        ) as cursor:
+            seen = {row[0] for row in await cursor.fetchall()}
+    return id_strs - seen
+
+
+async def mark_announced(uid: int, id_str: str, pub_ts: int) -> None:
+    """
+    记录一条已播报的动态并推进水位线
+
+    在同一个事务中写入，重启后不会出现水位线已推进但 id 未记录（或相反）的情况
+    """
+    async with get_db_connection(DYNAMIC_STATE_DB_PATH) as db:
+        await db.execute(
+            "INSERT OR IGNORE INTO dynamic_seen (uid, id_str, pub_ts, seen_ts) VALUES (?, ?, ?, ?)",
+            (uid, id_str, pub_ts, int(time.time())),
+        )
+        await db.execute(
+            """
+            INSERT INTO dynamic_watermark (uid, pub_ts) VALUES (?, ?)
+            ON CONFLICT(uid) DO UPDATE SET pub_ts = MAX(pub_ts, excluded.pub_ts)
+            """,
+            (uid, pub_ts),
+        )
+        # 只保留最近的 SEEN_ID_LIMIT 条
+        await db.execute(
+            """
+            DELETE FROM dynamic_seen WHERE uid = ? AND id_str NOT IN (
+                SELECT id_str FROM dynamic_seen WHERE uid = ?
+                ORDER BY pub_ts DESC, seen_ts DESC LIMIT ?
+            )
+            """,
+            (uid, uid, SEEN_ID_LIMIT),
+        )
+        await db.commit()
+
+
+async def load_pub_timestamps() -> list[int]:
+    """所有已播报动态的发布时间，用于统计活跃时段"""
+    async with get_db_connection(DYNAMIC_STATE_DB_PATH) as db:
+        async with db.execute("SELECT pub_ts FROM dynamic_seen") as cursor:
+            return [row[0] for row in await cursor.fetchall()]
+
+
+def is_new_dynamic(pub_ts: int, watermark: int, id_str: str, unseen: set[str]) -> bool:
+    """
+    发布时间晚于水位线，或与水位线同一秒但还没有播报过的动态
+
+    只比较时间戳时，同一秒发布的两条动态会被当作同一条
+    """
+    if not id_str:
+        return pub_ts > watermark
+    return pub_ts >= watermark and id_str in unseen
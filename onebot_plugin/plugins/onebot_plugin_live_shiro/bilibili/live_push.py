@@ -0,0 +1,212 @@
+import asyncio
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, Optional
+
+from nonebot import get_plugin_config, logger
+
+from bilibili_api import live
+
+from ..config import Config
+from .api_tape import bili_api_tape
+from .common import bili_credential
+
+plugin_config = get_plugin_config(Config)
+
+# 开播、下播（或切换为轮播）、修改直播间信息
+LIVE_STATUS_EVENTS = ("LIVE", "PREPARING", "ROOM_CHANGE")
+
+# 推送事件在磁带中的 api 名称，key 为直播间号
+DANMAKU_TAPE_API = "danmaku"
+
+# 服务端每 30 秒回复一次心跳（VIEW 事件），超过该时间没有收到任何帧视为连接已失效
+FRAME_TIMEOUT = 90
+
+RECONNECT_MIN_DELAY = 1
+RECONNECT_MAX_DELAY = 120
+
+
+class TapeDanmaku:
+    """
+    LiveDanmaku 的本地替身，回放磁带中录制的推送事件
+
+    只实现 LivePushMonitor 用到的接口（on / connect / disconnect / get_status）。
+    事件按录制时的间隔 × latency_scale 依次分发，放完后保持连接但不再产生事件，
+    与一个安静的直播间相同（之后由 LivePushMonitor 的超时检测断开重连）
+    """
+
+    def __init__(self, room_display_id: int, frames: list[tuple[float, dict]], latency_scale: float = 1.0) -> None:
+        self.room_display_id = room_display_id
+        self._frames = frames
+        self._latency_scale = latency_scale
+        self._handlers: dict[str, list[Callable[[dict], Awaitable]]] = defaultdict(list)
+        self._closed: Optional[asyncio.Event] = None
+        self._status = live.LiveDanmaku.STATUS_INIT
+
+    def on(self, event_name: str):
+        def decorator(func):
+            self._handlers[event_name].append(func)
+            return func
+        return decorator
+
+    def get_status(self) -> int:
+        return self._status
+
+    async def _dispatch(self, event: dict) -> None:
+        for handler in [*self._handlers[event["type"]], *self._handlers["ALL"]]:
+            await handler(event)
+
+    async def connect(self) -> None:
+        self._closed = asyncio.Event()
+        self._status = live.LiveDanmaku.STATUS_ESTABLISHED
+        await self._dispatch({"room_display_id": self.room_display_id, "type": "VERIFICATION_SUCCESSFUL", "data": {}})
+        for gap, event in self._frames:
+            if self._closed.is_set():
+                break
+            if gap > 0 and self._latency_scale > 0:
+                await asyncio.sleep(gap * self._latency_scale)
+            await self._dispatch(event)
+        await self._closed.wait()
+        self._status = live.LiveDanmaku.STATUS_CLOSED
+
+    async def disconnect(self) -> None:
+        if self._closed is not None:
+            self._closed.set()
+
+
+def create_danmaku(room_id: int):
+    """回放磁带中有该直播间的推送事件时使用本地替身，否则连接B站"""
+    if bili_api_tape.mode == "replay":
+        frames = bili_api_tape.events(DANMAKU_TAPE_API, str(room_id))
+        if frames:
+            return TapeDanmaku(room_id, frames, bili_api_tape.latency_scale)
+    return live.LiveDanmaku(room_id, credential=bili_credential)
+
+
+class LivePushMonitor:
+    """
+    通过直播间的弹幕/广播 websocket 接收开播、下播事件
+
+    收到 LIVE_STATUS_EVENTS 时立即调用 on_status_event，通常不到一秒即可播报；
+    连接断开或超过 FRAME_TIMEOUT 秒没有收到任何帧（心跳回复也算）时按指数退避自动重连。
+    连接状态变化时调用 on_connection_change，断线期间由轮询兜底
+    """
+
+    def __init__(
+        self,
+        room_id: int,
+        on_status_event: Callable[[dict], Awaitable[None]],
+        on_connection_change: Callable[[bool], None],
+        danmaku_factory: Callable[[int], object] = create_danmaku,
+    ) -> None:
+        self.room_id = room_id
+        self._on_status_event = on_status_event
+        self._on_connection_change = on_connection_change
+        self._danmaku_factory = danmaku_factory
+        self._frame_handlers: list[Callable[[dict], None]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._pending: set[asyncio.Task] = set()
+        self.connected = False
+        self.last_frame = 0.0
+        self.frames = 0
+        self.status_events = 0
+        self.reconnects = 0
+
+    def add_frame_handler(self, handler: Callable[[dict], None]) -> None:
+        """注册收到每一帧时的同步回调，回调中不要做耗时操作"""
+        self._frame_handlers.append(handler)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._set_connected(False)
+        await bili_api_tape.flush()
+
+    def _set_connected(self, connected: bool) -> None:
+        if connected == self.connected:
+            return
+        self.connected = connected
+        logger.info(f"直播间 {self.room_id} 推送连接{'已建立' if connected else '已断开'}")
+        try:
+            self._on_connection_change(connected)
+        except Exception as e:
+            logger.warning(f"处理推送连接状态变化失败: {e}")
+
+    async def _handle_status_event(self, event: dict) -> None:
+        self.status_events += 1
+        logger.info(f"直播间 {self.room_id} 推送事件 {event.get('type')}")
+        try:
+            await self._on_status_event(event)
+        except Exception as e:
+            logger.warning(f"处理直播间推送事件 {event.get('type')} 失败: {e}")
+
+    def _bind(self, danmaku) -> None:
+        @danmaku.on("VERIFICATION_SUCCESSFUL")
+        async def _(event: dict) -> None:
+            self._set_connected(True)
+
+        @danmaku.on("ALL")
+        async def _(event: dict) -> None:
+            self.last_frame = time.monotonic()
+            self.frames += 1
+            bili_api_tape.record_event(DANMAKU_TAPE_API, str(self.room_id), event)
+            for handler in self._frame_handlers:
+                try:
+                    handler(event)
+                except Exception as e:
+                    logger.warning(f"处理直播间推送帧失败: {e}")
+
+        async def on_status(event: dict) -> None:
+            # 不阻塞接收循环，播报需要请求直播间信息和发送消息
+            task = asyncio.create_task(self._handle_status_event(event))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+        for name in LIVE_STATUS_EVENTS:
+            danmaku.on(name)(on_status)
+
+    async def _watchdog(self, danmaku) -> None:
+        while True:
+            await asyncio.sleep(FRAME_TIMEOUT / 3)
+            if self.connected and time.monotonic() - self.last_frame > FRAME_TIMEOUT:
+                logger.warning(f"直播间 {self.room_id} 推送超过 {FRAME_TIMEOUT} 秒没有数据，重新连接")
+                await danmaku.disconnect()
+                return
+
+    async def _run(self) -> None:
+        delay = RECONNECT_MIN_DELAY
+        while True:
+            danmaku = self._danmaku_factory(self.room_id)
+            self._bind(danmaku)
+            self.last_frame = time.monotonic()
+            watchdog = asyncio.create_task(self._watchdog(danmaku))
+            try:
+                await danmaku.connect()
+            except asyncio.CancelledError:
+                await danmaku.disconnect()
+                raise
+            except Exception as e:
+                logger.warning(f"直播间 {self.room_id} 推送连接失败: {e}")
+            finally:
+                watchdog.cancel()
+                was_connected = self.connected
+                self._set_connected(False)
+
+            # 连接成功过则从最短间隔重新开始退避
+            delay = RECONNECT_MIN_DELAY if was_connected else min(RECONNECT_MAX_DELAY, delay * 2)
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        return {
+            "connected": self.connected,
+            "frames": self.frames,
+            "status_events": self.status_events,
+            "reconnects": self.reconnects,
+        }
@@ -1,23 +1,41 @@
+import asyncio
+from io import BytesIO
 from typing import Optional
 
-from nonebot import get_plugin_config, logger
+from nonebot import get_driver, get_plugin_config, logger
 from nonebot.adapters import Bot
 from nonebot.adapters.onebot.v11 import Message, MessageSegment
-from nonebot_plugin_apscheduler import scheduler
 
 from bilibili_api import live
 
 from ..config import Config
-from .common import bili_credential
+from ..message_render.assets import asset_cache
+from .adaptive_poll import AdaptivePoller, activity_hours
+from .api_tape import bili_api_tape
+from .common import bili_credential, bili_request_budget
+from .danmaku_stats import danmaku_collector
+from .live_push import LivePushMonitor
 
 from pathlib import Path
 import json
+import time
 
 CACHE_PATH = Path("./cache/live_status.txt")
 
 plugin_config = get_plugin_config(Config)
 
 live_status = 0
+# 开播后转为轮播时本场直播已经结束，弹幕摘要先保存下来，真正下播时附在播报后
+pending_danmaku_summary: Optional[str] = None
+
+live_poller: Optional[AdaptivePoller] = None
+live_push: Optional[LivePushMonitor] = None
+# 推送事件和兜底轮询可能同时触发检查，串行执行避免重复播报
+_check_lock: Optional[asyncio.Lock] = None
+
+# 推送事件到达时接口数据偶尔还没有更新，按该间隔重试几次
+PUSH_CONFIRM_ATTEMPTS = 3
+PUSH_CONFIRM_DELAY = 2
 
 def load_live_status_from_cache() -> int:
     if not CACHE_PATH.exists():
@@ -33,19 +51,44 @@ def save_live_status_to_cache(status: int):
     CACHE_PATH.write_text(str(status), encoding="utf-8")
 
 
-async def check_live_status(bot: Bot):
-    global live_status
+async def check_live_status(bot: Bot) -> bool:
+    """
+    检查直播状态并在变化时播报
+
+    返回 True 表示状态刚刚变化或正在直播，此时轮询保持最快的频率，以便及时发现下播
+    """
+    global _check_lock
+    if _check_lock is None:
+        _check_lock = asyncio.Lock()
+    async with _check_lock:
+        return await _check_live_status(bot)
+
+async def _check_live_status(bot: Bot) -> bool:
+    global live_status, pending_danmaku_summary
 
     live_room = live.LiveRoom(plugin_config.live_shiro_bilibili_live_room_id, credential=bili_credential)
-    live_room_info = await live_room.get_room_info()
+    await bili_request_budget.acquire()
+    live_room_info = await bili_api_tape.call(
+        "get_room_info", str(plugin_config.live_shiro_bilibili_live_room_id), live_room.get_room_info
+    )
     room_info = live_room_info["room_info"]
     logger.info(f"room_info: {json.dumps(room_info, ensure_ascii=False)}")
     if room_info["live_status"] == live_status:
         logger.info("Live status is not changed, skip broadcast.")
-        return
+        return live_status == 1
 
+    was_live = live_status == 1
     live_status = room_info["live_status"]
     save_live_status_to_cache(live_status)
+    danmaku_summary = None
+    if live_status == 1:
+        activity_hours.observe(time.time())
+        danmaku_collector.start_session()
+        pending_danmaku_summary = None
+    elif was_live:
+        pending_danmaku_summary = danmaku_collector.finish_session()
+    if live_status == 0:
+        danmaku_summary, pending_danmaku_summary = pending_danmaku_summary, None
 
     message = Message(MessageSegment.at('all'))
     if live_status == 0:
@@ -56,7 +99,10 @@ async def check_live_status(bot: Bot):
         message += " Shiro 正在播放轮播视频喵~\n"
 
     if cover_url := room_info.get("cover"):
-        message.append(MessageSegment.image(cover_url))
+        # 启用图片资源缓存时，封面先下载（并按需缩小）到本地，以图片内容发送，每个群发送时不必再各自下载；
+        # 未启用时与渲染页面一样不经过缓存，直接发送链接
+        cover = await asset_cache.get(cover_url) if plugin_config.live_shiro_render_asset_cache else None
+        message.append(MessageSegment.image(BytesIO(cover[0]) if cover else cover_url))
         message.append(MessageSegment.text("\n"))
 
     if title := room_info.get("title"):
@@ -66,14 +112,78 @@ async def check_live_status(bot: Bot):
         message.append(MessageSegment.text(f"简介：{descritpion}\n"))
 
     message.append(MessageSegment.text(f"直播间地址：https://live.bilibili.com/{plugin_config.live_shiro_bilibili_live_room_id}"))
+    if danmaku_summary:
+        message.append(MessageSegment.text(f"\n{danmaku_summary}"))
     for group_id in plugin_config.live_shiro_group_ids:
         await bot.send_group_msg(group_id=group_id, message=message)
+    return True
+
+def is_expected_status(event_type: str) -> bool:
+    """当前状态是否已经与推送事件一致，ROOM_CHANGE 不涉及开播状态"""
+    if event_type == "LIVE":
+        return live_status == 1
+    if event_type == "PREPARING":
+        return live_status != 1
+    return True
+
+async def handle_live_push_event(bot: Bot, event: dict) -> None:
+    """推送事件只说明状态可能变化，播报内容仍以 get_room_info 为准"""
+    for attempt in range(PUSH_CONFIRM_ATTEMPTS):
+        if attempt > 0:
+            await asyncio.sleep(PUSH_CONFIRM_DELAY)
+        await check_live_status(bot)
+        if is_expected_status(event.get("type", "")):
+            return
+    logger.warning(f"收到推送事件 {event.get('type')}，但直播间状态仍为 {live_status}")
+
+def on_live_push_connection_change(connected: bool) -> None:
+    """推送连接正常时轮询只作为低频核对，断开后恢复为正常的轮询频率"""
+    if live_poller is None:
+        return
+    if connected:
+        interval = plugin_config.live_shiro_live_reconcile_interval
+        live_poller.set_intervals(interval, interval)
+    else:
+        live_poller.set_intervals(
+            plugin_config.live_shiro_live_poll_min_interval,
+            plugin_config.live_shiro_live_poll_max_interval,
+        )
+    # 连接建立或断开前后可能错过了事件，立即核对一次
+    live_poller.start(delay=0)
 
 async def start_monitor_bilibili_live_status(bot: Bot) -> Optional[Message]:
-    global live_status
+    global live_status, live_poller, live_push
 
     live_status = load_live_status_from_cache()
     logger.info(f"Initialized live_status from cache: {live_status}")
 
-    scheduler.add_job(check_live_status, "interval", minutes=1, kwargs={'bot': bot})
-    return Message("已开始监控 Shiro 的B站直播状态喵~")
+    live_poller = AdaptivePoller(
+        "job_check_live_status",
+        lambda: check_live_status(bot),
+        min_interval=plugin_config.live_shiro_live_poll_min_interval,
+        max_interval=plugin_config.live_shiro_live_poll_max_interval,
+        hot_window=plugin_config.live_shiro_poll_hot_window,
+    )
+    live_poller.start(delay=0)
+
+    if not plugin_config.live_shiro_live_push:
+        return Message("已开始监控 Shiro 的B站直播状态喵~")
+
+    if live_push is not None:
+        await live_push.stop()
+    live_push = LivePushMonitor(
+        plugin_config.live_shiro_bilibili_live_room_id,
+        lambda event: handle_live_push_event(bot, event),
+        on_live_push_connection_change,
+    )
+    # 推送帧同时用于弹幕统计，重启时正在直播则从现在开始统计
+    live_push.add_frame_handler(danmaku_collector.ingest)
+    if live_status == 1 and danmaku_collector.session is None:
+        danmaku_collector.start_session()
+    live_push.start()
+    return Message("已开始监控 Shiro 的B站直播状态喵~（推送模式）")
+
+@get_driver().on_shutdown
+async def _stop_live_push():
+    if live_push is not None:
+        await live_push.stop()
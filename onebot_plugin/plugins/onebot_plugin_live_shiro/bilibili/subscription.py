@@ -0,0 +1,133 @@
+import os
+from dataclasses import dataclass
+
+from nonebot import CommandGroup, get_plugin_config, logger
+from nonebot.adapters.onebot.v11 import GroupMessageEvent, Message
+from nonebot.params import CommandArg
+from nonebot.permission import SUPERUSER
+from nonebot.rule import to_me
+
+from ..common import get_db_connection
+from ..config import Config
+
+SUBSCRIPTION_DB_PATH = "./cache/dynamic_subscription.db"
+# 记录在 PRAGMA user_version 中，非 0 表示默认订阅已经添加过
+SUBSCRIPTION_SCHEMA_VERSION = 1
+
+plugin_config = get_plugin_config(Config)
+
+
+@dataclass(frozen=True)
+class Subscription:
+    """一个群对一个 UP 主动态的订阅"""
+    uid: int
+    group_id: int
+    # 播报时是否 @全体成员
+    mention_all: bool = True
+
+
+# -------------------- 数据库操作 --------------------
+async def init_db() -> None:
+    os.makedirs(os.path.dirname(SUBSCRIPTION_DB_PATH), exist_ok=True)
+    async with get_db_connection(SUBSCRIPTION_DB_PATH) as db:
+        async with db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'dynamic_subscription'"
+        ) as cursor:
+            table_existed = await cursor.fetchone() is not None
+        async with db.execute("PRAGMA user_version") as cursor:
+            (version,) = await cursor.fetchone()
+
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS dynamic_subscription (
+                uid INTEGER NOT NULL,
+                group_id INTEGER NOT NULL,
+                mention_all INTEGER NOT NULL DEFAULT 1,
+                create_ts DATETIME DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (uid, group_id)
+            )
+        """)
+        if version >= SUBSCRIPTION_SCHEMA_VERSION:
+            await db.commit()
+            return
+
+        # 只在第一次建表时把配置中的 Shiro 和群组作为默认订阅，保持原有的播报行为；
+        # 之后即使订阅被全部取消也不再添加。旧版本已经建过表的数据库只补上版本号
+        if not table_existed and plugin_config.live_shiro_uid > 0:
+            await db.executemany(
+                "INSERT OR IGNORE INTO dynamic_subscription (uid, group_id, mention_all) VALUES (?, ?, 1)",
+                [(plugin_config.live_shiro_uid, group_id) for group_id in plugin_config.live_shiro_group_ids],
+            )
+            logger.info(f"已为 {len(plugin_config.live_shiro_group_ids)} 个群添加默认动态订阅")
+        await db.execute(f"PRAGMA user_version = {SUBSCRIPTION_SCHEMA_VERSION}")
+        await db.commit()
+
+
+async def add_subscription(uid: int, group_id: int, mention_all: bool = True) -> None:
+    async with get_db_connection(SUBSCRIPTION_DB_PATH) as db:
+        await db.execute(
+            """
+            INSERT INTO dynamic_subscription (uid, group_id, mention_all) VALUES (?, ?, ?)
+            ON CONFLICT(uid, group_id) DO UPDATE SET mention_all = excluded.mention_all
+            """,
+            (uid, group_id, int(mention_all)),
+        )
+        await db.commit()
+
+
+async def remove_subscription(uid: int, group_id: int) -> bool:
+    async with get_db_connection(SUBSCRIPTION_DB_PATH) as db:
+        cursor = await db.execute(
+            "DELETE FROM dynamic_subscription WHERE uid = ? AND group_id = ?", (uid, group_id)
+        )
+        await db.commit()
+        return cursor.rowcount > 0
+
+
+async def load_subscriptions() -> dict[int, list[Subscription]]:
+    """返回 uid -> 订阅列表"""
+    subscriptions: dict[int, list[Subscription]] = {}
+    async with get_db_connection(SUBSCRIPTION_DB_PATH) as db:
+        async with db.execute(
+            "SELECT uid, group_id, mention_all FROM dynamic_subscription ORDER BY uid, group_id"
+        ) as cursor:
+            for uid, group_id, mention_all in await cursor.fetchall():
+                subscriptions.setdefault(uid, []).append(Subscription(uid, group_id, bool(mention_all)))
+    return subscriptions
+
+
+# -------------------- 指令 --------------------
+subscription_command_group = CommandGroup("dynamic_sub", rule=to_me(), permission=SUPERUSER)
+
+add_command = subscription_command_group.command("add")
+@add_command.handle()
+async def _(event: GroupMessageEvent, args: Message = CommandArg()):
+    params = args.extract_plain_text().split()
+    if not params or not params[0].isdigit():
+        await add_command.finish("用法：/dynamic_sub.add <uid> [at]，加上 at 时播报会@全体成员喵~")
+    mention_all = len(params) > 1 and params[1].lower() == "at"
+    await add_subscription(int(params[0]), event.group_id, mention_all)
+    await add_command.finish(f"本群已订阅 uid {params[0]} 的动态喵~")
+
+remove_command = subscription_command_group.command("del")
+@remove_command.handle()
+async def _(event: GroupMessageEvent, args: Message = CommandArg()):
+    uid = args.extract_plain_text().strip()
+    if not uid.isdigit():
+        await remove_command.finish("用法：/dynamic_sub.del <uid>")
+    if await remove_subscription(int(uid), event.group_id):
+        await remove_command.finish(f"本群已取消订阅 uid {uid} 的动态喵~")
+    await remove_command.finish(f"本群没有订阅 uid {uid} 的动态喵~")
+
+list_command = subscription_command_group.command("list")
+@list_command.handle()
+async def _(event: GroupMessageEvent):
+    subscriptions = await load_subscriptions()
+    lines = [
+        f"uid {uid}" + ("（@全体成员）" if sub.mention_all else "")
+        for uid, subs in subscriptions.items()
+        for sub in subs
+        if sub.group_id == event.group_id
+    ]
+    if not lines:
+        await list_command.finish("本群还没有订阅任何动态喵~")
+    await list_command.finish("本群订阅的动态：\n" + "\n".join(lines))
@@ -51,15 +51,23 @@ help_list = [
     ["/", "@小助手 /steam", "查看Shiro的stream好友码"]
 ]
 
-help_command = on_command("help", aliases={"h", "帮助", "菜单"}, rule=to_me())
-@help_command.handle()
-async def _(event: MessageEvent):
-    table_data = {
+def help_table_data() -> dict:
+    return {
         "title": "小助手指令列表",
         "headers": ["前置条件", "指令格式", "功能说明"],
         "rows": help_list
     }
-    image_data = await message_render.render_png_from_template(message_render.RenderPageType.TABLE, table_data, width=800)
+
+# 指令表只在 help_list 或模板变化时才需要重新渲染，启动时在后台预渲染
+message_render.register_static_view("help", message_render.RenderPageType.TABLE, help_table_data, width=800)
+
+help_command = on_command("help", aliases={"h", "帮助", "菜单"}, rule=to_me())
+@help_command.handle()
+async def _(event: MessageEvent):
+    try:
+        image_data = await message_render.get_static_view("help")
+    except message_render.RenderBusyError:
+        await help_command.finish("小助手正忙着画图，请稍后再试喵~")
     await help_command.finish(message=Message([
         MessageSegment.reply(event.message_id),
         MessageSegment.image(image_data)
@@ -18,3 +18,42 @@ class Config(BaseModel):
     live_shiro_twitch_oauth_host:str = ""
     live_shiro_twitch_oauth_port:int = -1
     live_shiro_twitch_oauth_scope:str = ""
+    live_shiro_render_page_pool_size: int = 4
+    live_shiro_render_cache_size: int = 64
+    live_shiro_render_cache_disk: bool = True
+    live_shiro_render_cache_disk_bytes: int = 64 * 1024 * 1024
+    live_shiro_render_image_timeout_ms: int = 3000
+    live_shiro_render_asset_cache: bool = True
+    live_shiro_render_asset_cache_bytes: int = 256 * 1024 * 1024
+    live_shiro_render_asset_max_width: int = 1200
+    live_shiro_render_asset_prefetch_concurrency: int = 8
+    live_shiro_forward_single_pass: bool = True
+    live_shiro_dynamic_catchup_limit: int = 5
+    live_shiro_dynamic_render_concurrency: int = 3
+    live_shiro_dynamic_poll_min_interval: int = 60
+    live_shiro_dynamic_poll_max_interval: int = 1800
+    live_shiro_dynamic_poll_jitter: float = 0.2
+    live_shiro_bili_requests_per_minute: int = 30
+    live_shiro_live_poll_min_interval: int = 30
+    live_shiro_live_poll_max_interval: int = 600
+    live_shiro_poll_hot_window: int = 1800
+    live_shiro_live_push: bool = True
+    live_shiro_live_reconcile_interval: int = 900
+    live_shiro_danmaku_buffer_size: int = 2000
+    live_shiro_bili_tape_mode: str = "off"
+    live_shiro_bili_tape_path: str = "./cache/bili_tape.jsonl.gz"
+    live_shiro_bili_tape_latency_scale: float = 1.0
+    live_shiro_render_max_concurrency: int = 2
+    live_shiro_render_queue_size: int = 16
+    live_shiro_render_queue_timeout: float = 30
+    live_shiro_browser_recycle_renders: int = 500
+    live_shiro_browser_recycle_rss_mb: int = 1024
+    live_shiro_browser_drain_timeout: float = 30
+    live_shiro_render_formats: dict[str, list[str]] = {}
+    live_shiro_render_max_bytes: int = 1024 * 1024
+    live_shiro_render_png_compress_level: int = 6
+    live_shiro_render_quality: int = 85
+    live_shiro_render_worker_mode: str = "thread"
+    live_shiro_render_workers: int = 2
+    live_shiro_render_backends: dict[str, str] = {}
+    live_shiro_render_template_watch: bool = False
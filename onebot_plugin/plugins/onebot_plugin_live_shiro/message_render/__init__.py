@@ -1,17 +1,72 @@
 from .renderer import *
-from nonebot import get_driver
-from .browser import browser_manager  # 使用单例管理器
+from nonebot import get_driver, get_plugin_config, on_command
+from nonebot.permission import SUPERUSER
+from nonebot.rule import to_me
+from ..config import Config
+from .assets import asset_cache
+from .backend import uses_chromium
+from .cache import render_cache
+from .page_type import RenderPageType
+from .prewarm import get_static_view, register_static_view, start_prewarm, stop_prewarm
+from .templating import start_template_watch, stop_template_watch
+from .render_queue import render_scheduler
+from .worker import loop_lag_monitor, shutdown_workers
 
 driver = get_driver()
+plugin_config = get_plugin_config(Config)
+
+
+def _on_templates_changed(affected: set[str]) -> None:
+    """模板热更新后，清除受影响模板的渲染缓存"""
+    for render_type in RenderPageType:
+        if render_type.value in affected:
+            render_cache.invalidate(render_type.name)
+    # 静态渲染结果的签名包含模板版本，重新预热即可替换过期的图片
+    start_prewarm()
 
 
 @driver.on_startup
 async def _startup():
-    """插件启动时初始化浏览器"""
-    await browser_manager.init_browser()
+    """插件启动时初始化浏览器，所有模板都使用 pillow 后端时不启动浏览器"""
+    loop_lag_monitor.start()
+    if plugin_config.live_shiro_render_template_watch:
+        start_template_watch(_on_templates_changed)
+    if uses_chromium():
+        from .browser import browser_manager  # 使用单例管理器
+        await browser_manager.init_browser()
+    # 在后台预渲染 /help 等静态图片，不阻塞启动
+    start_prewarm()
 
 
 @driver.on_shutdown
 async def _shutdown():
     """插件关闭时安全关闭浏览器"""
-    await browser_manager.close_browser()
+    loop_lag_monitor.stop()
+    stop_template_watch()
+    stop_prewarm()
+    if uses_chromium():
+        from .browser import browser_manager
+        await browser_manager.close_browser()
+    await asset_cache.close()
+    shutdown_workers()
+
+
+render_stats_command = on_command("render_stats", rule=to_me(), permission=SUPERUSER)
+
+@render_stats_command.handle()
+async def _():
+    sections = {
+        "事件循环延迟": loop_lag_monitor.stats(),
+        "渲染队列": render_scheduler.stats(),
+        "渲染缓存": render_cache.stats(),
+        "图片资源缓存": asset_cache.stats(),
+    }
+    if uses_chromium():
+        from .browser import browser_manager
+        sections["浏览器"] = browser_manager.stats()
+    lines = []
+    for title, stats in sections.items():
+        lines.append(f"【{title}】")
+        for key, value in stats.items():
+            lines.append(f"  {key}: {value:.2f}" if isinstance(value, float) else f"  {key}: {value}")
+    await render_stats_command.finish("\n".join(lines))
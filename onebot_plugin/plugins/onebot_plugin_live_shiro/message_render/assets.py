@@ -0,0 +1,241 @@
+import asyncio
+import hashlib
+import os
+import re
+from io import BytesIO
+from pathlib import Path
+from typing import TYPE_CHECKING, Awaitable, Callable, Iterable, Optional
+
+import httpx
+from nonebot import get_plugin_config, logger
+from PIL import Image
+
+if TYPE_CHECKING:
+    from playwright.async_api import Page, Route
+
+from ..config import Config
+from .cache import evict_dir_to_budget
+
+plugin_config = get_plugin_config(Config)
+
+ASSET_CACHE_DIR = Path("./cache/assets")
+
+# B站图床需要带上 Referer，否则可能返回 403
+ASSET_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+    ),
+    "Referer": "https://www.bilibili.com/",
+}
+
+# 只拦截 http(s) 请求，data: URL 不经过网络
+ASSET_ROUTE_PATTERN = re.compile(r"^https?://")
+
+# 按 url 获取图片，返回 (图片内容, content-type)，失败时返回 None
+AssetSource = Callable[[str], Awaitable[Optional[tuple[bytes, str]]]]
+
+# 缩小图片时保持原格式，其余格式（gif 等）原样保留
+DOWNSCALE_FORMATS = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+
+
+def downscale_image(body: bytes, content_type: str, max_width: int) -> tuple[bytes, str]:
+    """
+    把宽度超过 max_width 的图片等比缩小
+
+    卡片中的图片最终都会缩放到卡片宽度，原图（相簿原图常有 4000px 宽）直接嵌入
+    只会增加下载后的解码和截图开销；无法识别或动图时原样返回
+    """
+    if max_width <= 0:
+        return body, content_type
+    try:
+        with Image.open(BytesIO(body)) as img:
+            if img.width <= max_width or img.format not in DOWNSCALE_FORMATS or getattr(img, "is_animated", False):
+                return body, content_type
+            image_format = img.format
+            height = max(1, round(img.height * max_width / img.width))
+            resized = img.resize((max_width, height), Image.LANCZOS)
+    except Exception:
+        return body, content_type
+
+    buf = BytesIO()
+    if image_format == "JPEG":
+        resized.convert("RGB").save(buf, format="JPEG", quality=90)
+    else:
+        resized.save(buf, format=image_format)
+    if buf.tell() >= len(body):
+        return body, content_type
+    return buf.getvalue(), DOWNSCALE_FORMATS[image_format]
+
+
+class AssetCache:
+    """
+    图片资源缓存
+
+    渲染页面中的图片请求通过 page.route 拦截，优先从 cache_dir 读取；
+    未命中时使用共享的 httpx 客户端下载并写入磁盘，目录总大小超过 budget 时按最久未使用淘汰。
+    """
+
+    def __init__(self, cache_dir: Path, budget: int) -> None:
+        self._cache_dir = cache_dir
+        self._budget = budget
+        self._source: Optional[AssetSource] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._prefetch_semaphore: Optional[asyncio.Semaphore] = None
+        self.hits = 0
+        self.misses = 0
+        self.prefetched = 0
+        self.downscaled_bytes = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """共享的 HTTP 客户端，复用连接池"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers=ASSET_HEADERS,
+                timeout=10,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=16, max_keepalive_connections=8),
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def set_source(self, source: Optional[AssetSource], cache_dir: Optional[Path] = None) -> None:
+        """
+        替换图片的获取方式，用于离线回放和模板回归测试，不访问网络；source 为 None 时恢复为下载
+
+        同时指定 cache_dir 可以避免读到之前缓存的真实图片
+        """
+        self._source = source
+        if cache_dir is not None:
+            self._cache_dir = cache_dir
+
+    async def get(self, url: str) -> Optional[tuple[bytes, str]]:
+        """返回 (图片内容, content-type)，下载失败时返回 None"""
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+        if (cached := await asyncio.to_thread(self._read, key)) is not None:
+            self.hits += 1
+            return cached
+
+        # 同一个 url 同时只下载一次，其余请求等待同一个结果
+        if (future := self._inflight.get(key)) is not None:
+            return await asyncio.shield(future)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        result = None
+        try:
+            result = await (self._source or self._fetch)(url)
+            if result is not None:
+                result = await self._downscale(*result)
+                await asyncio.to_thread(self._write, key, *result)
+        except OSError as e:
+            logger.warning(f"写入图片资源缓存失败: {e}")
+        finally:
+            self._inflight.pop(key, None)
+            future.set_result(result)
+        return result
+
+    async def prefetch(self, urls: Iterable[str]) -> int:
+        """
+        并发下载 urls 中还没有缓存的图片，返回本次下载成功的数量
+
+        在动态或直播间信息解析后立即调用，渲染页面请求图片时直接命中缓存（或等待进行中的下载），
+        不必等到 set_content 之后才由浏览器逐个发现；并发数不超过 live_shiro_render_asset_prefetch_concurrency
+        """
+        urls = list(dict.fromkeys(url for url in urls if url and ASSET_ROUTE_PATTERN.match(url)))
+        if not urls:
+            return 0
+        if self._prefetch_semaphore is None:
+            self._prefetch_semaphore = asyncio.Semaphore(
+                max(1, plugin_config.live_shiro_render_asset_prefetch_concurrency)
+            )
+
+        async def fetch_one(url: str) -> bool:
+            key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+            if await asyncio.to_thread(self._path(key).exists):
+                return False
+            async with self._prefetch_semaphore:
+                return await self.get(url) is not None
+
+        fetched = sum(await asyncio.gather(*(fetch_one(url) for url in urls)))
+        self.prefetched += fetched
+        return fetched
+
+    async def _downscale(self, body: bytes, content_type: str) -> tuple[bytes, str]:
+        max_width = plugin_config.live_shiro_render_asset_max_width
+        if not content_type.startswith("image/") or max_width <= 0:
+            return body, content_type
+        resized, content_type = await asyncio.to_thread(downscale_image, body, content_type, max_width)
+        self.downscaled_bytes += len(body) - len(resized)
+        return resized, content_type
+
+    async def _fetch(self, url: str) -> Optional[tuple[bytes, str]]:
+        try:
+            resp = await self.client.get(url)
+            resp.raise_for_status()
+        except httpx.HTTPError as e:
+            logger.warning(f"下载图片资源失败 {url}: {e}")
+            return None
+        content_type = resp.headers.get("content-type", "application/octet-stream")
+        return resp.content, content_type
+
+    def _path(self, key: str) -> Path:
+        return self._cache_dir / f"{key}.asset"
+
+    def _read(self, key: str) -> Optional[tuple[bytes, str]]:
+        path = self._path(key)
+        try:
+            raw = path.read_bytes()
+            os.utime(path)
+        except OSError:
+            return None
+        # 文件格式：content-type + "\n" + 内容
+        content_type, _, body = raw.partition(b"\n")
+        return body, content_type.decode("ascii", "replace")
+
+    def _write(self, key: str, body: bytes, content_type: str) -> None:
+        self._cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_bytes(content_type.encode("ascii", "replace") + b"\n" + body)
+        tmp_path.replace(path)
+        evict_dir_to_budget(self._cache_dir, "*.asset", self._budget)
+
+    async def handle_route(self, route: "Route") -> None:
+        """page.route 回调：图片走缓存，其余请求正常放行"""
+        request = route.request
+        if request.resource_type != "image":
+            await route.continue_()
+            return
+
+        result = await self.get(request.url)
+        if result is None:
+            # 让 <img> 触发 error，由模板替换为占位图
+            await route.abort()
+            return
+
+        body, content_type = result
+        await route.fulfill(status=200, body=body, content_type=content_type)
+
+    async def install(self, page: "Page") -> None:
+        """在页面上启用图片拦截"""
+        await page.route(ASSET_ROUTE_PATTERN, self.handle_route)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "prefetched": self.prefetched,
+            "downscaled_bytes": self.downscaled_bytes,
+        }
+
+
+asset_cache = AssetCache(ASSET_CACHE_DIR, plugin_config.live_shiro_render_asset_cache_bytes)
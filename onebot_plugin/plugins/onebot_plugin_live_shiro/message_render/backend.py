@@ -0,0 +1,94 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any
+
+from nonebot import get_plugin_config, logger
+
+from ..config import Config
+from .encoder import EncodePolicy
+from .page_type import RenderPageType
+
+plugin_config = get_plugin_config(Config)
+
+DEFAULT_BACKEND = "chromium"
+
+
+@dataclass(frozen=True)
+class RenderResult:
+    """
+    一次渲染的结果
+
+    complete 为 False 表示有图片加载失败或超时、以占位图代替，这样的结果不写入渲染缓存，
+    下次请求时重新渲染
+    """
+    image: bytes
+    complete: bool = True
+
+
+class RenderBackend(ABC):
+    """
+    渲染后端基类
+
+    - chromium：Jinja 模板 + 无头浏览器截图，支持所有模板
+    - pillow：纯 Pillow 绘制，不依赖 Playwright，只支持表格和普通动态卡片
+    """
+
+    supported_types: frozenset[RenderPageType] = frozenset(RenderPageType)
+
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        """后端名称，与 live_shiro_render_backends 中的取值相同，子类用类属性给出"""
+
+    def supports(self, render_type: RenderPageType) -> bool:
+        return render_type in self.supported_types
+
+    @abstractmethod
+    def version(self, render_type: RenderPageType) -> Any:
+        """渲染结果的版本标识，参与渲染缓存的键，后端实现变化时应随之变化"""
+
+    @abstractmethod
+    async def render(
+        self,
+        render_type: RenderPageType,
+        data: dict,
+        width: int,
+        policy: EncodePolicy,
+    ) -> RenderResult:
+        """渲染一张图片，图片加载失败时返回 complete 为 False 的结果"""
+
+
+_backends: dict[str, RenderBackend] = {}
+
+
+def load_backend(name: str) -> RenderBackend:
+    """按名称加载后端，各后端模块按需导入，未使用 chromium 时无需安装 Playwright"""
+    if name not in _backends:
+        if name == "chromium":
+            from .chromium_backend import ChromiumBackend
+            _backends[name] = ChromiumBackend()
+        elif name == "pillow":
+            from .pillow_backend import PillowBackend
+            _backends[name] = PillowBackend()
+        else:
+            raise ValueError(f"未知的渲染后端：{name}")
+    return _backends[name]
+
+
+def get_backend(render_type: RenderPageType) -> RenderBackend:
+    """根据 live_shiro_render_backends 选择模板使用的后端，不支持时回退到 chromium"""
+    name = plugin_config.live_shiro_render_backends.get(render_type.name, DEFAULT_BACKEND)
+    backend = load_backend(name)
+    if not backend.supports(render_type):
+        logger.warning(f"渲染后端 {name} 不支持 {render_type.name}，使用 {DEFAULT_BACKEND}")
+        backend = load_backend(DEFAULT_BACKEND)
+    return backend
+
+
+def uses_chromium() -> bool:
+    """是否有模板需要使用 chromium 后端"""
+    for render_type in RenderPageType:
+        name = plugin_config.live_shiro_render_backends.get(render_type.name, DEFAULT_BACKEND)
+        if name == "chromium" or not load_backend(name).supports(render_type):
+            return True
+    return False
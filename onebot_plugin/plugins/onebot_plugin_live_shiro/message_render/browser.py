@@ -1,9 +1,76 @@
 import asyncio
-from playwright.async_api import async_playwright, Browser, Playwright
+import os
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+from nonebot import get_plugin_config, logger
+from playwright.async_api import async_playwright, Browser, Page, Playwright
+
+from ..config import Config
+from .assets import asset_cache
+
+plugin_config = get_plugin_config(Config)
+
+# 页面池的键：(viewport 宽度, device_scale_factor)
+PageKey = tuple[int, float]
+
+# 页面默认高度，截图时只截 content-wrapper，高度足够即可
+DEFAULT_VIEWPORT_HEIGHT = 2000
+
+# 启动时预先创建的页面规格（动态卡片 400，转发卡片 600，表格 800）
+WARM_PAGE_KEYS: list[PageKey] = [(400, 2), (600, 2), (800, 2)]
+
+# 浏览器内存检查间隔（秒），读取 /proc 有一定开销，不必每次渲染都检查
+MEMORY_CHECK_INTERVAL = 30
+
+
+def _browser_rss_bytes() -> Optional[int]:
+    """
+    统计当前进程派生的所有 Chromium 进程的常驻内存（字节）
+
+    通过 /proc 遍历子孙进程，非 Linux 平台返回 None
+    """
+    proc = Path("/proc")
+    if not proc.is_dir():
+        return None
+
+    children: dict[int, list[int]] = {}
+    names: dict[int, str] = {}
+    for entry in proc.iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+        except OSError:
+            continue
+        # stat 格式：pid (comm) state ppid ...，comm 中可能包含空格
+        comm = stat[stat.index("(") + 1:stat.rindex(")")]
+        ppid = int(stat[stat.rindex(")") + 2:].split()[1])
+        pid = int(entry.name)
+        names[pid] = comm
+        children.setdefault(ppid, []).append(pid)
+
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    total = 0
+    stack = list(children.get(os.getpid(), []))
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(pid, []))
+        if "chrom" not in names.get(pid, "") and "headless" not in names.get(pid, ""):
+            continue
+        try:
+            rss_pages = int((proc / str(pid) / "statm").read_text().split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        total += rss_pages * page_size
+    return total
+
 
 class BrowserManager:
     """异步安全的单例浏览器管理器"""
-    
+
     _instance = None
 
     def __new__(cls):
@@ -12,44 +79,222 @@ class BrowserManager:
             cls._instance._playwright: Playwright | None = None
             cls._instance._browser: Browser | None = None
             cls._instance._lock = asyncio.Lock()
+            cls._instance._idle_pages: dict[PageKey, list[Page]] = {}
+            cls._instance._pool_size = max(0, plugin_config.live_shiro_render_page_pool_size)
+            # 看门狗状态
+            cls._instance._in_flight = 0
+            cls._instance._drained = asyncio.Event()
+            cls._instance._drained.set()
+            cls._instance._recycling = False
+            cls._instance._disconnected = False
+            cls._instance._renders_served = 0
+            cls._instance._last_memory_check = 0.0
+            cls._instance._last_rss: Optional[int] = None
+            cls._instance.recycle_count = 0
         return cls._instance
 
     async def init_browser(self) -> Browser:
         """初始化浏览器(只执行一次)"""
         async with self._lock:
-            if self._browser:
-                return self._browser
-            self._playwright = await async_playwright().start()
-            self._browser = await self._playwright.chromium.launch(
-                headless=True,
-                args=['--disable-gpu', '--no-sandbox', '--disable-dev-shm-usage']
-            )
+            return await self._launch_locked()
+
+    async def _launch_locked(self) -> Browser:
+        if self._browser:
             return self._browser
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(
+            headless=True,
+            args=['--disable-gpu', '--no-sandbox', '--disable-dev-shm-usage']
+        )
+        self._browser.on("disconnected", self._on_disconnected)
+        self._disconnected = False
+        self._renders_served = 0
+        self._last_rss = None
+        await self._warm_up_pages(self._browser)
+        return self._browser
+
+    def _on_disconnected(self, _browser: Browser) -> None:
+        if not self._recycling:
+            logger.warning("浏览器连接已断开，下次渲染时重新启动")
+        self._disconnected = True
 
     async def get_browser(self) -> Browser:
-        """获取浏览器实例"""
+        """获取浏览器实例，必要时先回收并重启"""
+        await self._maybe_recycle()
         if self._browser is None:
             return await self.init_browser()
         return self._browser
 
+    async def _recycle_reason(self) -> Optional[str]:
+        """返回需要重启浏览器的原因，不需要时返回 None"""
+        if self._browser is None:
+            return None
+        if self._disconnected or not self._browser.is_connected():
+            return "浏览器已断开或崩溃"
+
+        max_renders = plugin_config.live_shiro_browser_recycle_renders
+        if max_renders > 0 and self._renders_served >= max_renders:
+            return f"已渲染 {self._renders_served} 次"
+
+        max_rss = plugin_config.live_shiro_browser_recycle_rss_mb * 1024 * 1024
+        if max_rss > 0:
+            now = time.monotonic()
+            if now - self._last_memory_check >= MEMORY_CHECK_INTERVAL:
+                self._last_memory_check = now
+                # 遍历 /proc 是阻塞的文件读取，放到线程中执行，不阻塞事件循环
+                self._last_rss = await asyncio.to_thread(_browser_rss_bytes)
+            if self._last_rss is not None and self._last_rss >= max_rss:
+                return f"内存占用 {self._last_rss // 1024 // 1024} MB"
+
+        return None
+
+    async def _maybe_recycle(self) -> None:
+        if await self._recycle_reason() is None:
+            return
+
+        async with self._lock:
+            # 等锁期间可能已经被其他协程重启过
+            reason = await self._recycle_reason()
+            if reason is None:
+                return
+
+            logger.info(f"正在回收浏览器：{reason}")
+            self._recycling = True
+            try:
+                # 先等待正在使用的页面全部归还，再关闭浏览器
+                try:
+                    await asyncio.wait_for(
+                        self._drained.wait(),
+                        plugin_config.live_shiro_browser_drain_timeout,
+                    )
+                except asyncio.TimeoutError:
+                    logger.warning(f"等待 {self._in_flight} 个渲染页面归还超时，强制重启浏览器")
+                await self._shutdown_locked()
+                await self._launch_locked()
+                self.recycle_count += 1
+            finally:
+                self._recycling = False
+
+    async def _warm_up_pages(self, browser: Browser) -> None:
+        """为常用规格各预先创建一个页面"""
+        if self._pool_size <= 0:
+            return
+        for width, scale in WARM_PAGE_KEYS:
+            try:
+                page = await self._new_page(browser, width, scale)
+            except Exception as e:
+                logger.warning(f"预热渲染页面失败 ({width}x{scale}): {e}")
+                continue
+            self._idle_pages.setdefault((width, scale), []).append(page)
+
+    @staticmethod
+    async def _new_page(browser: Browser, width: int, scale: float) -> Page:
+        page = await browser.new_page(
+            viewport={"width": width, "height": DEFAULT_VIEWPORT_HEIGHT},
+            device_scale_factor=scale,
+        )
+        if plugin_config.live_shiro_render_asset_cache:
+            # 图片请求走本地资源缓存，路由在页面复用期间一直有效
+            await asset_cache.install(page)
+        return page
+
+    async def checkout_page(self, width: int, scale: float = 2) -> Page:
+        """从页面池取出一个页面，池中没有空闲页面时新建"""
+        browser = await self.get_browser()
+        self._in_flight += 1
+        self._drained.clear()
+        try:
+            idle = self._idle_pages.get((width, scale), [])
+            while idle:
+                page = idle.pop()
+                if not page.is_closed():
+                    return page
+            return await self._new_page(browser, width, scale)
+        except BaseException:
+            self._page_done()
+            raise
+
+    def _page_done(self) -> None:
+        self._in_flight -= 1
+        if self._in_flight <= 0:
+            self._in_flight = 0
+            self._drained.set()
+
+    async def return_page(self, page: Page, width: int, scale: float = 2) -> None:
+        """重置页面并放回页面池，池已满、正在回收或重置失败时直接关闭"""
+        self._renders_served += 1
+        try:
+            if page.is_closed():
+                return
+
+            idle = self._idle_pages.setdefault((width, scale), [])
+            if self._browser is None or self._recycling or len(idle) >= self._pool_size:
+                await self._close_page(page)
+                return
+
+            try:
+                await page.goto("about:blank")
+                await page.set_viewport_size({"width": width, "height": DEFAULT_VIEWPORT_HEIGHT})
+            except Exception as e:
+                logger.warning(f"重置渲染页面失败，丢弃该页面: {e}")
+                await self._close_page(page)
+                return
+
+            idle.append(page)
+        finally:
+            self._page_done()
+
+    @asynccontextmanager
+    async def page(self, width: int, scale: float = 2) -> AsyncIterator[Page]:
+        """借出一个页面，用完后自动归还"""
+        page = await self.checkout_page(width, scale)
+        try:
+            yield page
+        finally:
+            await self.return_page(page, width, scale)
+
+    @staticmethod
+    async def _close_page(page: Page) -> None:
+        try:
+            await page.close()
+        except Exception as e:
+            logger.warning(f"关闭渲染页面失败: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "connected": bool(self._browser and self._browser.is_connected()),
+            "renders_served": self._renders_served,
+            "in_flight": self._in_flight,
+            "rss_mb": self._last_rss // 1024 // 1024 if self._last_rss is not None else None,
+            "recycle_count": self.recycle_count,
+        }
+
     async def close_browser(self):
         """安全关闭浏览器"""
         async with self._lock:
-            if self._browser:
-                try:
-                    await self._browser.close()
-                except Exception as e:
-                    print(f"Warning: browser close failed: {e}")
-                finally:
-                    self._browser = None
+            await self._shutdown_locked()
 
-            if self._playwright:
-                try:
-                    await self._playwright.stop()
-                except Exception as e:
-                    print(f"Warning: playwright stop failed: {e}")
-                finally:
-                    self._playwright = None
+    async def _shutdown_locked(self) -> None:
+        for pages in self._idle_pages.values():
+            for page in pages:
+                await self._close_page(page)
+        self._idle_pages.clear()
+
+        if self._browser:
+            try:
+                await self._browser.close()
+            except Exception as e:
+                logger.warning(f"关闭浏览器失败: {e}")
+            finally:
+                self._browser = None
+
+        if self._playwright:
+            try:
+                await self._playwright.stop()
+            except Exception as e:
+                logger.warning(f"停止 playwright 失败: {e}")
+            finally:
+                self._playwright = None
 
 
 # 全局单例
@@ -57,4 +302,5 @@ browser_manager = BrowserManager()
 
 # 使用示例
 # await browser_manager.get_browser()
+# async with browser_manager.page(width=800) as page: ...
 # await browser_manager.close_browser()
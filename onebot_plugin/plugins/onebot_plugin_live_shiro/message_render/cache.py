@@ -0,0 +1,182 @@
+import asyncio
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+from nonebot import get_plugin_config, logger
+
+from ..config import Config
+
+plugin_config = get_plugin_config(Config)
+
+RENDER_CACHE_DIR = Path("./cache/render")
+
+
+def make_render_key(render_type: str, data: dict, width: int, template_version: Any) -> str:
+    """
+    根据 (模板类型, 规范化后的数据, 宽度, 模板版本) 生成稳定的缓存键
+
+    数据按 key 排序序列化，保证相同内容的 dict 得到相同的哈希；
+    键以模板类型开头，便于模板更新时按类型失效（见 RenderCache.invalidate）
+    """
+    payload = json.dumps(
+        [render_type, data, width, template_version],
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return f"{render_type}-{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+def evict_dir_to_budget(directory: Path, pattern: str, budget: int) -> None:
+    """目录内匹配 pattern 的文件总大小超过 budget 时，按修改时间从旧到新删除"""
+    entries = []
+    total = 0
+    for path in directory.glob(pattern):
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+        total += st.st_size
+
+    if total <= budget:
+        return
+
+    entries.sort(key=lambda x: x[0])
+    for _, size, path in entries:
+        if total <= budget:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+
+
+class RenderCache:
+    """
+    渲染结果缓存
+
+    - 内存层：按 LRU 淘汰，最多保留 memory_size 条
+    - 磁盘层：可选，存放在 cache_dir 下，总大小超过 disk_budget 时按最久未使用淘汰
+    """
+
+    def __init__(
+        self,
+        memory_size: int,
+        cache_dir: Optional[Path] = None,
+        disk_budget: int = 0,
+    ) -> None:
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_size = max(0, memory_size)
+        self._cache_dir = cache_dir if cache_dir and disk_budget > 0 else None
+        self._disk_budget = disk_budget
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get_memory(self, key: str) -> Optional[bytes]:
+        """只查询内存层"""
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+        return data
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """依次查询内存层和磁盘层，磁盘命中时回填内存层"""
+        if (data := self.get_memory(key)) is not None:
+            self.memory_hits += 1
+            return data
+
+        if self._cache_dir is not None:
+            data = await asyncio.to_thread(self._read_disk, key)
+            if data is not None:
+                self.disk_hits += 1
+                self._put_memory(key, data)
+                return data
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, data: bytes) -> None:
+        self._put_memory(key, data)
+        if self._cache_dir is not None:
+            try:
+                await asyncio.to_thread(self._write_disk, key, data)
+            except OSError as e:
+                logger.warning(f"写入渲染磁盘缓存失败: {e}")
+
+    def clear(self) -> None:
+        """清空内存层与磁盘层"""
+        self._memory.clear()
+        if self._cache_dir is not None and self._cache_dir.exists():
+            for path in self._cache_dir.glob("*.bin"):
+                path.unlink(missing_ok=True)
+
+    def invalidate(self, render_type: str) -> int:
+        """删除某个模板类型的全部缓存，返回删除的内存条目数"""
+        prefix = f"{render_type}-"
+        keys = [key for key in self._memory if key.startswith(prefix)]
+        for key in keys:
+            del self._memory[key]
+        if self._cache_dir is not None and self._cache_dir.exists():
+            for path in self._cache_dir.glob(f"{prefix}*.bin"):
+                path.unlink(missing_ok=True)
+        return len(keys)
+
+    def stats(self) -> dict:
+        total = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_entries": len(self._memory),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / total if total else 0.0,
+        }
+
+    def _put_memory(self, key: str, data: bytes) -> None:
+        if self._memory_size <= 0:
+            return
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._memory_size:
+            self._memory.popitem(last=False)
+
+    def _disk_path(self, key: str) -> Path:
+        assert self._cache_dir is not None
+        return self._cache_dir / f"{key}.bin"
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        path = self._disk_path(key)
+        try:
+            data = path.read_bytes()
+            # 刷新修改时间，作为 LRU 淘汰依据
+            os.utime(path)
+        except OSError:
+            return None
+        return data
+
+    def _write_disk(self, key: str, data: bytes) -> None:
+        assert self._cache_dir is not None
+        self._cache_dir.mkdir(parents=True, exist_ok=True)
+
+        # 先写临时文件再替换，避免读到写了一半的文件
+        path = self._disk_path(key)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+
+        self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        assert self._cache_dir is not None
+        evict_dir_to_budget(self._cache_dir, "*.bin", self._disk_budget)
+
+
+render_cache = RenderCache(
+    memory_size=plugin_config.live_shiro_render_cache_size,
+    cache_dir=RENDER_CACHE_DIR if plugin_config.live_shiro_render_cache_disk else None,
+    disk_budget=plugin_config.live_shiro_render_cache_disk_bytes,
+)
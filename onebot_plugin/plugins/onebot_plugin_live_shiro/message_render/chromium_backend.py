@@ -0,0 +1,73 @@
+from typing import Optional
+
+from nonebot import get_plugin_config, logger
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from ..config import Config
+from .backend import RenderBackend, RenderResult
+from .browser import browser_manager  # 修改为单例管理器
+from .encoder import EncodePolicy
+from .page_type import RenderPageType
+from .postprocess import post_process_screenshot
+from .templating import render_template, template_version
+from .worker import run_in_worker
+
+plugin_config = get_plugin_config(Config)
+
+
+async def _render_png_from_html(
+    html_str: str, width: int = 800, policy: Optional[EncodePolicy] = None
+) -> RenderResult:
+    """渲染 HTML → PNG 截图，policy 为空时输出无损 PNG；有图片使用了占位图或等待超时时结果不完整"""
+    # 从页面池借出预先创建好的页面，用完自动归还
+    async with browser_manager.page(width, scale=2) as page:
+        # 不等待 load/networkidle，由模板内的就绪脚本在所有图片加载完成或失败后给出信号
+        await page.set_content(html_str, wait_until="domcontentloaded")
+        try:
+            await page.wait_for_function(
+                "window.__renderReady === true",
+                timeout=plugin_config.live_shiro_render_image_timeout_ms + 2000,
+            )
+            placeholders = await page.evaluate("window.__renderPlaceholders || 0")
+        except PlaywrightTimeoutError:
+            logger.warning("等待渲染就绪信号超时，直接截图")
+            placeholders = -1
+        if placeholders:
+            logger.info("有图片未能加载，本次渲染结果不写入缓存")
+
+        # 仅截 content-wrapper
+        clip = None
+        content = await page.query_selector(".content-wrapper")
+        if content:
+            box = await content.bounding_box()
+            if box:
+                clip = box
+
+        screenshot = await page.screenshot(
+            type="png",
+            omit_background=True,
+            clip=clip,
+        )
+
+    # 裁剪和编码是纯 CPU 操作，放到后处理线程池执行，避免阻塞事件循环
+    image = await run_in_worker(post_process_screenshot, screenshot, policy or EncodePolicy(), 10)
+    return RenderResult(image, complete=placeholders == 0)
+
+
+class ChromiumBackend(RenderBackend):
+    """Jinja 模板 + 无头 Chromium 截图"""
+
+    name = "chromium"
+
+    def version(self, render_type: RenderPageType) -> str:
+        return template_version(render_type)
+
+    async def render(
+        self,
+        render_type: RenderPageType,
+        data: dict,
+        width: int,
+        policy: EncodePolicy,
+    ) -> RenderResult:
+        html_str = await render_template(render_type, data)
+        return await _render_png_from_html(html_str, width, policy)
@@ -0,0 +1,93 @@
+from dataclasses import dataclass, field
+from enum import Enum
+from io import BytesIO
+
+from PIL import Image
+
+
+class ImageFormat(Enum):
+    PNG = "png"                  # 无损 PNG
+    PNG_PALETTE = "png_palette"  # 256 色调色板 PNG，适合纯色块为主的表格
+    WEBP = "webp"
+    JPEG = "jpeg"
+
+    @property
+    def lossy(self) -> bool:
+        return self in (ImageFormat.WEBP, ImageFormat.JPEG)
+
+
+@dataclass(frozen=True)
+class EncodePolicy:
+    """
+    渲染结果的编码策略
+
+    formats 按偏好排列，依次编码，返回第一个不超过 max_bytes 的结果，之后的格式不再编码；
+    全部超出时逐步降低有损格式的质量（不低于 min_quality），仍超出则返回体积最小的结果。
+    max_bytes <= 0 表示不限制大小，直接使用第一个格式。
+    PNG 使用 png_compress_level 压缩（0~9，越大越慢、越小），不启用 Pillow 的 optimize，
+    optimize 会忽略压缩等级并使用最慢的压缩方式。
+    """
+    formats: tuple[ImageFormat, ...] = (ImageFormat.PNG,)
+    max_bytes: int = 0
+    png_compress_level: int = 6
+    quality: int = 85
+    min_quality: int = 50
+    quality_step: int = 10
+    # 有损格式不支持透明时使用的背景色
+    background: tuple[int, int, int] = field(default=(255, 255, 255))
+
+
+def _flatten(img: Image.Image, background: tuple[int, int, int]) -> Image.Image:
+    """去掉透明通道，透明区域填充背景色"""
+    if img.mode != "RGBA":
+        return img.convert("RGB")
+    flat = Image.new("RGB", img.size, background)
+    flat.paste(img, mask=img.getchannel("A"))
+    return flat
+
+
+def encode_image(img: Image.Image, fmt: ImageFormat, policy: EncodePolicy, quality: int) -> bytes:
+    buf = BytesIO()
+    if fmt == ImageFormat.PNG:
+        img.save(buf, format="PNG", compress_level=policy.png_compress_level)
+    elif fmt == ImageFormat.PNG_PALETTE:
+        palette = img.quantize(colors=256, method=Image.Quantize.FASTOCTREE)
+        palette.save(buf, format="PNG", compress_level=policy.png_compress_level)
+    elif fmt == ImageFormat.WEBP:
+        img.save(buf, format="WEBP", quality=quality, method=4)
+    elif fmt == ImageFormat.JPEG:
+        _flatten(img, policy.background).save(
+            buf, format="JPEG", quality=quality, optimize=True, progressive=True
+        )
+    return buf.getvalue()
+
+
+def encode_with_policy(img: Image.Image, policy: EncodePolicy) -> tuple[bytes, ImageFormat]:
+    """按编码策略输出图片，返回 (图片内容, 实际使用的格式)"""
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA")
+
+    if policy.max_bytes <= 0:
+        fmt = policy.formats[0]
+        return encode_image(img, fmt, policy, policy.quality), fmt
+
+    candidates: list[tuple[bytes, ImageFormat]] = []
+    for fmt in policy.formats:
+        data = encode_image(img, fmt, policy, policy.quality)
+        if len(data) <= policy.max_bytes:
+            return data, fmt
+        candidates.append((data, fmt))
+
+    # 所有格式都超出预算，逐步降低有损格式的质量
+    for fmt in policy.formats:
+        if not fmt.lossy:
+            continue
+        quality = policy.quality - policy.quality_step
+        while quality >= policy.min_quality:
+            data = encode_image(img, fmt, policy, quality)
+            if len(data) <= policy.max_bytes:
+                return data, fmt
+            candidates.append((data, fmt))
+            quality -= policy.quality_step
+
+    return min(candidates, key=lambda x: len(x[0]))
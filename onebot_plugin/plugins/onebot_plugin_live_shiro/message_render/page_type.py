@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class RenderPageType(Enum):
+    NORMAL = "normal.html"
+    FORWARD = "forward.html"
+    TABLE = "table.html"
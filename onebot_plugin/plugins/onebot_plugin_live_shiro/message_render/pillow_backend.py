@@ -0,0 +1,333 @@
+import asyncio
+import functools
+from io import BytesIO
+from pathlib import Path
+from typing import Optional
+
+from nonebot import logger
+from PIL import Image, ImageDraw, ImageFont
+
+from .assets import asset_cache
+from .backend import RenderBackend, RenderResult
+from .encoder import EncodePolicy
+from .page_type import RenderPageType
+from .postprocess import encode_rendered_image
+from .worker import run_in_worker
+
+# 与 chromium 后端的 device_scale_factor 保持一致
+SCALE = 2
+
+# 布局变化时修改版本号，使旧的渲染缓存失效
+LAYOUT_VERSION = 1
+
+FONT_DIR = Path(__file__).resolve().parent / "fonts"
+
+# 优先使用 fonts 目录下的字体，其次是常见的系统 CJK 字体，(路径, ttc 中的字体序号)
+SYSTEM_FONTS = {
+    False: [
+        ("/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc", 2),
+        ("/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc", 2),
+        ("/usr/share/fonts/google-noto-cjk/NotoSansCJK-Regular.ttc", 2),
+        ("/usr/share/fonts/truetype/wqy/wqy-microhei.ttc", 0),
+        ("/System/Library/Fonts/PingFang.ttc", 0),
+        ("C:/Windows/Fonts/msyh.ttc", 0),
+    ],
+    True: [
+        ("/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc", 2),
+        ("/usr/share/fonts/noto-cjk/NotoSansCJK-Bold.ttc", 2),
+        ("/usr/share/fonts/google-noto-cjk/NotoSansCJK-Bold.ttc", 2),
+        ("C:/Windows/Fonts/msyhbd.ttc", 0),
+    ],
+}
+
+PLACEHOLDER_COLOR = (229, 230, 235, 255)  # 与 _ready.html 中的占位图一致
+
+
+@functools.lru_cache(maxsize=None)
+def _find_font_file(bold: bool) -> Optional[tuple[str, int]]:
+    if FONT_DIR.is_dir():
+        files = sorted(p for p in FONT_DIR.iterdir() if p.suffix.lower() in (".ttf", ".otf", ".ttc"))
+        bold_files = [p for p in files if "bold" in p.name.lower()]
+        regular_files = [p for p in files if "bold" not in p.name.lower()]
+        for path in (bold_files if bold else []) + regular_files:
+            return str(path), 0
+
+    for path, index in SYSTEM_FONTS[bold]:
+        if Path(path).exists():
+            return path, index
+
+    # 找不到粗体时使用常规字体
+    return _find_font_file(False) if bold else None
+
+
+@functools.lru_cache(maxsize=None)
+def has_cjk_font() -> bool:
+    """
+    是否找到了 CJK 字体
+
+    Pillow 的默认字体没有中文字形，找不到 CJK 字体时中文会全部画成方框，
+    此时 PillowBackend 不再声明支持任何模板，由 get_backend 回退到 chromium
+    """
+    if _find_font_file(False) is not None:
+        return True
+    logger.error(
+        "未找到 CJK 字体，pillow 渲染后端已停用，改用 chromium；"
+        "请将 Noto Sans SC 等字体放入 message_render/fonts 目录或安装系统 CJK 字体"
+    )
+    return False
+
+
+@functools.lru_cache(maxsize=64)
+def load_font(size: int, bold: bool = False) -> ImageFont.FreeTypeFont:
+    """按 CSS 像素大小加载字体（已乘以 SCALE）"""
+    if found := _find_font_file(bold):
+        path, index = found
+        return ImageFont.truetype(path, size * SCALE, index=index)
+    logger.error("未找到 CJK 字体，中文可能无法正常显示，请将字体放入 message_render/fonts 目录")
+    return ImageFont.load_default(size * SCALE)
+
+
+def wrap_text(text: str, font: ImageFont.FreeTypeFont, max_width: float) -> list[str]:
+    """按字符折行（等价于 word-break: break-all），保留原有换行"""
+    lines = []
+    for paragraph in text.split("\n"):
+        line = ""
+        for ch in paragraph:
+            if line and font.getlength(line + ch) > max_width:
+                lines.append(line)
+                line = ch
+            else:
+                line += ch
+        lines.append(line)
+    return lines
+
+
+def _round_corners(img: Image.Image, radius: int) -> Image.Image:
+    """把图片四角裁成圆角（透明），保留原有透明度"""
+    img = img.convert("RGBA")
+    mask = Image.new("L", img.size, 0)
+    ImageDraw.Draw(mask).rounded_rectangle((0, 0, img.width - 1, img.height - 1), radius=radius, fill=255)
+    alpha = Image.composite(img.getchannel("A"), mask, mask)
+    img.putalpha(alpha)
+    return img
+
+
+def _open_image(data: Optional[bytes]) -> Optional[Image.Image]:
+    if not data:
+        return None
+    try:
+        img = Image.open(BytesIO(data))
+        img.load()
+        return img.convert("RGBA")
+    except Exception as e:
+        logger.warning(f"解析图片失败: {e}")
+        return None
+
+
+def _draw_lines(
+    draw: ImageDraw.ImageDraw,
+    lines: list[str],
+    x: int,
+    y: int,
+    font: ImageFont.FreeTypeFont,
+    fill: tuple,
+    line_height: int,
+    underline: bool = False,
+) -> int:
+    """逐行绘制文字，返回绘制结束后的 y 坐标"""
+    ascent, descent = font.getmetrics()
+    for line in lines:
+        # 与 CSS 一致，文字在行高内垂直居中
+        top = y + (line_height - ascent - descent) // 2
+        draw.text((x, top), line, font=font, fill=fill)
+        if underline and line:
+            baseline = top + ascent + SCALE
+            draw.line((x, baseline, x + int(font.getlength(line)), baseline), fill=fill, width=SCALE)
+        y += line_height
+    return y
+
+
+def draw_table(data: dict) -> Image.Image:
+    """绘制与 table.html 等价的表格"""
+    s = SCALE
+    pad_x, pad_y = 15 * s, 12 * s
+    cell_max_width = 400 * s
+    text_color = (36, 41, 46)
+    border_color = (225, 228, 232)
+
+    title_font = load_font(18, bold=True)
+    head_font = load_font(14, bold=True)
+    cell_font = load_font(14)
+    cell_line_height = int(14 * 1.5 * s)
+    head_line_height = int(14 * 1.2 * s)
+
+    headers = [str(h) for h in data.get("headers", [])]
+    rows = [[str(c) for c in row] for row in data.get("rows", [])]
+    title = str(data.get("title", ""))
+    columns = max([len(headers)] + [len(row) for row in rows]) if (headers or rows) else 0
+
+    # 列宽：表头不换行，单元格内容最宽 400px
+    col_widths = [0] * columns
+    for i, head in enumerate(headers):
+        col_widths[i] = max(col_widths[i], int(head_font.getlength(head)))
+    for row in rows:
+        for i, cell in enumerate(row):
+            longest = max((cell_font.getlength(line) for line in cell.split("\n")), default=0)
+            col_widths[i] = max(col_widths[i], min(int(longest) + 1, cell_max_width))
+
+    title_width = int(title_font.getlength(title)) + 40 * s if title else 0
+    table_width = sum(w + 2 * pad_x for w in col_widths)
+    card_width = max(table_width, title_width, 300 * s)
+    if columns and card_width > table_width:
+        # 表格宽度 100%，多出的宽度平均分给各列
+        extra = card_width - table_width
+        for i in range(columns):
+            col_widths[i] += extra // columns + (1 if i < extra % columns else 0)
+
+    title_height = head_line_height + 30 * s if title else 0
+    head_height = head_line_height + 2 * pad_y if headers else 0
+    wrapped_rows = []
+    for row in rows:
+        cells = [wrap_text(cell, cell_font, col_widths[i]) for i, cell in enumerate(row)]
+        height = max((len(lines) for lines in cells), default=1) * cell_line_height + 2 * pad_y
+        wrapped_rows.append((cells, height))
+    card_height = title_height + head_height + sum(h for _, h in wrapped_rows) + (s if rows else 0)
+
+    img = Image.new("RGBA", (card_width, card_height), (255, 255, 255, 255))
+    draw = ImageDraw.Draw(img)
+
+    y = 0
+    if title:
+        draw.rectangle((0, 0, card_width, title_height), fill=(74, 144, 226))
+        text_width = title_font.getlength(title)
+        _draw_lines(draw, [title], int((card_width - text_width) / 2), 15 * s, title_font, (255, 255, 255), head_line_height)
+        y += title_height
+
+    if headers:
+        draw.rectangle((0, y, card_width, y + head_height), fill=(241, 248, 255))
+        x = 0
+        for i, head in enumerate(headers):
+            _draw_lines(draw, [head], x + pad_x, y + pad_y, head_font, text_color, head_line_height)
+            x += col_widths[i] + 2 * pad_x
+        y += head_height
+        draw.line((0, y - s, card_width, y - s), fill=border_color, width=s)
+
+    for index, (cells, height) in enumerate(wrapped_rows):
+        # 斑马纹：tbody 中的偶数行
+        if index % 2 == 1:
+            draw.rectangle((0, y, card_width, y + height), fill=(248, 249, 250))
+        x = 0
+        for i, lines in enumerate(cells):
+            _draw_lines(draw, lines, x + pad_x, y + pad_y, cell_font, text_color, cell_line_height)
+            x += col_widths[i] + 2 * pad_x
+        y += height
+        if index < len(wrapped_rows) - 1:
+            draw.line((0, y - s, card_width, y - s), fill=border_color, width=s)
+
+    return _round_corners(img, 8 * s)
+
+
+def draw_normal_card(data: dict, width: int, images: dict[str, Optional[bytes]]) -> Image.Image:
+    """绘制与 normal.html 等价的动态卡片，images 为预先下载好的 url → 图片内容"""
+    s = SCALE
+    padding = 20 * s
+    card_width = width * s
+    inner_width = card_width - 2 * padding
+
+    name_font = load_font(16, bold=True)
+    time_font = load_font(12)
+    title_font = load_font(16, bold=True)
+    link_font = load_font(12)
+    content_font = load_font(14)
+
+    title_lines = wrap_text(str(data.get("title", "")), title_font, inner_width)
+    link_lines = wrap_text(str(data.get("link", "") or ""), link_font, inner_width) if data.get("link") else []
+    content_lines = wrap_text(str(data.get("content", "")), content_font, inner_width)
+
+    pictures = []
+    for url in data.get("image_urls") or []:
+        picture = _open_image(images.get(url))
+        if picture is None:
+            picture = Image.new("RGBA", (16, 9), PLACEHOLDER_COLOR)
+        height = max(1, round(picture.height * inner_width / picture.width))
+        pictures.append(_round_corners(picture.resize((inner_width, height), Image.LANCZOS), 16 * s))
+
+    title_lh, link_lh, content_lh = int(16 * 1.2 * s), int(12 * 1.2 * s), int(14 * 1.5 * s)
+    height = padding + 48 * s + 12 * s
+    height += 8 * s + len(title_lines) * title_lh + 8 * s
+    height += len(link_lines) * link_lh + 8 * s
+    height += len(content_lines) * content_lh + 8 * s
+    height += sum(p.height + 16 * s for p in pictures)
+    height += padding
+
+    img = Image.new("RGBA", (card_width, height), (255, 255, 255, 242))
+    draw = ImageDraw.Draw(img)
+
+    # 头像与用户信息
+    y = padding
+    avatar = _open_image(images.get(data.get("avatar_url", "")))
+    if avatar is None:
+        avatar = Image.new("RGBA", (48, 48), PLACEHOLDER_COLOR)
+    avatar = avatar.resize((48 * s, 48 * s), Image.LANCZOS)
+    mask = Image.new("L", avatar.size, 0)
+    ImageDraw.Draw(mask).ellipse((0, 0, avatar.width - 1, avatar.height - 1), fill=255)
+    img.paste(avatar, (padding, y), mask)
+
+    info_x = padding + 48 * s + 12 * s
+    name_lh, time_lh = int(16 * 1.2 * s), int(12 * 1.2 * s)
+    info_y = y + (48 * s - name_lh - time_lh) // 2
+    info_y = _draw_lines(draw, [str(data.get("user_name", ""))], info_x, info_y, name_font, (0, 0, 0), name_lh)
+    _draw_lines(draw, [str(data.get("time", ""))], info_x, info_y, time_font, (102, 102, 102), time_lh)
+    y += 48 * s + 12 * s
+
+    y += 8 * s
+    y = _draw_lines(draw, title_lines, padding, y, title_font, (0, 0, 0), title_lh) + 8 * s
+    y = _draw_lines(draw, link_lines, padding, y, link_font, (30, 144, 255), link_lh, underline=True) + 8 * s
+    y = _draw_lines(draw, content_lines, padding, y, content_font, (0, 0, 0), content_lh) + 8 * s
+
+    for picture in pictures:
+        y += 8 * s
+        img.alpha_composite(picture, (padding, y))
+        y += picture.height + 8 * s
+
+    return _round_corners(img, 12 * s)
+
+
+def _render_sync(render_type: RenderPageType, data: dict, width: int, policy: EncodePolicy,
+                 images: dict[str, Optional[bytes]]) -> bytes:
+    if render_type == RenderPageType.TABLE:
+        img = draw_table(data)
+    else:
+        img = draw_normal_card(data, width, images)
+    return encode_rendered_image(img, policy)
+
+
+class PillowBackend(RenderBackend):
+    """纯 Pillow 绘制，不依赖浏览器"""
+
+    name = "pillow"
+    supported_types = frozenset({RenderPageType.TABLE, RenderPageType.NORMAL})
+
+    def supports(self, render_type: RenderPageType) -> bool:
+        return has_cjk_font() and super().supports(render_type)
+
+    def version(self, render_type: RenderPageType) -> int:
+        return LAYOUT_VERSION
+
+    async def render(
+        self,
+        render_type: RenderPageType,
+        data: dict,
+        width: int,
+        policy: EncodePolicy,
+    ) -> RenderResult:
+        images: dict[str, Optional[bytes]] = {}
+        if render_type == RenderPageType.NORMAL:
+            urls = [url for url in [data.get("avatar_url"), *(data.get("image_urls") or [])] if url]
+            results = await asyncio.gather(*(asset_cache.get(url) for url in urls))
+            images = {url: result[0] if result else None for url, result in zip(urls, results)}
+
+        # 绘制和编码都是 CPU 操作，放到后处理线程池
+        image = await run_in_worker(_render_sync, render_type, data, width, policy, images)
+        # 下载失败的图片不会绘制，这样的结果不写入缓存
+        return RenderResult(image, complete=all(result is not None for result in images.values()))
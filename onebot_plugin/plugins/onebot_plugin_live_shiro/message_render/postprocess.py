@@ -0,0 +1,40 @@
+from io import BytesIO
+
+from nonebot import logger
+from PIL import Image
+
+from .encoder import EncodePolicy, encode_with_policy
+
+
+def crop_transparent_edges(img: Image.Image, border: int = 10) -> Image.Image:
+    """裁剪透明边缘"""
+    if img.mode != "RGBA":
+        img = img.convert("RGBA")
+
+    # 直接在 alpha 通道上整体求非透明区域的包围盒，getbbox 返回的右下边界是开区间
+    bbox = img.getchannel("A").getbbox()
+    if bbox is None:
+        return img
+
+    width, height = img.size
+    x_min, y_min, x_max, y_max = bbox[0], bbox[1], bbox[2] - 1, bbox[3] - 1
+
+    left = max(0, x_min - border)
+    upper = max(0, y_min - border)
+    right = min(width, x_max + border)
+    lower = min(height, y_max + border)
+
+    return img.crop((left, upper, right, lower))
+
+
+def encode_rendered_image(img: Image.Image, policy: EncodePolicy) -> bytes:
+    data, fmt = encode_with_policy(img, policy)
+    logger.debug(f"渲染结果编码为 {fmt.value}，{len(data)} bytes")
+    return data
+
+
+def post_process_screenshot(screenshot: bytes, policy: EncodePolicy, border: int = 10) -> bytes:
+    """截图后处理：裁剪透明边缘并按编码策略重新编码"""
+    img = Image.open(BytesIO(screenshot))
+    img = crop_transparent_edges(img, border=border)
+    return encode_rendered_image(img, policy)
@@ -0,0 +1,111 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from nonebot import logger
+
+from .backend import get_backend
+from .cache import make_render_key
+from .page_type import RenderPageType
+from .render_queue import RenderPriority
+from .renderer import render_image_from_template
+
+
+@dataclass
+class StaticView:
+    """
+    内容只在代码或模板更新时才会变化的渲染结果（例如 /help 的指令表）
+
+    data_factory 每次调用都返回当前的模板数据，数据或模板版本变化时重新渲染
+    """
+    render_type: RenderPageType
+    data_factory: Callable[[], dict]
+    width: int = 800
+    signature: Optional[str] = None
+    image: Optional[bytes] = None
+
+    def current_signature(self) -> str:
+        backend = get_backend(self.render_type)
+        version = [backend.name, backend.version(self.render_type)]
+        return make_render_key(self.render_type.name, self.data_factory(), self.width, version)
+
+    def is_fresh(self) -> bool:
+        return self.image is not None and self.signature == self.current_signature()
+
+
+_static_views: dict[str, StaticView] = {}
+_prewarm_task: Optional[asyncio.Task] = None
+# 预热进行中又收到请求（例如模板已更新）时置位，本轮结束后再预热一轮
+_prewarm_pending = False
+
+
+def register_static_view(
+    name: str,
+    render_type: RenderPageType,
+    data_factory: Callable[[], dict],
+    width: int = 800,
+) -> None:
+    """注册一个静态渲染结果，启动时在后台预先渲染"""
+    _static_views[name] = StaticView(render_type, data_factory, width)
+
+
+async def _render_view(view: StaticView, priority: RenderPriority) -> bytes:
+    signature = view.current_signature()
+    image = await render_image_from_template(
+        view.render_type, view.data_factory(), width=view.width, priority=priority
+    )
+    view.signature, view.image = signature, image
+    return image
+
+
+async def get_static_view(name: str) -> bytes:
+    """
+    获取静态渲染结果，数据和模板都没有变化时直接返回预渲染的图片
+
+    尚未预热完成或内容已变化时立即按交互优先级重新渲染
+    """
+    view = _static_views[name]
+    if view.is_fresh():
+        return view.image
+    return await _render_view(view, RenderPriority.INTERACTIVE)
+
+
+async def prewarm_static_views() -> None:
+    """以后台优先级渲染所有已过期的静态视图，不影响正常的渲染请求"""
+    for name, view in list(_static_views.items()):
+        if view.is_fresh():
+            continue
+        try:
+            await _render_view(view, RenderPriority.BACKGROUND)
+            logger.debug(f"静态渲染 {name} 预热完成")
+        except Exception as e:
+            logger.warning(f"静态渲染 {name} 预热失败: {e}")
+
+
+async def _prewarm_loop() -> None:
+    global _prewarm_pending
+    while True:
+        _prewarm_pending = False
+        await prewarm_static_views()
+        if not _prewarm_pending:
+            return
+
+
+def start_prewarm() -> None:
+    """
+    在后台预热静态视图
+
+    已经在预热时不会丢弃本次请求：进行中的一轮可能用的还是旧模板，结束后会再检查一轮
+    """
+    global _prewarm_task, _prewarm_pending
+    if _prewarm_task is None or _prewarm_task.done():
+        _prewarm_task = asyncio.create_task(_prewarm_loop())
+    else:
+        _prewarm_pending = True
+
+
+def stop_prewarm() -> None:
+    global _prewarm_task
+    if _prewarm_task is not None:
+        _prewarm_task.cancel()
+        _prewarm_task = None
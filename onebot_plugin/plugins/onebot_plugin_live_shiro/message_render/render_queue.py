@@ -0,0 +1,132 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import AsyncIterator
+
+from nonebot import get_plugin_config, logger
+
+from ..config import Config
+
+plugin_config = get_plugin_config(Config)
+
+
+class RenderPriority(IntEnum):
+    """渲染优先级，数值越小越先执行"""
+    BROADCAST = 0    # 群通知（动态、直播）
+    INTERACTIVE = 1  # 用户指令（/help、/test_dynamic 等）
+    BACKGROUND = 2   # 后台任务（预热等）
+
+
+class RenderBusyError(RuntimeError):
+    """渲染队列已满或排队超时"""
+
+
+class RenderScheduler:
+    """
+    渲染调度器
+
+    同时最多执行 max_concurrency 个渲染，其余请求按优先级排队；
+    排队数超过 max_queue 时直接拒绝，排队超过 wait_timeout 秒时放弃。
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, wait_timeout: float) -> None:
+        self._max_concurrency = max(1, max_concurrency)
+        self._max_queue = max(0, max_queue)
+        self._wait_timeout = wait_timeout
+        self._active = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        # 指标
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.max_queue_depth = 0
+        self._wait_times: deque[float] = deque(maxlen=256)
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    async def _acquire(self, priority: RenderPriority) -> None:
+        if self._active < self._max_concurrency and not self.queue_depth:
+            self._active += 1
+            self._wait_times.append(0.0)
+            return
+
+        if self.queue_depth >= self._max_queue:
+            self.rejected += 1
+            raise RenderBusyError(f"渲染队列已满（{self._max_queue}）")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._seq), future))
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self._wait_timeout)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # 超时的同时刚好被唤醒，名额已经转交给我们，需要归还
+                self._release()
+            else:
+                future.cancel()
+            self.timeouts += 1
+            raise RenderBusyError(f"渲染排队超时（{self._wait_timeout}s）") from None
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release()
+            else:
+                future.cancel()
+            raise
+        self._wait_times.append(time.perf_counter() - start)
+
+    def _release(self) -> None:
+        # 名额直接转交给优先级最高的等待者，不经过 _active 归零
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: RenderPriority = RenderPriority.INTERACTIVE) -> AsyncIterator[None]:
+        """占用一个渲染名额"""
+        await self._acquire(priority)
+        try:
+            yield
+        finally:
+            self.completed += 1
+            self._release()
+
+    def stats(self) -> dict:
+        waits = sorted(self._wait_times)
+        p95 = waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0
+        return {
+            "active": self._active,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": sum(waits) / len(waits) * 1000 if waits else 0.0,
+            "wait_p95_ms": p95 * 1000,
+        }
+
+    def log_stats(self) -> None:
+        logger.debug(f"渲染队列状态: {self.stats()}")
+
+
+render_scheduler = RenderScheduler(
+    max_concurrency=plugin_config.live_shiro_render_max_concurrency,
+    max_queue=plugin_config.live_shiro_render_queue_size,
+    wait_timeout=plugin_config.live_shiro_render_queue_timeout,
+)
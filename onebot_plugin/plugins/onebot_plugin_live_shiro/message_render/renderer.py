@@ -1,14 +1,16 @@
-from enum import Enum
-from io import BytesIO
-from pathlib import Path
-from typing import Optional, TypedDict, Any
+from typing import Optional, TypedDict
 
-from jinja2 import Environment, FileSystemLoader
-from PIL import Image
-from .browser import browser_manager  # 修改为单例管理器
+from nonebot import get_plugin_config, logger
 
-current_dir = Path(__file__).resolve().parent
-env = Environment(loader=FileSystemLoader(current_dir / "templates"))
+from ..config import Config
+from .backend import get_backend
+from .cache import make_render_key, render_cache
+from .encoder import EncodePolicy, ImageFormat
+from .page_type import RenderPageType
+from .postprocess import crop_transparent_edges
+from .render_queue import RenderBusyError, RenderPriority, render_scheduler
+
+plugin_config = get_plugin_config(Config)
 
 
 class NormalData(TypedDict):
@@ -26,89 +28,87 @@ class ForwardData(TypedDict):
     time: str
     title: str
     content: str
+    # 二选一：forwarded_card 在同一个页面内联渲染被转发的动态，forwarded_card_url 嵌入预先渲染好的图片
+    forwarded_card: Optional[NormalData]
     forwarded_card_url: str
 
-class RenderPageType(Enum):
-    NORMAL = "normal.html"
-    FORWARD = "forward.html"
-    TABLE = "table.html"
-
-
-def crop_transparent_edges(img: Image.Image, border: int = 10) -> Image.Image:
-    """裁剪透明边缘"""
-    if img.mode != "RGBA":
-        img = img.convert("RGBA")
-
-    pix = img.load()
-    width, height = img.size
-    x_min, y_min = width, height
-    x_max, y_max = 0, 0
-
-    for y in range(height):
-        for x in range(width):
-            if pix[x, y][3] != 0:
-                x_min = min(x_min, x)
-                y_min = min(y_min, y)
-                x_max = max(x_max, x)
-                y_max = max(y_max, y)
-
-    if x_max < x_min or y_max < y_min:
-        return img
-
-    left = max(0, x_min - border)
-    upper = max(0, y_min - border)
-    right = min(width, x_max + border)
-    lower = min(height, y_max + border)
-
-    return img.crop((left, upper, right, lower))
-
-
-async def _render_png_from_html(html_str: str, width: int = 800) -> bytes:
-    """渲染 HTML → PNG 截图"""
-    # 使用单例管理器安全获取浏览器
-    browser = await browser_manager.get_browser()
-    page = await browser.new_page(
-        viewport={"width": width, "height": 2000},
-        device_scale_factor=2,
-    )
-    await page.set_content(html_str)
-    await page.wait_for_load_state("networkidle")
-
-    # 仅截 content-wrapper
-    clip = None
-    content = await page.query_selector(".content-wrapper")
-    if content:
-        box = await content.bounding_box()
-        if box:
-            clip = box
-
-    screenshot = await page.screenshot(
-        type="png",
-        omit_background=True,
-        clip=clip,
+# 各模板默认的输出格式偏好：表格以纯色为主，调色板 PNG 体积最小；动态卡片图片多，超出预算时退到 WebP/JPEG
+DEFAULT_RENDER_FORMATS = {
+    RenderPageType.NORMAL: (ImageFormat.PNG, ImageFormat.WEBP, ImageFormat.JPEG),
+    RenderPageType.FORWARD: (ImageFormat.PNG, ImageFormat.WEBP, ImageFormat.JPEG),
+    RenderPageType.TABLE: (ImageFormat.PNG_PALETTE, ImageFormat.PNG),
+}
+
+
+def load_render_formats() -> dict[RenderPageType, tuple[ImageFormat, ...]]:
+    """
+    校验 live_shiro_render_formats 并与默认格式合并，只在加载时执行一次
+
+    无法识别的模板名或格式记录错误日志后忽略，该模板使用默认格式
+    """
+    formats = dict(DEFAULT_RENDER_FORMATS)
+    for name, values in plugin_config.live_shiro_render_formats.items():
+        try:
+            render_type = RenderPageType[name]
+            configured = tuple(ImageFormat(value) for value in values)
+        except (KeyError, ValueError):
+            logger.error(
+                f"live_shiro_render_formats 配置无效：{name}={values}，"
+                f"模板名可选 {[t.name for t in RenderPageType]}，格式可选 {[f.value for f in ImageFormat]}"
+            )
+            continue
+        if configured:
+            formats[render_type] = configured
+    return formats
+
+
+RENDER_FORMATS = load_render_formats()
+
+
+def get_encode_policy(render_type: RenderPageType) -> EncodePolicy:
+    """根据配置生成模板的编码策略，live_shiro_render_formats 可按模板名覆盖默认格式"""
+    formats = RENDER_FORMATS[render_type]
+    return EncodePolicy(
+        formats=formats,
+        max_bytes=plugin_config.live_shiro_render_max_bytes,
+        png_compress_level=plugin_config.live_shiro_render_png_compress_level,
+        quality=plugin_config.live_shiro_render_quality,
     )
-    await page.close()
 
-    img = Image.open(BytesIO(screenshot))
-    img = crop_transparent_edges(img, border=10)
 
-    buf = BytesIO()
-    img.save(buf, format="PNG")
-    return buf.getvalue()
+def _normalize_normal_data(data: dict) -> None:
+    # 保证 content 是字符串，替换换行符
+    data["content"] = data.get("content", "") or ""
+    data["content"] = data["content"].replace("\r\n", "\n").replace("\r", "\n")
+    # 过滤空图片链接
+    data["image_urls"] = [url for url in data.get("image_urls", []) if url]
+
+async def render_image_from_template(
+    render_type: RenderPageType,
+    data: dict,
+    width: int = 800,
+    use_cache: bool = True,
+    priority: RenderPriority = RenderPriority.INTERACTIVE,
+    policy: Optional[EncodePolicy] = None,
+) -> bytes:
+    """
+    从模板数据生成图片
+
+    输出格式由编码策略决定（默认见 get_encode_policy），可能是 PNG、WebP 或 JPEG；
+    缓存未命中时经过渲染调度器排队，队列已满或排队超时会抛出 RenderBusyError
+    """
+    policy = policy or get_encode_policy(render_type)
 
-async def render_png_from_template(render_type: RenderPageType, data: dict, width: int = 800) -> bytes:
-    """从模板数据生成 PNG"""
     if render_type == RenderPageType.NORMAL:
-        # 保证 content 是字符串，替换换行符
-        data["content"] = data.get("content", "") or ""
-        data["content"] = data["content"].replace("\r\n", "\n").replace("\r", "\n")
-        # 过滤空图片链接
-        data["image_urls"] = [url for url in data.get("image_urls", []) if url]
+        _normalize_normal_data(data)
 
     elif render_type == RenderPageType.FORWARD:
         # 保证 content 是字符串
         data["content"] = data.get("content", "") or ""
         data["content"] = data["content"].replace("\r\n", "\n").replace("\r", "\n")
+        # 内联渲染的被转发动态与普通动态使用相同的规范化规则
+        if data.get("forwarded_card"):
+            _normalize_normal_data(data["forwarded_card"])
         # forwarded_card_url 必须存在，否则给个空字符串兜底
         data["forwarded_card_url"] = data.get("forwarded_card_url", "")
 
@@ -118,6 +118,22 @@ async def render_png_from_template(render_type: RenderPageType, data: dict, widt
             data.setdefault("rows", [])     # list[list[str/int]]
             data.setdefault("title", "")    # str
 
-    template = env.get_template(render_type.value)
-    html_str = template.render(data)
-    return await _render_png_from_html(html_str, width)
+    backend = get_backend(render_type)
+
+    # 相同模板、数据、宽度且模板（后端）未修改时，直接返回缓存的渲染结果
+    version = [backend.name, backend.version(render_type), repr(policy)]
+    cache_key = make_render_key(render_type.name, data, width, version)
+    if use_cache and (cached := await render_cache.get(cache_key)) is not None:
+        return cached
+
+    async with render_scheduler.slot(priority):
+        result = await backend.render(render_type, data, width, policy)
+    render_scheduler.log_stats()
+    # 有图片使用了占位图的结果不缓存，否则之后相同数据的请求会一直得到残缺的卡片
+    if use_cache and result.complete:
+        await render_cache.put(cache_key, result.image)
+    return result.image
+
+
+# 旧名称，输出不一定是 PNG，新代码请使用 render_image_from_template
+render_png_from_template = render_image_from_template
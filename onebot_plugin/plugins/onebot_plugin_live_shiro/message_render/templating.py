@@ -0,0 +1,195 @@
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import Any, Callable, MutableMapping, Optional
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template, meta
+from nonebot import get_plugin_config, logger
+
+from ..config import Config
+from .page_type import RenderPageType
+
+plugin_config = get_plugin_config(Config)
+
+current_dir = Path(__file__).resolve().parent
+templates_dir = current_dir / "templates"
+BYTECODE_CACHE_DIR = Path("./cache/jinja")
+
+
+class PrecompiledLoader(FileSystemLoader):
+    """
+    优先返回 TemplateBundle 预编译的模板，没有预编译的模板按文件正常加载
+
+    include/extends 在渲染时通过 env.get_template 查找被引用的模板，也会拿到预编译的版本
+    """
+
+    def __init__(self, searchpath: Path) -> None:
+        super().__init__(searchpath)
+        self.templates: dict[str, Template] = {}
+
+    def load(
+        self,
+        environment: Environment,
+        name: str,
+        globals: Optional[MutableMapping[str, Any]] = None,
+    ) -> Template:
+        template = self.templates.get(name)
+        if template is None:
+            return super().load(environment, name, globals)
+        if globals:
+            template.globals.update(globals)
+        return template
+
+
+# 缓存目录在第一次写入编译结果时才创建（见 TemplateBundle._compile）
+env = Environment(
+    loader=PrecompiledLoader(templates_dir),
+    # 编译结果写入磁盘，重启时跳过编译
+    bytecode_cache=FileSystemBytecodeCache(str(BYTECODE_CACHE_DIR)),
+    enable_async=True,
+    # 模板在启动时编译一次；缓存的模板是否过期只比较是否仍是 TemplateBundle 中的版本，
+    # 渲染时不访问文件系统。需要热更新时开启 live_shiro_render_template_watch
+    auto_reload=True,
+    cache_size=-1,
+)
+# 单张图片的加载超时，超时后由模板替换为占位图（见 templates/_ready.html）
+env.globals["image_timeout_ms"] = plugin_config.live_shiro_render_image_timeout_ms
+
+
+class TemplateBundle:
+    """
+    启动时预编译的模板集合
+
+    每个模板只解析一次，引用关系（include/extends）和编译结果都来自同一棵语法树；
+    字节码缓存命中时跳过代码生成。记录每个模板的修改时间、内容哈希和引用关系。
+    修改时间只用于热更新检测；模板版本由自身及所有被引用模板的内容哈希组成，
+    重新部署但内容不变时版本不变，渲染时也无需再访问文件系统。
+    """
+
+    def __init__(self, environment: Environment, loader: PrecompiledLoader) -> None:
+        self._env = environment
+        # 与 loader 共用，重新编译后 env.get_template 直接返回新的模板
+        self._templates = loader.templates
+        self._mtimes: dict[str, int] = {}
+        self._hashes: dict[str, str] = {}
+        self._references: dict[str, set[str]] = {}
+
+    def compile_all(self) -> None:
+        for name in self._env.list_templates(extensions=["html"]):
+            self._compile(name)
+        logger.info(f"已预编译 {len(self._templates)} 个渲染模板")
+
+    def _compile(self, name: str) -> None:
+        env = self._env
+        path = templates_dir / name
+        filename = str(path)
+        source = path.read_text(encoding="utf-8")
+        ast = env.parse(source, name, filename)
+        self._references[name] = {ref for ref in meta.find_referenced_templates(ast) if ref}
+        self._mtimes[name] = path.stat().st_mtime_ns
+        self._hashes[name] = hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+        # 与 jinja2 的 BaseLoader.load 相同，只是编译时直接使用上面的语法树
+        bcc = env.bytecode_cache
+        bucket = bcc.get_bucket(env, name, filename, source)
+        if bucket.code is None:
+            bucket.code = env.compile(ast, name, filename)
+            BYTECODE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            bcc.set_bucket(bucket)
+        # env.cache 中的旧模板在重新编译后过期，引用方下次渲染时由 loader 取到新的模板
+        template = env.template_class.from_code(
+            env, bucket.code, env.make_globals(None), lambda: self._templates.get(name) is template
+        )
+        self._templates[name] = template
+
+    def _dependencies(self, name: str) -> set[str]:
+        """模板自身及其递归引用的所有模板"""
+        result = set()
+        stack = [name]
+        while stack:
+            current = stack.pop()
+            if current in result:
+                continue
+            result.add(current)
+            stack.extend(self._references.get(current, ()))
+        return result
+
+    def dependents(self, names: set[str]) -> set[str]:
+        """引用了 names 中任一模板的所有模板（包括自身）"""
+        return {name for name in self._templates if self._dependencies(name) & names}
+
+    def get(self, render_type: RenderPageType) -> Template:
+        return self._templates[render_type.value]
+
+    def version(self, render_type: RenderPageType) -> str:
+        names = sorted(self._dependencies(render_type.value))
+        combined = "".join(self._hashes.get(name, "") for name in names)
+        return hashlib.sha1(combined.encode("ascii")).hexdigest()
+
+    def changed_templates(self) -> set[str]:
+        """返回磁盘上已修改（或新增）的模板"""
+        changed = set()
+        for name in self._env.list_templates(extensions=["html"]):
+            try:
+                mtime = (templates_dir / name).stat().st_mtime_ns
+            except OSError:
+                continue
+            if mtime != self._mtimes.get(name):
+                changed.add(name)
+        return changed
+
+    def reload(self, changed: set[str]) -> set[str]:
+        """
+        只重新编译修改过的模板，返回受影响的模板（包括引用了它们的模板）
+
+        引用方在渲染时才通过 env.get_template 查找被引用的模板，不需要重新编译
+        """
+        affected = self.dependents(changed) | changed
+        for name in changed:
+            self._compile(name)
+        return affected
+
+
+template_bundle = TemplateBundle(env, env.loader)
+template_bundle.compile_all()
+
+
+def template_version(render_type: RenderPageType) -> str:
+    """模板版本：模板本身及其引用的片段的内容哈希"""
+    return template_bundle.version(render_type)
+
+
+async def render_template(render_type: RenderPageType, data: dict) -> str:
+    return await template_bundle.get(render_type).render_async(data)
+
+
+async def watch_templates(
+    on_change: Callable[[set[str]], None],
+    interval: float = 1.0,
+) -> None:
+    """轮询模板目录，发现修改时重新编译并通过 on_change 通知受影响的模板"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if changed := template_bundle.changed_templates():
+                affected = template_bundle.reload(changed)
+                logger.info(f"模板已更新：{sorted(changed)}，受影响的模板 {sorted(affected)}")
+                on_change(affected)
+        except Exception as e:
+            logger.warning(f"模板热更新失败: {e}")
+
+
+_watch_task: Optional[asyncio.Task] = None
+
+
+def start_template_watch(on_change: Callable[[set[str]], None]) -> None:
+    global _watch_task
+    if _watch_task is None or _watch_task.done():
+        _watch_task = asyncio.create_task(watch_templates(on_change))
+
+
+def stop_template_watch() -> None:
+    global _watch_task
+    if _watch_task is not None:
+        _watch_task.cancel()
+        _watch_task = None
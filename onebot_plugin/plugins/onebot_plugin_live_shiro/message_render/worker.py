@@ -0,0 +1,101 @@
+import asyncio
+import functools
+import time
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from nonebot import get_plugin_config, logger
+
+from ..config import Config
+
+plugin_config = get_plugin_config(Config)
+
+T = TypeVar("T")
+
+# 执行模式：inline 直接在事件循环上执行（用于对比），thread 线程池
+# 不提供进程池：fork 出的子进程可能继承被其他线程持有的锁而死锁，
+# spawn/forkserver 的子进程导入插件时 nonebot 尚未初始化；Pillow 编码时会释放 GIL，线程池已能并行
+WORKER_MODES = ("inline", "thread")
+
+_executor: Optional[Executor] = None
+
+
+def _create_executor() -> Optional[Executor]:
+    mode = plugin_config.live_shiro_render_worker_mode
+    workers = max(1, plugin_config.live_shiro_render_workers)
+    if mode not in WORKER_MODES:
+        logger.warning(f"未知的渲染后处理执行模式 {mode}，使用 thread")
+        mode = "thread"
+
+    if mode == "inline":
+        return None
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render-worker")
+
+
+async def run_in_worker(func: Callable[..., T], *args: Any) -> T:
+    """在渲染后处理线程池中执行 CPU 密集的函数"""
+    global _executor
+    if plugin_config.live_shiro_render_worker_mode == "inline":
+        return func(*args)
+    if _executor is None:
+        _executor = _create_executor()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args))
+
+
+def shutdown_workers() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+class LoopLagMonitor:
+    """
+    事件循环延迟监测
+
+    每隔 interval 秒睡眠一次，实际醒来时间与预期的差值即为事件循环被阻塞的时间
+    """
+
+    def __init__(self, interval: float = 0.5, window: int = 600) -> None:
+        self._interval = interval
+        self._samples: deque[float] = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+        self.max_lag = 0.0
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self._interval)
+            lag = max(0.0, time.perf_counter() - start - self._interval)
+            self._samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+    def stats(self) -> dict:
+        samples = sorted(self._samples)
+        if not samples:
+            return {"samples": 0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+
+        def percentile(p: float) -> float:
+            return samples[min(len(samples) - 1, int(len(samples) * p))] * 1000
+
+        return {
+            "samples": len(samples),
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": self.max_lag * 1000,
+        }
+
+
+loop_lag_monitor = LoopLagMonitor()